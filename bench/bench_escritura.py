@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - microbenchmark de la escritura en streaming (CPU por GB)
+- Sirve un cuerpo de N MB desde otro proceso (su CPU no cuenta) en 127.0.0.1
+- "antes": el bucle original de download_with_resume (iter_content de 8 KiB + progress por chunk)
+- "después": download_with_resume actual (readinto adaptativo, buffer reutilizado, progress limitado)
+Run:
+    python bench/bench_escritura.py --mb 1024 --rondas 3
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import http.server
+import socketserver
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import requests
+from nucleo import download_with_resume
+
+BLOQUE = b"\x5a" * (1024 * 1024)
+
+def servir(mb):
+    class H(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        def log_message(self, *a):
+            pass
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(mb * len(BLOQUE)))
+            self.end_headers()
+            try:
+                for _ in range(mb):
+                    self.wfile.write(BLOQUE)
+            except OSError:
+                pass
+    class S(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+    srv = S(("127.0.0.1", 0), H)
+    print(srv.server_address[1], flush=True)
+    srv.serve_forever()
+
+def antes(url, destino):
+    """Copia literal del bucle previo (chunks de 8 KiB y callback por chunk)."""
+    llamadas = [0]
+    def progress_callback(received, total):
+        llamadas[0] += 1
+    with requests.get(url, stream=True, timeout=(8, 30)) as r:
+        total = int(r.headers.get("content-length") or 0)
+        with open(destino + ".part", "wb") as f:
+            received = 0
+            for chunk in r.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+                    received += len(chunk)
+                    if progress_callback:
+                        try:
+                            progress_callback(received, total)
+                        except Exception:
+                            pass
+    os.replace(destino + ".part", destino)
+    return llamadas[0]
+
+def despues(url, destino):
+    llamadas = [0]
+    def progress_callback(received, total):
+        llamadas[0] += 1
+    ok, detail = download_with_resume(url, destino, {"User-Agent": "bench"}, segmentos=1,
+                                      progress_callback=progress_callback)
+    if not ok:
+        raise RuntimeError(detail)
+    return llamadas[0]
+
+def medir(fn, url, carpeta, mb):
+    destino = os.path.join(carpeta, "bench.bin")
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    llamadas = fn(url, destino)
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - t0
+    if os.path.getsize(destino) != mb * len(BLOQUE):
+        raise RuntimeError("tamaño inesperado")
+    os.remove(destino)
+    gb = mb / 1024.0
+    return {"cpu_s_gb": cpu / gb, "mb_s": mb / wall, "callbacks": llamadas}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="CPU por GB de la escritura en streaming, antes y después.")
+    p.add_argument("--mb", type=int, default=512, help="tamaño del cuerpo servido")
+    p.add_argument("--rondas", type=int, default=3)
+    p.add_argument("--servir", type=int, default=None, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    if args.servir is not None:
+        servir(args.servir)
+        return 0
+
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--servir", str(args.mb)],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        url = f"http://127.0.0.1:{proc.stdout.readline().strip()}/bench.bin"
+        with tempfile.TemporaryDirectory() as carpeta:
+            for nombre, fn in (("antes", antes), ("despues", despues)):
+                mejores = min((medir(fn, url, carpeta, args.mb) for _ in range(args.rondas)),
+                              key=lambda m: m["cpu_s_gb"])
+                print(f"{nombre:8s} CPU {mejores['cpu_s_gb']:.3f} s/GB  {mejores['mb_s']:.0f} MB/s  "
+                      f"{mejores['callbacks']} callbacks de progreso")
+    finally:
+        proc.terminate()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - benchmark reproducible de detección y descarga contra un origen local (origen.py)
+- Cada escenario arranca su propio origen en otro proceso (su CPU no cuenta): huecos, latencia,
+  ancho de banda, Range y errores 429/403 según ESCENARIOS
+- Cada medida (detect_range_mixto o run_downloads con N hilos) corre en un proceso nuevo:
+  CPU (user+sys) y pico de RSS son solo suyos y no arrastran cachés de la medida anterior
+- Informe: peticiones por elemento (contadas en el origen), elementos/s, MB/s, CPU y RSS;
+  JSON con el commit para comparar entre versiones (--comparar resultados_de_antes.json)
+Run:
+    python bench/bench_red.py --salida bench_$(git rev-parse --short HEAD).json
+    python bench/bench_red.py --escenarios base,errores --hilos 8,32 --comparar bench_abc123.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import urllib.request
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ORIGEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "origen.py")
+
+# parámetros de origen.py por escenario ("items" sustituye a --items si se da)
+ESCENARIOS = {
+    "base":      {},
+    "latencia":  {"latencia_ms": 30, "jitter_ms": 10},
+    "huecos":    {"huecos": 0.15, "latencia_ms": 5},
+    "errores":   {"p429": 0.03, "p403": 0.005, "latencia_ms": 5},
+    "ancho":     {"items": 120, "img_kb": 512, "video_kb": 4096, "ancho_kbs": 4096},
+    "sin_range": {"items": 24, "img_kb": 256, "video_kb": 40 * 1024, "con_range": False},
+}
+DEFAULT_ESCENARIOS = "base,latencia,huecos,errores"
+DEFAULT_HILOS = "4,16,64"
+DEFAULT_ITEMS = 1000
+RELLENO = 4
+
+# -----------------------------
+# Origen (proceso aparte)
+# -----------------------------
+def _argumentos_origen(params, items):
+    args = ["--items", str(params.get("items", items))]
+    for clave, valor in params.items():
+        if clave == "items":
+            continue
+        if clave == "con_range":
+            if not valor:
+                args.append("--sin-range")
+            continue
+        args += ["--" + clave.replace("_", "-"), str(valor)]
+    return args
+
+def arrancar_origen(params, items):
+    proc = subprocess.Popen([sys.executable, ORIGEN] + _argumentos_origen(params, items),
+                            stdout=subprocess.PIPE, text=True)
+    return proc, f"http://127.0.0.1:{proc.stdout.readline().strip()}"
+
+def _origen_stats(url):
+    with urllib.request.urlopen(url + "/_stats", timeout=10) as r:
+        return json.load(r)
+
+# -----------------------------
+# Una medida (proceso hijo)
+# -----------------------------
+def _rss_mb(ru):
+    # ru_maxrss: KiB en Linux, bytes en macOS
+    return round(ru.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def medir(spec):
+    """Ejecuta una fase en este proceso y devuelve sus métricas (lo llama el hijo con --medir)."""
+    import resource
+    sys.path.insert(0, SRC)
+    from nucleo import configure_pool, configure_rate_limits, configure_log_writer, detect_range_mixto, run_downloads
+
+    url_base = spec["origen"] + "/s/"
+    hilos = int(spec["hilos"])
+    configure_rate_limits(rps=spec["rps"], burst=max(1, hilos))
+    configure_pool(hilos=hilos, hilos_det=hilos)
+    configure_log_writer(max_bytes=0)
+    rss_base = _rss_mb(resource.getrusage(resource.RUSAGE_SELF))
+    antes = _origen_stats(spec["origen"])
+    ru0, t0 = resource.getrusage(resource.RUSAGE_SELF), time.perf_counter()
+    out = {}
+    if spec["fase"] == "deteccion":
+        info = {}
+        fin = detect_range_mixto(url_base, RELLENO, max_busqueda=max(2000, 4 * spec["items"]), quiet=True,
+                                 hilos_det=hilos, usar_cache=False, stats=info)
+        out.update(fin=fin, esperado=spec["items"], correcto=fin == spec["items"],
+                   rondas=info.get("rounds"), sondeos=info.get("probes"))
+    else:
+        carpeta = os.path.join(spec["tmp"], "descargas")
+        resumen = run_downloads(url_base, carpeta, 1, spec["items"], RELLENO, hilos, 4, lambda e: None,
+                                motor=spec["motor"], async_concurrencia=hilos, max_hilos=hilos)
+        out["resumen"] = {k: v for k, v in resumen.items() if v}
+        out["mb"] = round(sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(carpeta)
+                              for f in fs if f.endswith((".jpg", ".mp4"))) / (1024 * 1024), 2)
+    wall = time.perf_counter() - t0
+    ru1 = resource.getrusage(resource.RUSAGE_SELF)
+    despues = _origen_stats(spec["origen"])
+    peticiones = (despues.get("GET", 0) + despues.get("HEAD", 0)) - (antes.get("GET", 0) + antes.get("HEAD", 0))
+    out.update(segundos=round(wall, 3),
+               cpu_s=round((ru1.ru_utime - ru0.ru_utime) + (ru1.ru_stime - ru0.ru_stime), 3),
+               rss_mb=_rss_mb(ru1), rss_base_mb=rss_base,
+               peticiones=peticiones, peticiones_item=round(peticiones / max(1, spec["items"]), 3),
+               items_s=round(spec["items"] / wall, 1) if wall > 0 else None,
+               estados={k: despues.get(k, 0) - antes.get(k, 0) for k in despues if k.isdigit()
+                        and despues.get(k, 0) - antes.get(k, 0)})
+    if "mb" in out:
+        out["mb_s"] = round(out["mb"] / wall, 2) if wall > 0 else None
+    return out
+
+def _medir_en_hijo(spec):
+    with tempfile.TemporaryDirectory() as tmp:
+        spec = dict(spec, tmp=tmp)
+        # cwd aparte: detect_cache.json y demás ficheros relativos quedan en el temporal
+        r = subprocess.run([sys.executable, os.path.abspath(__file__), "--medir", json.dumps(spec)],
+                           cwd=tmp, capture_output=True, text=True)
+    if r.returncode != 0:
+        raise RuntimeError(f"medida fallida ({spec['escenario']}/{spec['fase']}/{spec['hilos']}):\n{r.stderr[-2000:]}")
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+# -----------------------------
+# Informe y comparación
+# -----------------------------
+def _commit():
+    raiz = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=raiz, capture_output=True, text=True, timeout=10)
+        sucio = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=raiz,
+                               capture_output=True, text=True, timeout=30)
+        return rev.stdout.strip() + ("-dirty" if sucio.stdout.strip() else "") if rev.returncode == 0 else None
+    except Exception:
+        return None
+
+def _clave(r):
+    return (r["escenario"], r["fase"], r.get("motor", ""), r["hilos"])
+
+def _linea(r):
+    base = (f"{r['escenario']:10s} {r['fase']:10s} {r.get('motor', ''):8s} {r['hilos']:>4} hilos  "
+            f"{r['items_s'] or 0:>9.1f} it/s  {r['peticiones_item']:>6.3f} pet/it  "
+            f"CPU {r['cpu_s']:>7.3f} s  RSS {r['rss_mb']:>7.1f} MB")
+    if r["fase"] == "deteccion":
+        return base + f"  fin {r['fin']} ({'ok' if r['correcto'] else 'esperado ' + str(r['esperado'])})"
+    return base + f"  {r.get('mb_s') or 0:>8.2f} MB/s"
+
+def comparar(actual, anterior):
+    """Líneas con el cambio relativo de elementos/s, peticiones por elemento y CPU respecto a anterior."""
+    previos = {_clave(r): r for r in anterior.get("resultados", [])}
+    lineas = [f"Comparación con {anterior.get('meta', {}).get('commit') or '?'}:"]
+    for r in actual["resultados"]:
+        p = previos.get(_clave(r))
+        if p is None:
+            continue
+        def delta(k):
+            a, b = r.get(k), p.get(k)
+            return f"{(a - b) / b * 100:+.1f}%" if a is not None and b else "n/a"
+        lineas.append(f"  {r['escenario']:10s} {r['fase']:10s} {r.get('motor', ''):8s} {r['hilos']:>4} hilos  "
+                      f"it/s {delta('items_s'):>8s}  pet/it {delta('peticiones_item'):>8s}  "
+                      f"CPU {delta('cpu_s'):>8s}  RSS {delta('rss_mb'):>8s}")
+    return lineas
+
+def _lista(texto):
+    return [x.strip() for x in str(texto).split(",") if x.strip()]
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Detección y descarga contra un origen local, por escenario y número de hilos.")
+    p.add_argument("--escenarios", default=DEFAULT_ESCENARIOS, help=f"de: {', '.join(ESCENARIOS)}")
+    p.add_argument("--hilos", default=DEFAULT_HILOS, help="lista de hilos (y de concurrencia async) a medir")
+    p.add_argument("--items", type=int, default=DEFAULT_ITEMS, help="elementos por escenario (salvo los que fijan el suyo)")
+    p.add_argument("--motores", default="hilos", help="hilos,asyncio")
+    p.add_argument("--fases", default="deteccion,descarga")
+    p.add_argument("--rps", type=float, default=0.0, help="límite por host del cliente (0 = sin límite)")
+    p.add_argument("--salida", help="fichero JSON de resultados (si no, el JSON va a stdout)")
+    p.add_argument("--comparar", help="JSON de una ejecución anterior")
+    p.add_argument("--medir", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    if args.medir:
+        print(json.dumps(medir(json.loads(args.medir))))
+        return 0
+
+    escenarios = _lista(args.escenarios)
+    desconocidos = [e for e in escenarios if e not in ESCENARIOS]
+    if desconocidos:
+        p.error(f"escenarios desconocidos: {', '.join(desconocidos)}")
+    informe = {"meta": {"commit": _commit(), "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "python": platform.python_version(), "plataforma": platform.platform(),
+                        "cpus": os.cpu_count(), "args": {k: v for k, v in vars(args).items() if k != "medir"}},
+               "resultados": []}
+    for nombre in escenarios:
+        params = ESCENARIOS[nombre]
+        items = int(params.get("items", args.items))
+        proc, origen = arrancar_origen(params, args.items)
+        try:
+            for fase in _lista(args.fases):
+                for motor in (_lista(args.motores) if fase == "descarga" else [""]):
+                    for hilos in (int(h) for h in _lista(args.hilos)):
+                        spec = {"escenario": nombre, "fase": fase, "motor": motor, "hilos": hilos,
+                                "items": items, "origen": origen, "rps": args.rps}
+                        r = dict(escenario=nombre, fase=fase, motor=motor, hilos=hilos, items=items,
+                                 **_medir_en_hijo(spec))
+                        informe["resultados"].append(r)
+                        print(_linea(r), file=sys.stderr, flush=True)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            for linea in comparar(informe, json.load(f)):
+                print(linea, file=sys.stderr)
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - origen HTTP de pega para los benchmarks (127.0.0.1, sin dependencias)
+- Sirve /s/NNNN.mp4 y /s/NNNN.jpg: vídeo cada --video-cada índices, imagen en el resto
+- Huecos configurables (fracción con semilla o lista), tamaños, latencia con jitter,
+  ancho de banda por conexión, Range / If-Range / If-None-Match y errores 429/403 inyectados
+- El contenido es determinista (semilla + índice) y distinto en cada archivo: dos ejecuciones
+  con los mismos parámetros sirven exactamente los mismos bytes
+- /_stats devuelve los contadores (peticiones por método y estado, bytes) y /_reset los pone a 0
+Run:
+    python bench/origen.py --items 5000 --huecos 0.1 --latencia-ms 20 --p429 0.02
+    # escribe el puerto en la primera línea de stdout
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.server
+import socketserver
+
+BLOQUE = 64 * 1024          # patrón que se repite dentro de cada archivo
+ESCRITURA = 64 * 1024       # bytes por write (y por paso del limitador de ancho de banda)
+FECHA = "Mon, 01 Jan 2024 00:00:00 GMT"
+_RUTA = re.compile(r"^/s/(\d+)\.(\w+)$")
+
+class Origen:
+    """Qué existe, con qué tamaño y qué falla. Thread-safe (contadores y sorteo de errores)."""
+
+    def __init__(self, items=1000, video_cada=5, huecos=0.0, lista_huecos=(), img_kb=32, video_kb=256,
+                 latencia_ms=0.0, jitter_ms=0.0, ancho_kbs=0, con_range=True, p429=0.0, p403=0.0, semilla=1):
+        self.items = int(items)
+        self.video_cada = max(1, int(video_cada))
+        self.img = int(img_kb * 1024)
+        self.video = int(video_kb * 1024)
+        self.latencia = latencia_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.ancho = ancho_kbs * 1024
+        self.con_range = con_range
+        self.p429 = p429
+        self.p403 = p403
+        self.semilla = semilla
+        rnd = random.Random(semilla)
+        # el último siempre existe: la detección tiene un fin conocido
+        self.huecos = {i for i in range(1, self.items) if rnd.random() < huecos} | {int(i) for i in lista_huecos}
+        self.huecos.discard(self.items)
+        self._azar = random.Random(semilla + 1)
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def contar(self, clave, n=1):
+        with self._lock:
+            self.stats[clave] = self.stats.get(clave, 0) + n
+
+    def sorteo(self):
+        """None o el error inyectado para esta petición."""
+        if not (self.p429 or self.p403):
+            return None
+        with self._lock:
+            x = self._azar.random()
+        if x < self.p429:
+            return 429
+        if x < self.p429 + self.p403:
+            return 403
+        return None
+
+    def archivo(self, indice, ext):
+        """Tamaño del archivo o None si no existe."""
+        if indice < 1 or indice > self.items or indice in self.huecos:
+            return None
+        video = indice % self.video_cada == 0
+        if ext != ("mp4" if video else "jpg"):
+            return None
+        return self.video if video else self.img
+
+    def bloque(self, indice):
+        return random.Random(self.semilla * 1000003 + indice).randbytes(BLOQUE)
+
+    def etag(self, indice, size):
+        return f'"{self.semilla}-{indice}-{size}"'
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    origen = None
+
+    def log_message(self, *args):
+        pass
+
+    def _vacio(self, status, extra=None):
+        self.origen.contar(str(status))
+        self.send_response(status)
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _interno(self):
+        if self.path == "/_stats":
+            with self.origen._lock:
+                body = json.dumps(self.origen.stats).encode()
+        elif self.path == "/_reset":
+            with self.origen._lock:
+                self.origen.stats = {}
+            body = b"{}"
+        else:
+            return False
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return True
+
+    def _servir(self, cuerpo):
+        if self._interno():
+            return
+        o = self.origen
+        o.contar(self.command)
+        if o.latencia or o.jitter:
+            time.sleep(o.latencia + random.uniform(0, o.jitter))
+        error = o.sorteo()
+        if error:
+            return self._vacio(error)
+        m = _RUTA.match(self.path.split("?", 1)[0])
+        size = o.archivo(int(m.group(1)), m.group(2)) if m else None
+        if size is None:
+            return self._vacio(404)
+        indice = int(m.group(1))
+        etag = o.etag(indice, size)
+        if self.headers.get("If-None-Match") == etag:
+            return self._vacio(304, {"ETag": etag})
+        inicio, fin, status = 0, size - 1, 200
+        rango = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if rango and o.con_range and (not if_range or if_range in (etag, FECHA)):
+            a, _, b = rango.split("=", 1)[1].partition("-")
+            inicio = int(a)
+            fin = min(int(b), size - 1) if b else size - 1
+            if inicio >= size:
+                return self._vacio(416, {"Content-Range": f"bytes */{size}"})
+            status = 206
+        o.contar(str(status))
+        self.send_response(status)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {inicio}-{fin}/{size}")
+        if o.con_range:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(fin - inicio + 1))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", FECHA)
+        self.end_headers()
+        if cuerpo:
+            self._cuerpo(o.bloque(indice), inicio, fin + 1)
+
+    def _cuerpo(self, bloque, inicio, fin):
+        o = self.origen
+        t0 = time.monotonic()
+        enviado = 0
+        pos = inicio
+        try:
+            while pos < fin:
+                desde = pos % BLOQUE
+                trozo = bloque[desde:desde + min(ESCRITURA, fin - pos, BLOQUE - desde)]
+                self.wfile.write(trozo)
+                pos += len(trozo)
+                enviado += len(trozo)
+                if o.ancho:
+                    adelanto = enviado / o.ancho - (time.monotonic() - t0)
+                    if adelanto > 0:
+                        time.sleep(adelanto)
+        except OSError:
+            pass   # el cliente cortó (cancelación, pausa larga, fin de segmento)
+        finally:
+            o.contar("bytes", enviado)
+
+    def do_HEAD(self):
+        self._servir(False)
+
+    def do_GET(self):
+        self._servir(True)
+
+class Servidor(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # conexiones que el cliente cierra sin más (fin de la detección, pool que se vacía)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+def servir(origen, puerto=0):
+    """Servidor listo (sin arrancar) para origen en 127.0.0.1:puerto."""
+    handler = type("H", (Handler,), {"origen": origen})
+    return Servidor(("127.0.0.1", int(puerto)), handler)
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Origen HTTP de pega para benchmarks (secuencias numeradas .mp4/.jpg).")
+    p.add_argument("--puerto", type=int, default=0)
+    p.add_argument("--items", type=int, default=1000)
+    p.add_argument("--video-cada", dest="video_cada", type=int, default=5)
+    p.add_argument("--huecos", type=float, default=0.0, help="fracción de índices que no existen")
+    p.add_argument("--lista-huecos", dest="lista_huecos", default="", help="índices ausentes: 10,11,12")
+    p.add_argument("--img-kb", dest="img_kb", type=float, default=32)
+    p.add_argument("--video-kb", dest="video_kb", type=float, default=256)
+    p.add_argument("--latencia-ms", dest="latencia_ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", dest="jitter_ms", type=float, default=0.0)
+    p.add_argument("--ancho-kbs", dest="ancho_kbs", type=float, default=0, help="KB/s por conexión (0 = sin límite)")
+    p.add_argument("--sin-range", dest="con_range", action="store_false")
+    p.add_argument("--p429", type=float, default=0.0)
+    p.add_argument("--p403", type=float, default=0.0)
+    p.add_argument("--semilla", type=int, default=1)
+    return p
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    origen = Origen(items=args.items, video_cada=args.video_cada, huecos=args.huecos,
+                    lista_huecos=[x for x in args.lista_huecos.split(",") if x.strip()],
+                    img_kb=args.img_kb, video_kb=args.video_kb, latencia_ms=args.latencia_ms,
+                    jitter_ms=args.jitter_ms, ancho_kbs=args.ancho_kbs, con_range=args.con_range,
+                    p429=args.p429, p403=args.p403, semilla=args.semilla)
+    srv = servir(origen, args.puerto)
+    print(srv.server_address[1], flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
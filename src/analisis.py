@@ -0,0 +1,730 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - análisis de download.log.jsonl (y sus rotaciones) sin GUI
+- Lectura en streaming por bloques, del fichero más viejo (.N) al actual: la memoria no depende
+  del tamaño del log, solo de lo que se resume (sesiones e intervalos de IDs)
+- Sesiones delimitadas por los eventos start/finish (sharded_start/sharded_finish en modo
+  repartido); en logs antiguos sin start, una sesión empieza con el primer resultado tras un finish
+- Por sesión: estados, duplicados y re-sincronización, ráfagas de bloqueos, línea temporal de
+  resultados, red (del finish) e IDs no encontrados / bloqueados como intervalos ("1-5,9")
+- Por host: sumas de sus sesiones; por serie (url_base): IDs que faltan (el último intento falló)
+  y reintento exportable como trabajo (trabajos.JOB_KEYS con "indices")
+- Índice .analisis_log.json junto al log: sesiones cerradas con su posición (firma del fichero +
+  offset) para acceso directo (session_records) y estado de las series, para no volver a leer lo
+  ya analizado (solo la cola nueva, también tras una rotación)
+Requires:
+    pip install orjson         # opcional: parseo más rápido (si no, json de la biblioteca estándar)
+Run:
+    python analisis.py descargas                      # resumen por host, últimas sesiones y faltantes
+    python analisis.py descargas --json > informe.json
+    python analisis.py descargas --reintento reintento.json && python headless.py --job reintento.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from bisect import bisect_left, bisect_right
+from urllib.parse import urlparse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    _loads = orjson.loads
+except Exception:
+    ORJSON_AVAILABLE = False
+    _loads = json.loads
+
+LOG_JSON_FILE = "download.log.jsonl"
+ANALISIS_FILE = ".analisis_log.json"
+ANALISIS_VERSION = 1
+ANALISIS_BLOCK = 8 * 1024 * 1024     # lectura por bloques
+ANALISIS_FIRMA = 4096                # bytes de la primera línea que identifican un fichero (sobrevive a la rotación)
+TIMELINE_PASO = 10.0                 # s por cubo al empezar una sesión...
+TIMELINE_MAX = 240                   # ...y cubos como mucho: al pasarse se juntan de dos en dos
+RAFAGA_HUECO = 30.0                  # s máximos entre dos bloqueos de la misma ráfaga
+RAFAGA_MIN = 3                       # bloqueos seguidos para contar como ráfaga
+RAFAGAS_MAX = 100                    # ráfagas guardadas por sesión (las demás solo se cuentan)
+ESTADOS = ("ok", "skip", "notfound", "blocked")
+FALTAN_ESTADOS = ("notfound", "blocked")
+SIN_SERIE = "?"
+
+_ID_FINAL = re.compile(r"(\d+)$")
+_ID_EXT = re.compile(r"(\d+)\.[A-Za-z0-9]+$")
+_ID_PATH = re.compile(r"(\d+)(?:\.[A-Za-z0-9]+)?$")
+_K_ESTADO = {e: k for k, e in enumerate(ESTADOS)}
+
+# -----------------------------
+# Intervalos de IDs
+# -----------------------------
+class Intervalos:
+    """Conjunto de enteros como intervalos cerrados disjuntos y ordenados (listas a y b)."""
+
+    def __init__(self, pares=()):
+        self.a = []
+        self.b = []
+        for lo, hi in pares:
+            self.add_range(lo, hi)
+
+    def add(self, x):
+        if self.b and x > self.b[-1]:
+            if x == self.b[-1] + 1:
+                self.b[-1] = x
+            else:
+                self.a.append(x)
+                self.b.append(x)
+            return
+        self.add_range(x, x)
+
+    def add_range(self, lo, hi):
+        if not self.b or lo > self.b[-1] + 1:
+            self.a.append(lo)
+            self.b.append(hi)
+            return
+        i = bisect_left(self.b, lo - 1)     # primero que acaba en lo-1 o después (contiguo cuenta)
+        j = i
+        while j < len(self.a) and self.a[j] <= hi + 1:
+            lo, hi = min(lo, self.a[j]), max(hi, self.b[j])
+            j += 1
+        self.a[i:j] = [lo]
+        self.b[i:j] = [hi]
+
+    def remove_range(self, lo, hi):
+        i = bisect_right(self.b, lo - 1)    # primero que acaba en lo o después
+        j = i
+        quedan_a, quedan_b = [], []
+        while j < len(self.a) and self.a[j] <= hi:
+            if self.a[j] < lo:
+                quedan_a.append(self.a[j])
+                quedan_b.append(lo - 1)
+            if self.b[j] > hi:
+                quedan_a.append(hi + 1)
+                quedan_b.append(self.b[j])
+            j += 1
+        self.a[i:j] = quedan_a
+        self.b[i:j] = quedan_b
+
+    def update(self, otro):
+        """Unión con otros Intervalos (mezcla lineal de las dos listas)."""
+        if not otro.a:
+            return
+        if not self.a or otro.a[0] > self.b[-1] + 1:
+            self.a += otro.a
+            self.b += otro.b
+            return
+        pares = sorted(zip(self.a + otro.a, self.b + otro.b))
+        self.a, self.b = [pares[0][0]], [pares[0][1]]
+        for lo, hi in pares[1:]:
+            if lo <= self.b[-1] + 1:
+                if hi > self.b[-1]:
+                    self.b[-1] = hi
+            else:
+                self.a.append(lo)
+                self.b.append(hi)
+
+    def difference_update(self, otro):
+        """Quita los IDs de otros Intervalos (recorrido lineal de las dos listas)."""
+        if not self.a or not otro.a:
+            return
+        a, b = [], []
+        j, n = 0, len(otro.a)
+        for lo, hi in zip(self.a, self.b):
+            while j < n and otro.b[j] < lo:
+                j += 1
+            k = j
+            while k < n and otro.a[k] <= hi:
+                if otro.a[k] > lo:
+                    a.append(lo)
+                    b.append(otro.a[k] - 1)
+                lo = otro.b[k] + 1
+                if lo > hi:
+                    break
+                k += 1
+            if lo <= hi:
+                a.append(lo)
+                b.append(hi)
+        self.a, self.b = a, b
+
+    def __contains__(self, x):
+        i = bisect_left(self.b, x)
+        return i < len(self.a) and self.a[i] <= x
+
+    def __len__(self):
+        return sum(b - a + 1 for a, b in zip(self.a, self.b))
+
+    def __bool__(self):
+        return bool(self.a)
+
+    def pares(self):
+        return [[a, b] for a, b in zip(self.a, self.b)]
+
+    def __iter__(self):
+        for a, b in zip(self.a, self.b):
+            yield from range(a, b + 1)
+
+def format_ids(pares):
+    """[[1, 5], [9, 9]] -> "1-5,9"."""
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in pares)
+
+def parse_ids(valor):
+    """"1-5,9" o [1, 2, 3] -> Intervalos."""
+    iv = Intervalos()
+    if isinstance(valor, (list, tuple)):
+        for x in valor:
+            iv.add(int(x))
+        return iv
+    for parte in str(valor or "").split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        lo, _, hi = parte.partition("-")
+        iv.add_range(int(lo), int(hi or lo))
+    return iv
+
+# -----------------------------
+# Sesión en curso
+# -----------------------------
+def _serie_id(texto, patron):
+    """(serie, id, cifras) de una base o URL numerada, o None."""
+    m = patron.search(texto.split("?", 1)[0])
+    if m is None:
+        return None
+    return texto[:m.start()], int(m.group(1)), len(m.group(1))
+
+class _Linea:
+    """Resultados por cubo de tiempo; el cubo se duplica para no pasar de TIMELINE_MAX."""
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.paso = TIMELINE_PASO
+        self.cubos = []
+        self._lo = self._hi = t0        # cubo en uso (casi todos los registros caen en el mismo)
+        self._cubo = None
+
+    def add(self, ts, k_estado):
+        if self._lo <= ts < self._hi:
+            self._cubo[k_estado] += 1
+            return
+        k = max(0, int((ts - self.t0) // self.paso))
+        while k >= TIMELINE_MAX:
+            self.paso *= 2
+            self.cubos = [[x + y for x, y in zip(self.cubos[i], self.cubos[i + 1])] if i + 1 < len(self.cubos)
+                          else self.cubos[i] for i in range(0, len(self.cubos), 2)]
+            k = max(0, int((ts - self.t0) // self.paso))
+        while len(self.cubos) <= k:
+            self.cubos.append([0] * len(ESTADOS))
+        self._cubo = self.cubos[k]
+        self._lo, self._hi = self.t0 + k * self.paso, self.t0 + (k + 1) * self.paso
+        self._cubo[k_estado] += 1
+
+class _Sesion:
+    def __init__(self, n, ts, desde, inicio=None):
+        self.n = n
+        self.inicio = ts
+        self.fin = ts
+        self.desde = desde
+        self.hasta = None       # abierta: hasta el final del log
+        self.url_base = None
+        self.relleno = None
+        self.rango = None
+        self.repartida = False
+        self.implicita = inicio is None     # log antiguo sin evento start
+        self.cerrada = False
+        self.cuenta = [0] * len(ESTADOS)
+        self.extra = {"duplicados": 0, "actualizados": 0, "sin_cambios": 0, "otras_series": 0,
+                      "aimd_bajadas": 0, "detenida": 0}
+        self.bajadas = {}
+        self.red = None
+        self.ids = {"hechos": Intervalos(), "notfound": Intervalos(), "blocked": Intervalos()}
+        self._hechos = self.ids["hechos"]
+        self.rafagas = []
+        self.rafagas_extra = 0
+        self._rafaga = None
+        self.linea = _Linea(ts)
+        if inicio is not None:
+            self._start(inicio)
+
+    def _start(self, rec):
+        self.url_base = rec.get("url_base")
+        self.relleno = rec.get("relleno")
+        if rec.get("inicio") is not None and rec.get("fin") is not None:
+            self.rango = [rec["inicio"], rec["fin"]]
+
+    def _serie(self, serie, cifras):
+        if self.url_base is None:
+            self.url_base = serie
+            self.relleno = self.relleno or cifras
+        return serie == self.url_base
+
+    def resultado(self, rec, st, ts):
+        if ts > self.fin:
+            self.fin = ts
+        k = _K_ESTADO[st]
+        self.cuenta[k] += 1
+        linea = self.linea
+        if linea._lo <= ts < linea._hi:
+            linea._cubo[k] += 1
+        else:
+            linea.add(ts, k)
+        if k < 2:       # ok / skip
+            m = _ID_PATH.search(rec.get("path") or "")
+            if m is not None:
+                self._hechos.add(int(m.group(1)))
+            if len(rec) > 4:        # dup_of / sync solo aparecen como claves extra
+                if rec.get("dup_of"):
+                    self.extra["duplicados"] += 1
+                sync = rec.get("sync")
+                if sync == "updated":
+                    self.extra["actualizados"] += 1
+                elif sync == "unchanged":
+                    self.extra["sin_cambios"] += 1
+            return
+        si = _serie_id(rec.get("base") or "", _ID_FINAL) if k == 2 else _serie_id(rec.get("url") or "", _ID_EXT)
+        if si is not None:
+            if self._serie(si[0], si[2]):
+                self.ids[st].add(si[1])
+            else:
+                self.extra["otras_series"] += 1
+        if k == 3:
+            r = self._rafaga
+            if r is not None and ts - r[1] <= RAFAGA_HUECO:
+                r[1] = max(r[1], ts)
+                r[2] += 1
+            else:
+                self._cerrar_rafaga()
+                self._rafaga = [ts, ts, 1]
+
+    def _cerrar_rafaga(self):
+        r, self._rafaga = self._rafaga, None
+        if r is None or r[2] < RAFAGA_MIN:
+            return
+        if len(self.rafagas) < RAFAGAS_MAX:
+            self.rafagas.append([round(r[0], 3), round(r[1], 3), r[2]])
+        else:
+            self.rafagas_extra += 1
+
+    def evento(self, rec, ev):
+        if ev == "aimd" and rec.get("reason") not in (None, "", "increase", "inicio"):
+            self.extra["aimd_bajadas"] += 1
+            motivo = str(rec["reason"])
+            self.bajadas[motivo] = self.bajadas.get(motivo, 0) + 1
+        elif ev == "stopped":
+            self.extra["detenida"] = 1
+        elif ev in ("finish", "sharded_finish") and isinstance(rec.get("red"), dict):
+            self.red = {h: {"peticiones": sum((r.get("peticiones") or {}).values()) if isinstance(r.get("peticiones"), dict)
+                            else r.get("peticiones", 0), "mb": r.get("mb", 0)}
+                        for h, r in rec["red"].items() if isinstance(r, dict)}
+
+    def resumen(self):
+        self._cerrar_rafaga()
+        dur = max(0.0, self.fin - self.inicio)
+        hechos = self.cuenta[0] + self.cuenta[1]
+        total = sum(self.cuenta)
+        mb = sum(r.get("mb", 0) for r in self.red.values()) if self.red else None
+        return {"n": self.n, "inicio": round(self.inicio, 3), "fin": round(self.fin, 3), "duracion": round(dur, 1),
+                "url_base": self.url_base, "host": urlparse(self.url_base).netloc.lower() if self.url_base else SIN_SERIE,
+                "relleno": self.relleno, "rango": self.rango, "repartida": self.repartida,
+                "implicita": self.implicita, "cerrada": self.cerrada,
+                "estados": dict(zip(ESTADOS, self.cuenta)), "extra": dict(self.extra), "bajadas": dict(self.bajadas),
+                "items_s": round(total / dur, 2) if dur > 0 else None,
+                "hechos_min": round(hechos * 60 / dur, 1) if dur > 0 else None,
+                "red": self.red, "mb_s": round(mb / dur, 3) if mb and dur > 0 else None,
+                "rafagas": self.rafagas, "rafagas_extra": self.rafagas_extra,
+                "linea": {"t0": round(self.linea.t0, 3), "paso": self.linea.paso, "estados": list(ESTADOS),
+                          "cubos": self.linea.cubos},
+                "rango_hechos": [self._hechos.a[0], self._hechos.b[-1]] if self._hechos else None,
+                "ids": {e: format_ids(self.ids[e].pares()) for e in FALTAN_ESTADOS},
+                "desde": self.desde, "hasta": self.hasta}
+
+# -----------------------------
+# Lectura del log
+# -----------------------------
+def log_files(log_json):
+    """Ficheros del log del más viejo al más nuevo: [(ruta, firma, tamaño)]."""
+    rutas = []
+    n = 1
+    while os.path.exists(f"{log_json}.{n}"):
+        rutas.append(f"{log_json}.{n}")
+        n += 1
+    rutas.reverse()
+    if os.path.exists(log_json):
+        rutas.append(log_json)
+    out = []
+    for p in rutas:
+        try:
+            with open(p, "rb") as f:
+                primera = f.readline(ANALISIS_FIRMA)
+            out.append((p, hashlib.sha1(primera).hexdigest()[:16], os.path.getsize(p)))
+        except OSError:
+            continue
+    return out
+
+def _bloques(path, desde=0, bloque=ANALISIS_BLOCK):
+    """(offset, líneas completas) por bloque leído desde `desde`; una última línea sin \\n no se entrega."""
+    with open(path, "rb") as f:
+        f.seek(desde)
+        base = desde            # offset del primer byte de `resto`
+        resto = b""
+        while True:
+            datos = f.read(bloque)
+            if not datos:
+                return
+            datos = resto + datos
+            corte = datos.rfind(b"\n") + 1
+            resto = datos[corte:]
+            if corte:
+                yield base, datos[:corte - 1].split(b"\n")
+                base += corte
+
+class _Lector:
+    """Máquina de sesiones sobre el flujo de registros."""
+
+    def __init__(self, n0=0, series=None):
+        self.n = n0
+        self.sesion = None
+        self.cerradas = []
+        self.reanudar = None      # (firma, offset) tras el registro que cerró la última sesión
+        self.series = _Series(series)
+        self.pendientes = []      # interrumpidas tras la última cerrada: se suman a series al cerrar otra
+
+    def _sumar(self):
+        for r, ids in self.pendientes:
+            self.series.sumar(r, ids)
+        self.pendientes = []
+
+    def _abrir(self, ts, pos, rec=None):
+        if self.sesion is not None:
+            self._cerrar(pos, False)
+        self.n += 1
+        self.sesion = _Sesion(self.n, ts, list(pos), rec)
+
+    def _cerrar(self, pos, cerrada=True):
+        s, self.sesion = self.sesion, None
+        s.cerrada = cerrada
+        s.hasta = list(pos)
+        r = s.resumen()
+        self.cerradas.append(r)
+        self.pendientes.append((r, s.ids))
+        if cerrada:
+            self._sumar()
+            self.reanudar = list(pos)
+
+    def terminar(self):
+        """Resumen de la sesión abierta (si la hay) y series con todo lo leído."""
+        r = None
+        if self.sesion is not None:
+            r = self.sesion.resumen()
+            self.pendientes.append((r, self.sesion.ids))
+        self._sumar()
+        return r
+
+    def registro(self, rec, firma, ini, fin):
+        ts = rec.get("timestamp") or 0.0
+        st = rec.get("status")
+        s = self.sesion
+        if st in _K_ESTADO:
+            if s is None:
+                self._abrir(ts, (firma, ini))
+                s = self.sesion
+            s.resultado(rec, st, ts)
+            return
+        ev = rec.get("event")
+        # los start de los fragmentos de una sesión repartida van dentro de ella (misma serie)
+        if ev == "sharded_start" or (ev == "start" and not (s is not None and s.repartida
+                                                            and rec.get("url_base") in (None, s.url_base))):
+            self._abrir(ts, (firma, ini), rec)
+            self.sesion.repartida = ev == "sharded_start"
+            return
+        if s is None:
+            return      # eventos sueltos entre sesiones (perfil, reconstrucciones...)
+        s.fin = max(s.fin, ts)
+        if ev == "start":
+            return      # fragmento de una sesión repartida
+        s.evento(rec, ev)
+        if ev == "sharded_finish" or (ev == "finish" and not s.repartida):
+            self._cerrar((firma, fin))
+
+def _cargar_indice(path):
+    try:
+        with open(path, "rb") as f:
+            idx = _loads(f.read())
+        return idx if idx.get("version") == ANALISIS_VERSION else None
+    except Exception:
+        return None
+
+def _guardar_indice(path, idx):
+    try:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(idx, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def _log_path(ruta):
+    return os.path.join(ruta, LOG_JSON_FILE) if os.path.isdir(ruta) else ruta
+
+def analyze_log(ruta, usar_indice=True, progreso=None, cancelar=None):
+    """Informe de un log (ruta del .jsonl o de su carpeta). progreso(leídos, total) tras cada bloque;
+    con cancelar (threading.Event) activado se devuelve lo analizado hasta ahí.
+    Con usar_indice, las sesiones cerradas salen de .analisis_log.json y solo se lee lo nuevo."""
+    t0 = time.perf_counter()
+    log_json = _log_path(ruta)
+    carpeta = os.path.dirname(os.path.abspath(log_json))
+    idx_path = os.path.join(carpeta, ANALISIS_FILE)
+    ficheros = log_files(log_json)
+    firmas = [f[1] for f in ficheros]
+
+    previas, k0, off0 = [], 0, 0
+    idx = _cargar_indice(idx_path) if usar_indice else None
+    if idx and idx.get("reanudar") and idx["reanudar"][0] in firmas:
+        k = firmas.index(idx["reanudar"][0])
+        if int(idx["reanudar"][1]) <= ficheros[k][2]:      # si encogió no es el mismo fichero: se lee todo
+            k0, off0 = k, int(idx["reanudar"][1])
+            previas = idx.get("sesiones", [])
+    lector = _Lector(previas[-1]["n"] if previas else 0, idx.get("series") if previas else None)
+    lector.reanudar = idx["reanudar"] if previas else None
+
+    total = sum(f[2] for f in ficheros[k0:]) - off0
+    leidos = lineas = 0
+    cortado = False
+    registro = lector.registro
+    for k in range(k0, len(ficheros)):
+        path, firma, size = ficheros[k]
+        desde = off0 if k == k0 else 0
+        for base, bloque in _bloques(path, desde):
+            pos = base
+            for linea in bloque:
+                ini = pos
+                pos += len(linea) + 1
+                try:
+                    rec = _loads(linea)
+                except Exception:
+                    continue
+                if type(rec) is dict:
+                    registro(rec, firma, ini, pos)
+            lineas += len(bloque)
+            if progreso is not None:
+                progreso(leidos + pos - desde, total)
+            if cancelar is not None and cancelar.is_set():
+                cortado = True
+                break
+        if cortado:
+            break
+        leidos += size - desde
+
+    # al índice van las sesiones hasta la última cerrada con finish; lo que sigue se relee la próxima vez
+    nuevas = lector.cerradas
+    n_fijas = max((i + 1 for i, s in enumerate(nuevas) if s["cerrada"]), default=0)
+    if usar_indice and not cortado and n_fijas:
+        _guardar_indice(idx_path, {"version": ANALISIS_VERSION, "log": os.path.basename(log_json),
+                                   "reanudar": lector.reanudar, "sesiones": previas + nuevas[:n_fijas],
+                                   "series": lector.series.exportar()})
+    sesiones = previas + nuevas
+    abierta = lector.terminar()
+    if abierta is not None:
+        sesiones.append(abierta)
+    if progreso is not None:
+        progreso(total, total)
+    informe = {"log": log_json, "carpeta": carpeta, "ficheros": len(ficheros),
+               "bytes": sum(f[2] for f in ficheros), "leidos": leidos if not cortado else None,
+               "lineas": lineas, "del_indice": len(previas), "cortado": cortado,
+               "orjson": ORJSON_AVAILABLE, "sesiones": sesiones}
+    informe["hosts"] = _por_host(sesiones)
+    informe["series"] = lector.series.informe()
+    informe["segundos"] = round(time.perf_counter() - t0, 3)
+    return informe
+
+def session_records(ruta, sesion):
+    """Registros de una sesión del informe, leyendo solo su tramo (firma + offset del índice).
+    Vacío si el fichero donde empezaba ya salió de la rotación."""
+    ficheros = log_files(_log_path(ruta))
+    firmas = [f[1] for f in ficheros]
+    f_desde, o_desde = sesion["desde"]
+    f_hasta, o_hasta = sesion["hasta"] or (None, None)
+    if f_desde not in firmas:
+        return
+    for k in range(firmas.index(f_desde), len(ficheros)):
+        path, firma, _ = ficheros[k]
+        for base, bloque in _bloques(path, o_desde if firma == f_desde else 0):
+            for linea in bloque:
+                if firma == f_hasta and base >= o_hasta:
+                    return
+                base += len(linea) + 1
+                try:
+                    yield _loads(linea)
+                except Exception:
+                    continue
+        if firma == f_hasta:
+            return
+
+# -----------------------------
+# Agregados
+# -----------------------------
+def _por_host(sesiones):
+    hosts = {}
+    for s in sesiones:
+        h = hosts.setdefault(s["host"], {"sesiones": 0, "primera": s["inicio"], "ultima": s["fin"], "segundos": 0.0,
+                                         "estados": dict.fromkeys(ESTADOS, 0), "duplicados": 0, "aimd_bajadas": 0,
+                                         "rafagas": 0, "peticiones": 0, "mb": 0.0, "series": []})
+        h["sesiones"] += 1
+        h["primera"] = min(h["primera"], s["inicio"])
+        h["ultima"] = max(h["ultima"], s["fin"])
+        h["segundos"] = round(h["segundos"] + s["duracion"], 1)
+        for k, v in s["estados"].items():
+            h["estados"][k] = h["estados"].get(k, 0) + v
+        h["duplicados"] += s["extra"].get("duplicados", 0)
+        h["aimd_bajadas"] += s["extra"].get("aimd_bajadas", 0)
+        h["rafagas"] += len(s["rafagas"]) + s["rafagas_extra"]
+        for host_red, r in (s.get("red") or {}).items():
+            if host_red == s["host"]:
+                h["peticiones"] += r.get("peticiones") or 0
+                h["mb"] = round(h["mb"] + (r.get("mb") or 0), 3)
+        if s["url_base"] and s["url_base"] not in h["series"]:
+            h["series"].append(s["url_base"])
+    return hosts
+
+class _Series:
+    """Por serie (url_base): IDs obtenidos y los que faltan, con el estado de su último intento.
+    Se suman las sesiones en orden; dentro de una sesión lo obtenido gana aunque antes fallara."""
+
+    def __init__(self, guardado=None):
+        self.d = {}
+        for clave, v in (guardado or {}).items():
+            self.d[clave] = dict(v, hechos=parse_ids(v["hechos"]),
+                                 faltan={e: parse_ids(v["faltan"].get(e, "")) for e in FALTAN_ESTADOS})
+
+    def sumar(self, r, ids):
+        clave = r["url_base"] or SIN_SERIE
+        d = self.d.get(clave)
+        if d is None:
+            d = self.d[clave] = {"host": r["host"], "relleno": r["relleno"], "sesiones": 0, "ultima": r["fin"],
+                                 "hechos": Intervalos(), "faltan": {e: Intervalos() for e in FALTAN_ESTADOS}}
+        d["sesiones"] += 1
+        d["ultima"] = max(d["ultima"], r["fin"])
+        d["relleno"] = r["relleno"] or d["relleno"]
+        for e in FALTAN_ESTADOS:
+            for otro in FALTAN_ESTADOS:
+                if otro != e:
+                    d["faltan"][otro].difference_update(ids[e])
+            d["faltan"][e].update(ids[e])
+        d["hechos"].update(ids["hechos"])
+        for iv in d["faltan"].values():
+            iv.difference_update(ids["hechos"])
+
+    def exportar(self):
+        return {clave: dict(d, hechos=format_ids(d["hechos"].pares()),
+                            faltan={e: format_ids(iv.pares()) for e, iv in d["faltan"].items()})
+                for clave, d in self.d.items()}
+
+    def informe(self):
+        out = self.exportar()
+        for clave, d in self.d.items():
+            out[clave]["n_hechos"] = len(d["hechos"])
+            out[clave]["n_faltan"] = {e: len(iv) for e, iv in d["faltan"].items()}
+        return out
+
+def missing_ranges(informe, serie, estados=FALTAN_ESTADOS):
+    """Intervalos de IDs de la serie cuyo último intento terminó en alguno de estados."""
+    iv = Intervalos()
+    d = informe["series"].get(serie)
+    for e in estados if d else ():
+        iv.update(parse_ids(d["faltan"].get(e, "")))
+    return iv
+
+def retry_job(informe, serie, estados=FALTAN_ESTADOS, carpeta=None):
+    """Trabajo (formato de trabajos.py) que reintenta solo los IDs que faltan, o None si no falta nada."""
+    iv = missing_ranges(informe, serie, estados)
+    if not iv or serie == SIN_SERIE:
+        return None
+    d = informe["series"][serie]
+    return {"url_base": serie, "carpeta": carpeta or informe["carpeta"], "relleno": d["relleno"] or 4,
+            "inicio": iv.a[0], "fin": iv.b[-1], "indices": format_ids(iv.pares()),
+            "reintentar_notfound": "notfound" in estados}
+
+def write_job(path, job):
+    """Guarda un trabajo como job file (headless.py --job, trabajos.load_jobs)."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(job, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+# -----------------------------
+# Informe legible
+# -----------------------------
+def _fecha(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else "-"
+
+def _recorte(texto, n=72):
+    return texto if len(texto) <= n else texto[:n - 3] + "..."
+
+def format_report(informe, n_sesiones=15):
+    """Líneas de texto del informe: hosts, últimas sesiones y lo que falta por serie."""
+    ls = [f"{informe['log']}: {informe['ficheros']} fichero(s), {informe['bytes'] / (1024 * 1024):.1f} MB, "
+          f"{len(informe['sesiones'])} sesiones ({informe['del_indice']} del índice), "
+          f"{informe['lineas']} líneas leídas en {informe['segundos']:.2f} s"
+          + (" [cortado]" if informe["cortado"] else "")]
+    ls.append("")
+    ls.append("Hosts:")
+    for host, h in sorted(informe["hosts"].items(), key=lambda x: -x[1]["ultima"]):
+        e = h["estados"]
+        ls.append(f"  {host:30s} {h['sesiones']:>4} ses  ok {e['ok']:>8}  skip {e['skip']:>8}  "
+                  f"404 {e['notfound']:>7}  bloq {e['blocked']:>6}  ráfagas {h['rafagas']:>4}  "
+                  f"{h['mb']:>10.1f} MB  {_fecha(h['primera'])} .. {_fecha(h['ultima'])}")
+    ls.append("")
+    ls.append(f"Sesiones (últimas {n_sesiones}):")
+    for s in informe["sesiones"][-n_sesiones:]:
+        e = s["estados"]
+        marca = "" if s["cerrada"] else (" [abierta]" if s is informe["sesiones"][-1] else " [interrumpida]")
+        ls.append(f"  #{s['n']:<5} {_fecha(s['inicio'])} {s['duracion']:>8.0f} s  ok {e['ok']:>7}  skip {e['skip']:>7}  "
+                  f"404 {e['notfound']:>6}  bloq {e['blocked']:>5}  {s['items_s'] or 0:>7.1f} it/s  "
+                  f"{_recorte(s['url_base'] or SIN_SERIE, 48)}{marca}")
+        for r in s["rafagas"][:3]:
+            ls.append(f"         ráfaga de bloqueos {_fecha(r[0])} +{r[1] - r[0]:.0f} s: {r[2]}")
+    ls.append("")
+    ls.append("Faltan (último intento fallido):")
+    for serie, d in informe["series"].items():
+        if not any(d["n_faltan"].values()):
+            continue
+        ls.append(f"  {_recorte(serie)}  hechos {d['n_hechos']}")
+        for e in FALTAN_ESTADOS:
+            if d["n_faltan"][e]:
+                ls.append(f"    {e:9s} {d['n_faltan'][e]:>7}: {_recorte(d['faltan'][e], 100)}")
+    return ls
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Resumen de download.log.jsonl por sesión, host y serie; exporta reintentos.")
+    p.add_argument("ruta", help="carpeta de descarga o ruta del .jsonl")
+    p.add_argument("--json", action="store_true", help="informe completo en JSON")
+    p.add_argument("--sesiones", type=int, default=15, help="sesiones en el resumen de texto")
+    p.add_argument("--sin-indice", dest="usar_indice", action="store_false", help=f"leer todo e ignorar {ANALISIS_FILE}")
+    p.add_argument("--reintento", help="escribe un trabajo con los IDs que faltan ('-' = stdout)")
+    p.add_argument("--serie", help="url_base del reintento (por defecto la de la última sesión con fallos)")
+    p.add_argument("--estados", default=",".join(FALTAN_ESTADOS), help="estados a reintentar: notfound,blocked")
+    args = p.parse_args(argv)
+    informe = analyze_log(args.ruta, usar_indice=args.usar_indice)
+    if args.reintento:
+        estados = [e.strip() for e in args.estados.split(",") if e.strip() in FALTAN_ESTADOS]
+        serie = args.serie
+        if serie is None:
+            candidatas = [s for s, d in informe["series"].items() if s != SIN_SERIE and missing_ranges(informe, s, estados)]
+            serie = max(candidatas, key=lambda s: informe["series"][s]["ultima"], default=None)
+        job = retry_job(informe, serie, estados) if serie else None
+        if job is None:
+            print("Nada que reintentar.", file=sys.stderr)
+            return 1
+        if args.reintento == "-":
+            print(json.dumps(job, indent=2, ensure_ascii=False))
+        else:
+            write_job(args.reintento, job)
+            print(f"{args.reintento}: {job['url_base']} {len(parse_ids(job['indices']))} IDs", file=sys.stderr)
+        return 0
+    if args.json:
+        print(json.dumps(informe, ensure_ascii=False))
+    else:
+        print("\n".join(format_report(informe, args.sesiones)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,14 +3,28 @@
 Downloader PRO - GUI premium (Dark Hybrid Discord+Steam)
 - Pestañas arriba, iconos, animaciones, hover, ripple-like feedback
 - Detección mixta (exponencial+binaria), descargas con resume, separación videos/imagenes
-- Sonidos UI (hover, click, error, done) generados localmente
+- Sonidos UI (hover, click, error, done) generados localmente, vía un único hilo de audio
 - Logs: download.log.txt + download.log.jsonl
 - Guardado y carga de config (config.json)
 - Manual start/finish fields (inicio/fin manual)
+- Pool HTTP keep-alive por host (SessionPool) compartido por sondeos y descargas
+- Motor de descarga seleccionable: hilos (ThreadPoolExecutor) o asyncio (requiere aiohttp)
+- Extensiones configurables con predicción por serie (GET directo sin HEAD cuando es fiable)
+- Bus de eventos (eventos.py): progreso coalescido y líneas de estado en un insert por tick
+- Vistas de log acotadas (vistalog.py): anillo en memoria, filtro por estado y páginas antiguas desde el .jsonl
+- Duplicados (duplicados.py): hash al vuelo, enlace duro al contenido ya descargado
+- Modo repartido (fragmentos.py): rangos muy grandes en varios procesos
+- Re-sincronización (sincro.py): ETag/Last-Modified por archivo, If-Range al reanudar
+- Pestaña Trabajos (trabajos.py): cola persistente de series descargadas a la vez con reparto justo
+- Pestaña Red (telemetria.py): peticiones, errores, reintentos, TTFB/conexión/transferencia y MB/s por host en vivo
+- Perfilado opcional (perfil.py): cProfile o muestreo de pilas y traza de tramos, junto a los logs
+- Análisis del log (analisis.py): sesiones, hosts, ráfagas de bloqueos y reintento de los IDs que faltan
 Requires:
     pip install requests tqdm ttkbootstrap
+    pip install aiohttp        # opcional: motor asyncio
 Run:
     python codigo.py
+    python headless.py --help   # servidores sin pantalla (sin tkinter ni sonidos)
 """
 # -----------------------------
 # IMPORTS
@@ -18,26 +32,9 @@ Run:
 import os
 import sys
 import time
-import json
-import math
-import random
 import threading
-import traceback
-import tempfile
-import queue
-import wave
-import struct
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urlparse
-
-import requests
-
-try:
-    from tqdm import tqdm
-    TQDM_AVAILABLE = True
-except:
-    TQDM_AVAILABLE = False
+from collections import deque
+from functools import partial
 
 # GUI libs
 import tkinter as tk
@@ -53,367 +50,36 @@ except Exception:
     THEME_AVAILABLE = False
     Icon = None
 
-# -----------------------------
-# GLOBALS / DEFAULTS
-# -----------------------------
-APP_NAME = "Downloader PRO"
-CONFIG_FILE = "downloader_config.json"
-
-DEFAULT_RELLENO = 4
-DEFAULT_HILOS = 10
-DEFAULT_HILOS_DET = 3
-DEFAULT_REINTENTOS = 4
-
-PAUSA_MIN = 0.2
-PAUSA_MAX = 0.6
-PAUSA_EMERGENCIA = 5
-LIMITE_ERRORES = 10
-TIMEOUT_BASE = (8, 30)
-MAX_DETECT = 2000
-
-USER_AGENTS = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15",
-    "Mozilla/5.0 (X11; Linux x86_64; rv:123.0) Gecko/20100101 Firefox/123.0",
-    "Mozilla/5.0 (Linux; Android 11; SM-A505F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0 Mobile Safari/537.36",
-]
-
-# -----------------------------
-# Utils: config persistence
-# -----------------------------
-def load_config():
-    try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def save_config(cfg):
-    try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=2)
-    except Exception:
-        pass
-
-# -----------------------------
-# Sound generation (small WAVs)
-# -----------------------------
-def _gen_simple_tone(path, freq=800.0, duration=0.18, volume=14000, sweep_to=None):
-    fr = 44100
-    nframes = int(duration * fr)
-    with wave.open(path, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(fr)
-        for i in range(nframes):
-            t = i / fr
-            f = freq if sweep_to is None else freq + (sweep_to - freq) * (i / nframes)
-            s = int(volume * math.sin(2 * math.pi * f * t))
-            wf.writeframesraw(struct.pack("<h", s))
-        wf.writeframes(b"")
-
-def _ensure_ui_sounds():
-    tmpdir = Path(tempfile.gettempdir())
-    paths = {}
-    p_done = tmpdir / "dl_done.wav"
-    p_click = tmpdir / "dl_click.wav"
-    p_hover = tmpdir / "dl_hover.wav"
-    p_err = tmpdir / "dl_err.wav"
-    if not p_done.exists():
-        _gen_simple_tone(str(p_done), freq=700.0, duration=0.35, volume=14000, sweep_to=1150.0)
-    if not p_click.exists():
-        _gen_simple_tone(str(p_click), freq=900.0, duration=0.08, volume=9000)
-    if not p_hover.exists():
-        _gen_simple_tone(str(p_hover), freq=1200.0, duration=0.06, volume=6000)
-    if not p_err.exists():
-        _gen_simple_tone(str(p_err), freq=320.0, duration=0.14, volume=12000)
-    paths['done'] = str(p_done)
-    paths['click'] = str(p_click)
-    paths['hover'] = str(p_hover)
-    paths['err'] = str(p_err)
-    return paths
-
-_UI_SOUNDS = _ensure_ui_sounds()
-
-def play_sound(path, async_play=True):
-    try:
-        if sys.platform.startswith("win"):
-            import winsound
-            flags = winsound.SND_FILENAME
-            if async_play:
-                flags |= winsound.SND_ASYNC
-            winsound.PlaySound(path, flags)
-        elif sys.platform == "darwin":
-            if async_play:
-                os.system(f"afplay {repr(path)} >/dev/null 2>&1 &")
-            else:
-                os.system(f"afplay {repr(path)} >/dev/null 2>&1")
-        else:
-            # try paplay / aplay
-            cmd = f"paplay {repr(path)} >/dev/null 2>&1"  # prefer pipewire
-            if async_play:
-                cmd += " &"
-            rc = os.system(cmd)
-            if rc != 0:
-                cmd2 = f"aplay {repr(path)} >/dev/null 2>&1"
-                if async_play:
-                    cmd2 += " &"
-                os.system(cmd2)
-    except Exception:
-        pass
-
-def play_ui(name):
-    p = _UI_SOUNDS.get(name)
-    if p:
-        threading.Thread(target=play_sound, args=(p, True), daemon=True).start()
-
-# -----------------------------
-# Logging helpers
-# -----------------------------
-def append_log_txt(path, line):
-    try:
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-    except Exception:
-        pass
-
-def append_log_json(path, obj):
-    try:
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    except Exception:
-        pass
-
-# -----------------------------
-# Networking helpers (head, detect, download resume)
-# -----------------------------
-def head_ok(url, headers=None, timeout=8):
-    headers = headers or {"User-Agent": random.choice(USER_AGENTS)}
-    try:
-        r = requests.head(url, headers=headers, timeout=timeout, allow_redirects=True)
-        if r.status_code == 200:
-            return True
-        # fallback to quick GET
-        r = requests.get(url, headers=headers, timeout=timeout, stream=True)
-        return r.status_code == 200
-    except Exception:
-        return False
-
-def detect_range_mixto(url_base, relleno=DEFAULT_RELLENO, max_busqueda=MAX_DETECT, quiet=False, hilos_det=DEFAULT_HILOS_DET):
-    """Exponencial -> binaria -> ventana final verificando en paralelo."""
-    if not quiet:
-        print("🔍 Detección mixta: búsqueda exponencial...")
-    n = 1
-    prev = 0
-    while n <= max_busqueda:
-        s = str(n).zfill(relleno)
-        if head_ok(f"{url_base}{s}.mp4") or head_ok(f"{url_base}{s}.jpg"):
-            prev = n
-            n *= 2
-            continue
-        else:
-            break
-    if n > max_busqueda:
-        n = max_busqueda
-    low = prev
-    high = max(1, n)
-    if low == 0:
-        # try small block
-        for t in range(1, min(8, max_busqueda)+1):
-            s = str(t).zfill(relleno)
-            if head_ok(f"{url_base}{s}.mp4") or head_ok(f"{url_base}{s}.jpg"):
-                low = t
-                break
-        if low == 0:
-            return 0
-    if high < low:
-        high = low
-    if not quiet:
-        print(f"🔎 Refinando por binaria entre {low} y {high}...")
-    while low < high:
-        mid = (low + high + 1) // 2
-        s = str(mid).zfill(relleno)
-        if head_ok(f"{url_base}{s}.mp4") or head_ok(f"{url_base}{s}.jpg"):
-            low = mid
-        else:
-            high = mid - 1
-        if low >= max_busqueda:
-            low = max_busqueda
-            break
-    est_fin = low
-    window_start = max(1, est_fin - 10)
-    window_end = min(max_busqueda, est_fin + 10)
-    if not quiet:
-        print(f"🔬 Verificando ventana final {window_start}..{window_end} con hilos={hilos_det}...")
-    found = set()
-    def check(i):
-        s = str(i).zfill(relleno)
-        if head_ok(f"{url_base}{s}.mp4") or head_ok(f"{url_base}{s}.jpg"):
-            return i
-        return None
-    with ThreadPoolExecutor(max_workers=hilos_det) as ex:
-        futures = {ex.submit(check, i): i for i in range(window_start, window_end+1)}
-        for fut in as_completed(futures):
-            try:
-                r = fut.result()
-                if r:
-                    found.add(r)
-            except Exception:
-                pass
-    final = max(found) if found else est_fin
-    if not quiet:
-        print(f"✅ Detección estimada: {final}")
-    return final
-
-def download_with_resume(url, destino, headers, timeout=TIMEOUT_BASE, reintentos=DEFAULT_REINTENTOS, progress_callback=None):
-    """Descarga con resume (temp .part). progress_callback(bytes_received, total_bytes) optional."""
-    temp = destino + ".part"
-    for intento in range(1, reintentos + 1):
-        h = headers.copy()
-        mode = "wb"
-        pos = 0
-        if os.path.exists(temp):
-            pos = os.path.getsize(temp)
-            if pos > 0:
-                h["Range"] = f"bytes={pos}-"
-                mode = "ab"
-        try:
-            r = requests.get(url, stream=True, headers=h, timeout=timeout, allow_redirects=True)
-        except Exception:
-            time.sleep(random.uniform(1.0, 2.5))
-            continue
-        if r.status_code in (403, 429):
-            return (False, f"BLOCK_{r.status_code}")
-        if r.status_code == 416:
-            if os.path.exists(temp):
-                try:
-                    os.replace(temp, destino)
-                except:
-                    try:
-                        os.rename(temp, destino)
-                    except:
-                        pass
-                return (True, "RESUMED_RENAMED")
-            return (False, f"HTTP_{r.status_code}")
-        if r.status_code not in (200, 206):
-            return (False, f"HTTP_{r.status_code}")
-        total = None
-        try:
-            total = int(r.headers.get("content-length") or 0) + (pos or 0)
-        except:
-            total = None
-        try:
-            with open(temp, mode) as f:
-                received = pos
-                chunk_size = 8192
-                for chunk in r.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        received += len(chunk)
-                        if progress_callback:
-                            try:
-                                progress_callback(received, total)
-                            except Exception:
-                                pass
-            # rename
-            try:
-                os.replace(temp, destino)
-            except:
-                try:
-                    os.rename(temp, destino)
-                except:
-                    pass
-            return (True, "OK")
-        except Exception:
-            time.sleep(0.5)
-            continue
-    return (False, "FAILED_RETRIES")
-
-def worker_job(base_no_ext, carpeta_base, reintentos, pausa_min, pausa_max):
-    """Intenta mp4 primero, luego jpg. Logs y separa en subcarpetas."""
-    nombre = os.path.basename(base_no_ext)
-    carpeta_v = os.path.join(carpeta_base, "videos")
-    carpeta_i = os.path.join(carpeta_base, "imagenes")
-    os.makedirs(carpeta_v, exist_ok=True)
-    os.makedirs(carpeta_i, exist_ok=True)
-
-    log_txt = os.path.join(carpeta_base, "download.log.txt")
-    log_json = os.path.join(carpeta_base, "download.log.jsonl")
-
-    headers = {"User-Agent": random.choice(USER_AGENTS),
-               "Referer": urlparse(base_no_ext).scheme + "://" + urlparse(base_no_ext).netloc,
-               "Accept": "*/*"}
-
-    url_mp4 = base_no_ext + ".mp4"
-    url_jpg = base_no_ext + ".jpg"
-    destino_mp4 = os.path.join(carpeta_v, nombre + ".mp4")
-    destino_jpg = os.path.join(carpeta_i, nombre + ".jpg")
-
-    if os.path.exists(destino_mp4):
-        msg = f"SKIP (video exists): {destino_mp4}"
-        append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"skip","type":"video","path":destino_mp4})
-        return msg
-    if os.path.exists(destino_jpg):
-        msg = f"SKIP (img exists): {destino_jpg}"
-        append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"skip","type":"img","path":destino_jpg})
-        return msg
-
-    # Try mp4 via HEAD -> download
-    try:
-        r_head = requests.head(url_mp4, headers=headers, timeout=8, allow_redirects=True)
-        if r_head.status_code == 200:
-            ok, detail = download_with_resume(url_mp4, destino_mp4, headers, reintentos=reintentos)
-            if ok:
-                msg = f"VIDEO OK: {destino_mp4}"
-                append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"ok","type":"video","path":destino_mp4})
-                time.sleep(random.uniform(pausa_min, pausa_max))
-                return msg
-            else:
-                if detail.startswith("BLOCK"):
-                    msg = f"BLOCKED {detail}: {url_mp4}"
-                    append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"blocked","detail":detail,"url":url_mp4})
-                    return msg
-    except Exception:
-        # try direct
-        try:
-            ok, detail = download_with_resume(url_mp4, destino_mp4, headers, reintentos=reintentos)
-            if ok:
-                msg = f"VIDEO OK: {destino_mp4}"
-                append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"ok","type":"video","path":destino_mp4})
-                time.sleep(random.uniform(pausa_min, pausa_max))
-                return msg
-        except Exception:
-            pass
-
-    # try jpg
-    try:
-        r_head_j = requests.head(url_jpg, headers=headers, timeout=8, allow_redirects=True)
-        if r_head_j.status_code == 200:
-            ok, detail = download_with_resume(url_jpg, destino_jpg, headers, reintentos=reintentos)
-            if ok:
-                msg = f"IMG OK: {destino_jpg}"
-                append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"ok","type":"img","path":destino_jpg})
-                time.sleep(random.uniform(pausa_min, pausa_max))
-                return msg
-            else:
-                if detail.startswith("BLOCK"):
-                    msg = f"BLOCKED {detail}: {url_jpg}"
-                    append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"blocked","detail":detail,"url":url_jpg})
-                    return msg
-    except Exception:
-        try:
-            ok, detail = download_with_resume(url_jpg, destino_jpg, headers, reintentos=reintentos)
-            if ok:
-                msg = f"IMG OK: {destino_jpg}"
-                append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"ok","type":"img","path":destino_jpg})
-                time.sleep(random.uniform(pausa_min, pausa_max))
-                return msg
-        except Exception:
-            pass
-
-    msg = f"NOTFOUND: {base_no_ext}"
-    append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"notfound","base":base_no_ext})
-    return msg
+# núcleo sin GUI (compartido con headless.py) y sonidos UI
+from nucleo import (
+    APP_NAME, DEFAULT_RELLENO, DEFAULT_HILOS, DEFAULT_HILOS_DET, DEFAULT_REINTENTOS,
+    DEFAULT_RATE_RPS, DEFAULT_RATE_BURST, SEG_PARTES, SEG_UMBRAL, PAUSA_INACTIVO, LIMITE_ERRORES, MAX_DETECT, DETECT_CACHE_TTL, POOL_MAXSIZE, POOL_BLOCK,
+    MOTOR_HILOS, MOTOR_ASYNC, DEFAULT_MOTOR, DEFAULT_ASYNC_CONCURRENCIA, DEFAULT_AIMD_MAX,
+    LOG_FLUSH_INTERVAL, LOG_MAX_BYTES, DEFAULT_LOG_DURABILITY,
+    LOG_DURABILITY_NONE, LOG_DURABILITY_INTERVAL, LOG_DURABILITY_SESSION, DEFAULT_EXTS, parse_exts,
+    load_config, save_config, configure_pool, configure_log_writer, flush_logs,
+    configure_rate_limits, parse_host_limits, format_host_limits, configure_pause,
+    detect_range_mixto, run_downloads,
+)
+from analisis import FALTAN_ESTADOS, analyze_log, retry_job, write_job
+from diario import rebuild_journal
+from mapa import MAP_STRIDE, map_range, save_map, load_map, map_hints
+from sonido import play_ui, set_muted, audio_stats
+from eventos import EventBus
+from vistalog import LOG_RING, LogView
+from duplicados import DEDUP_MODOS, DEFAULT_DEDUP
+from perfil import PROFILE_MODOS, PROFILE_NO, configure_profiling, trazado
+from fragmentos import DEFAULT_PROCESOS, procesos_disponibles, run_sharded
+from trabajos import (
+    DEFAULT_PRESUPUESTO, DEFAULT_MAX_TRABAJOS, DEFAULT_PRIORIDAD, ESTADO_ACTIVO, JobStore, Scheduler,
+)
+from telemetria import TELEM_WINDOW, net_stats, net_summary
+
+UI_TICK_MS = 100            # cada cuánto se vacía el bus de eventos
+UI_FRAME_BUDGET = 0.012     # s de trabajo por tick; si se pasa, menos líneas en el siguiente
+UI_LINES_MIN = 50           # líneas por tick: se adapta entre estos dos valores según el presupuesto
+UI_LINES_MAX = 5000
+UI_NET_MS = 1000            # refresco de las pestañas Red y Sonido (solo mientras están a la vista)
 
 # -----------------------------
 # GUI: helper widgets & styles
@@ -486,7 +152,11 @@ class App(tb.Window if THEME_AVAILABLE else object):
         # load config
         self.cfg = load_config()
         # state & queue
-        self.queue = queue.Queue()
+        # bus de eventos: coalesce progreso y agrupa líneas (run_downloads emite con self.queue.put)
+        self.queue = EventBus()
+        # últimas líneas del registro; txt_log y log_preview solo pintan una ventana de ellas
+        self.log_ring = deque(maxlen=LOG_RING)
+        self._lines_per_tick = UI_LINES_MAX // 4
         self.stop_event = threading.Event()
         self.pause_event = threading.Event()
         self.threadpool = None
@@ -499,9 +169,44 @@ class App(tb.Window if THEME_AVAILABLE else object):
         self.reintentos = tk.IntVar(value=self.cfg.get("reintentos", DEFAULT_REINTENTOS))
         self.fin_detectado = tk.IntVar(value=0)
         self.hilos_det_var = tk.IntVar(value=self.cfg.get("hilos_det", DEFAULT_HILOS_DET))
-        self.pausa_min_var = tk.DoubleVar(value=self.cfg.get("pausa_min", PAUSA_MIN))
-        self.pausa_max_var = tk.DoubleVar(value=self.cfg.get("pausa_max", PAUSA_MAX))
+        self.rate_rps_var = tk.DoubleVar(value=self.cfg.get("rate_rps", DEFAULT_RATE_RPS))
+        self.rate_burst_var = tk.IntVar(value=self.cfg.get("rate_burst", DEFAULT_RATE_BURST))
+        self.limites_host_var = tk.StringVar(value=format_host_limits(self.cfg.get("limites_host", {})))
         self.lim_err_var = tk.IntVar(value=self.cfg.get("lim_err", LIMITE_ERRORES))
+        self.pool_maxsize_var = tk.IntVar(value=self.cfg.get("pool_maxsize", POOL_MAXSIZE))
+        self.pool_block_var = tk.BooleanVar(value=self.cfg.get("pool_block", POOL_BLOCK))
+        self.motor_var = tk.StringVar(value=self.cfg.get("motor", DEFAULT_MOTOR))
+        self.async_conc_var = tk.IntVar(value=self.cfg.get("async_concurrencia", DEFAULT_ASYNC_CONCURRENCIA))
+        self.mute_var = tk.BooleanVar(value=self.cfg.get("sonido_mute", False))
+        self.log_durab_var = tk.StringVar(value=self.cfg.get("log_durability", DEFAULT_LOG_DURABILITY))
+        self.log_flush_var = tk.DoubleVar(value=self.cfg.get("log_flush_interval", LOG_FLUSH_INTERVAL))
+        self.log_max_mb_var = tk.IntVar(value=self.cfg.get("log_max_mb", LOG_MAX_BYTES // (1024 * 1024)))
+        self.diario_var = tk.BooleanVar(value=self.cfg.get("usar_diario", True))
+        self.reint_nf_var = tk.BooleanVar(value=self.cfg.get("reintentar_notfound", False))
+        self.det_cache_h_var = tk.DoubleVar(value=self.cfg.get("detect_cache_ttl", DETECT_CACHE_TTL) / 3600.0)
+        self.usar_mapa_var = tk.BooleanVar(value=self.cfg.get("usar_mapa", False))
+        self.map_stride_var = tk.IntVar(value=self.cfg.get("map_stride", MAP_STRIDE))
+        self.exts_var = tk.StringVar(value=self.cfg.get("exts", ",".join(DEFAULT_EXTS)))
+        self.prediccion_var = tk.BooleanVar(value=self.cfg.get("prediccion", True))
+        self.adaptativo_var = tk.BooleanVar(value=self.cfg.get("adaptativo", True))
+        self.max_hilos_var = tk.IntVar(value=self.cfg.get("max_hilos", DEFAULT_AIMD_MAX))
+        self.segmentos_var = tk.IntVar(value=self.cfg.get("segmentos", SEG_PARTES))
+        self.seg_umbral_var = tk.IntVar(value=self.cfg.get("seg_umbral_mb", SEG_UMBRAL // (1024 * 1024)))
+        self.pausa_inactivo_var = tk.DoubleVar(value=self.cfg.get("pausa_inactivo", PAUSA_INACTIVO))
+        self.procesos_var = tk.IntVar(value=self.cfg.get("procesos", DEFAULT_PROCESOS))
+        self.dedup_var = tk.StringVar(value=self.cfg.get("dedup", DEFAULT_DEDUP))
+        self.sincronizar_var = tk.BooleanVar(value=self.cfg.get("sincronizar", False))
+        self.perfil_var = tk.StringVar(value=self.cfg.get("perfil", PROFILE_NO))
+        self.traza_var = tk.BooleanVar(value=self.cfg.get("traza", False))
+        # cola de trabajos (varias series a la vez)
+        self.presupuesto_var = tk.IntVar(value=self.cfg.get("presupuesto", DEFAULT_PRESUPUESTO))
+        self.paralelo_var = tk.IntVar(value=self.cfg.get("paralelo", DEFAULT_MAX_TRABAJOS))
+        self.prioridad_var = tk.IntVar(value=DEFAULT_PRIORIDAD)
+        self.jobs = JobStore()
+        self.scheduler = None
+        self.ventana_var = tk.StringVar(value="Ventana: -")
+        self.tasa_var = tk.StringVar(value="Tasa: -")
+        set_muted(self.mute_var.get())
 
         # manual range
         self.inicio_var = tk.StringVar(value=str(self.cfg.get("inicio",1)))
@@ -511,6 +216,7 @@ class App(tb.Window if THEME_AVAILABLE else object):
         self._build_ui()
         # start queue processor
         self.root.after(120, self._process_queue)
+        self.root.after(UI_NET_MS, self._refresh_net)
 
     def _build_ui(self):
         # top bar
@@ -534,8 +240,12 @@ class App(tb.Window if THEME_AVAILABLE else object):
         tab_dl = ttk.Frame(nb)
         tab_cfg = ttk.Frame(nb)
         tab_logs = ttk.Frame(nb)
-        tab_sound = ttk.Frame(nb)
+        tab_sound = self.tab_sound = ttk.Frame(nb)
+        tab_jobs = ttk.Frame(nb)
+        tab_net = self.tab_net = ttk.Frame(nb)
         nb.add(tab_dl, text="Descarga", image=get_icon("download"), compound="left")
+        nb.add(tab_jobs, text="Trabajos", image=get_icon("list-task"), compound="left")
+        nb.add(tab_net, text="Red", image=get_icon("activity"), compound="left")
         nb.add(tab_cfg, text="Configuración", image=get_icon("gear"), compound="left")
         nb.add(tab_logs, text="Logs", image=get_icon("file-text"), compound="left")
         nb.add(tab_sound, text="Sonido", image=get_icon("volume-up"), compound="left")
@@ -566,6 +276,8 @@ class App(tb.Window if THEME_AVAILABLE else object):
 
         ttk.Label(left, text="Hilos (descarga):").pack(anchor="w", pady=(8,0))
         ttk.Spinbox(left, from_=1, to=200, textvariable=self.hilos, width=6).pack(anchor="w", pady=2)
+        ttk.Label(left, textvariable=self.ventana_var).pack(anchor="w", pady=(0,2))
+        ttk.Label(left, textvariable=self.tasa_var).pack(anchor="w", pady=(0,2))
 
         ttk.Label(left, text="Reintentos por archivo:").pack(anchor="w", pady=(8,0))
         ttk.Spinbox(left, from_=1, to=20, textvariable=self.reintentos, width=6).pack(anchor="w", pady=2)
@@ -581,6 +293,9 @@ class App(tb.Window if THEME_AVAILABLE else object):
         self.btn_pause.grid(row=0, column=2, padx=4)
         self.btn_stop = HoverButton(bf, text="Detener", command=self._stop, state="disabled")
         self.btn_stop.grid(row=0, column=3, padx=4)
+        self.btn_map = HoverButton(bf, text="Mapear IDs (huecos)", command=self._thread_map)
+        self.btn_map.grid(row=1, column=0, padx=4, pady=(6,0))
+        ttk.Checkbutton(bf, text="Descargar solo IDs del mapa", variable=self.usar_mapa_var).grid(row=1, column=1, columnspan=3, sticky="w", padx=4, pady=(6,0))
 
         ttk.Label(left, text="Separación: videos/  imágenes/").pack(anchor="w", pady=(8,0))
         ttk.Label(left, text="Logs: download.log.txt / download.log.jsonl").pack(anchor="w", pady=(2,0))
@@ -593,7 +308,7 @@ class App(tb.Window if THEME_AVAILABLE else object):
         self.pb_file = ttk.Progressbar(right, mode="determinate")
         self.pb_file.pack(fill="x", pady=6)
         ttk.Label(right, text="Registro / Estado:").pack(anchor="w", pady=(8,0))
-        self.txt_log = tk.Text(right, height=18, wrap="none", bg="#0f1115", fg="#eaf2ff")
+        self.txt_log = LogView(right, self.log_ring, height=18, bg="#0f1115", fg="#eaf2ff")
         self.txt_log.pack(fill="both", expand=True, pady=4)
 
         # ---- Config tab ----
@@ -602,12 +317,56 @@ class App(tb.Window if THEME_AVAILABLE else object):
         cfgf.pack(fill="both", expand=True, padx=8, pady=6)
         ttk.Label(cfgf, text="Max hilos detección (suave):").grid(row=0, column=0, sticky="w", pady=4)
         ttk.Spinbox(cfgf, from_=1, to=20, textvariable=self.hilos_det_var, width=6).grid(row=0, column=1, sticky="w", padx=6)
-        ttk.Label(cfgf, text="Pausa mínima (s):").grid(row=1, column=0, sticky="w", pady=4)
-        ttk.Entry(cfgf, textvariable=self.pausa_min_var, width=8).grid(row=1, column=1, sticky="w", padx=6)
-        ttk.Label(cfgf, text="Pausa máxima (s):").grid(row=2, column=0, sticky="w", pady=4)
-        ttk.Entry(cfgf, textvariable=self.pausa_max_var, width=8).grid(row=2, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Límite por host (peticiones/s, 0 = sin límite):").grid(row=1, column=0, sticky="w", pady=4)
+        ttk.Entry(cfgf, textvariable=self.rate_rps_var, width=8).grid(row=1, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Ráfaga máxima (peticiones):").grid(row=2, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=1, to=1000, textvariable=self.rate_burst_var, width=6).grid(row=2, column=1, sticky="w", padx=6)
         ttk.Label(cfgf, text="Límite errores consecutivos:").grid(row=3, column=0, sticky="w", pady=4)
         ttk.Entry(cfgf, textvariable=self.lim_err_var, width=8).grid(row=3, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Conexiones por host (0 = auto):").grid(row=4, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=0, to=400, textvariable=self.pool_maxsize_var, width=6).grid(row=4, column=1, sticky="w", padx=6)
+        ttk.Checkbutton(cfgf, text="Esperar conexión libre (pool bloqueante)", variable=self.pool_block_var).grid(row=5, column=0, columnspan=2, sticky="w", pady=4)
+        ttk.Label(cfgf, text="Motor de descarga:").grid(row=6, column=0, sticky="w", pady=4)
+        ttk.Combobox(cfgf, textvariable=self.motor_var, values=(MOTOR_HILOS, MOTOR_ASYNC), state="readonly", width=10).grid(row=6, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Concurrencia asyncio (en vuelo):").grid(row=7, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=1, to=10000, textvariable=self.async_conc_var, width=8).grid(row=7, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Durabilidad de logs (fsync):").grid(row=8, column=0, sticky="w", pady=4)
+        ttk.Combobox(cfgf, textvariable=self.log_durab_var, state="readonly", width=10,
+                     values=(LOG_DURABILITY_NONE, LOG_DURABILITY_INTERVAL, LOG_DURABILITY_SESSION)).grid(row=8, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Intervalo de volcado de logs (s):").grid(row=9, column=0, sticky="w", pady=4)
+        ttk.Entry(cfgf, textvariable=self.log_flush_var, width=8).grid(row=9, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Rotar logs a partir de (MB, 0 = nunca):").grid(row=10, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=0, to=10000, textvariable=self.log_max_mb_var, width=8).grid(row=10, column=1, sticky="w", padx=6)
+        ttk.Checkbutton(cfgf, text="Usar diario de completado (reanudar sin revisar el disco)", variable=self.diario_var).grid(row=11, column=0, columnspan=2, sticky="w", pady=4)
+        ttk.Checkbutton(cfgf, text="Reintentar números marcados como no encontrados", variable=self.reint_nf_var).grid(row=12, column=0, columnspan=2, sticky="w", pady=4)
+        ttk.Label(cfgf, text="Caché de detección (horas, 0 = re-sondear siempre):").grid(row=13, column=0, sticky="w", pady=4)
+        ttk.Entry(cfgf, textvariable=self.det_cache_h_var, width=8).grid(row=13, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Paso de muestreo del mapa (IDs):").grid(row=14, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=1, to=1000, textvariable=self.map_stride_var, width=6).grid(row=14, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Extensiones (en orden, separadas por comas):").grid(row=15, column=0, sticky="w", pady=4)
+        ttk.Entry(cfgf, textvariable=self.exts_var, width=24).grid(row=15, column=1, sticky="w", padx=6)
+        ttk.Checkbutton(cfgf, text="Predecir extensión (menos HEAD por archivo)", variable=self.prediccion_var).grid(row=16, column=0, columnspan=2, sticky="w", pady=4)
+        ttk.Checkbutton(cfgf, text="Concurrencia adaptativa (AIMD: 'Hilos' es la ventana inicial)", variable=self.adaptativo_var).grid(row=17, column=0, columnspan=2, sticky="w", pady=4)
+        ttk.Label(cfgf, text="Máximo de hilos adaptativos:").grid(row=18, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=1, to=1000, textvariable=self.max_hilos_var, width=6).grid(row=18, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Límites por host (host=req/s[/ráfaga], ...):").grid(row=19, column=0, sticky="w", pady=4)
+        ttk.Entry(cfgf, textvariable=self.limites_host_var, width=36).grid(row=19, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Segmentos en paralelo por archivo grande (1 = no):").grid(row=20, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=1, to=32, textvariable=self.segmentos_var, width=6).grid(row=20, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Segmentar a partir de (MB):").grid(row=21, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=1, to=100000, textvariable=self.seg_umbral_var, width=8).grid(row=21, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="En pausa, cerrar conexiones activas tras (s):").grid(row=22, column=0, sticky="w", pady=4)
+        ttk.Entry(cfgf, textvariable=self.pausa_inactivo_var, width=8).grid(row=22, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text=f"Procesos (rangos muy grandes, {procesos_disponibles()} núcleos):").grid(row=23, column=0, sticky="w", pady=4)
+        ttk.Spinbox(cfgf, from_=1, to=max(1, procesos_disponibles()), textvariable=self.procesos_var, width=6).grid(row=23, column=1, sticky="w", padx=6)
+        ttk.Label(cfgf, text="Contenido duplicado (por hash/ETag):").grid(row=24, column=0, sticky="w", pady=4)
+        ttk.Combobox(cfgf, textvariable=self.dedup_var, values=DEDUP_MODOS, width=10, state="readonly").grid(row=24, column=1, sticky="w", padx=6)
+        ttk.Checkbutton(cfgf, text="Re-sincronizar existentes (ETag/Last-Modified: solo baja lo que cambió)",
+                        variable=self.sincronizar_var).grid(row=25, column=0, columnspan=2, sticky="w", pady=4)
+        ttk.Label(cfgf, text="Perfilar sesión (perfil_* junto a los logs):").grid(row=26, column=0, sticky="w", pady=4)
+        ttk.Combobox(cfgf, textvariable=self.perfil_var, values=PROFILE_MODOS, width=10, state="readonly").grid(row=26, column=1, sticky="w", padx=6)
+        ttk.Checkbutton(cfgf, text="Traza de tramos (sondeo, descarga, escritura, log, UI) en .trace.json",
+                        variable=self.traza_var).grid(row=27, column=0, columnspan=2, sticky="w", pady=4)
 
         # ---- Logs tab ----
         ttk.Label(tab_logs, text="Logs", font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=8, pady=6)
@@ -617,9 +376,54 @@ class App(tb.Window if THEME_AVAILABLE else object):
         ttk.Button(lb, text="Abrir log.txt", command=self._open_log_txt).grid(row=0, column=1, padx=4)
         ttk.Button(lb, text="Abrir log.jsonl", command=self._open_log_json).grid(row=0, column=2, padx=4)
         ttk.Button(lb, text="Limpiar logs", command=self._clear_logs).grid(row=0, column=3, padx=4)
-        self.log_preview = tk.Text(tab_logs, height=22, wrap="none", bg="#071019", fg="#9cf0ff")
+        ttk.Button(lb, text="Reconstruir diario", command=self._thread_rebuild_journal).grid(row=0, column=4, padx=4)
+        ttk.Button(lb, text="Analizar log", command=self._thread_analyze_log).grid(row=0, column=5, padx=4)
+        self.log_preview = LogView(tab_logs, self.log_ring, log_json_fn=self._log_json_path, toolbar=True,
+                                   height=22, bg="#071019", fg="#9cf0ff")
         self.log_preview.pack(fill="both", expand=True, padx=8, pady=6)
 
+        # ---- Trabajos tab ----
+        ttk.Label(tab_jobs, text="Cola de trabajos", font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=8, pady=6)
+        jb = ttk.Frame(tab_jobs)
+        jb.pack(anchor="w", padx=8)
+        ttk.Label(jb, text="Prioridad:").grid(row=0, column=0, sticky="w")
+        ttk.Spinbox(jb, from_=1, to=10, textvariable=self.prioridad_var, width=4).grid(row=0, column=1, padx=4)
+        ttk.Button(jb, text="Encolar formulario actual", command=self._enqueue_form).grid(row=0, column=2, padx=4)
+        ttk.Button(jb, text="Reencolar", command=self._requeue_job).grid(row=0, column=3, padx=4)
+        ttk.Button(jb, text="Detener trabajo", command=self._stop_job).grid(row=0, column=4, padx=4)
+        ttk.Button(jb, text="Quitar", command=self._remove_job).grid(row=0, column=5, padx=4)
+        ttk.Label(jb, text="Presupuesto (en vuelo):").grid(row=1, column=0, sticky="w", pady=4)
+        ttk.Spinbox(jb, from_=1, to=2000, textvariable=self.presupuesto_var, width=6).grid(row=1, column=1, padx=4)
+        ttk.Label(jb, text="Trabajos a la vez:").grid(row=1, column=2, sticky="e")
+        ttk.Spinbox(jb, from_=1, to=64, textvariable=self.paralelo_var, width=4).grid(row=1, column=3, sticky="w", padx=4)
+        self.btn_cola = ttk.Button(jb, text="Iniciar cola", command=self._toggle_queue)
+        self.btn_cola.grid(row=1, column=4, padx=4)
+        self.btn_cola_pausa = ttk.Button(jb, text="Pausar cola", command=self._pause_queue, state="disabled")
+        self.btn_cola_pausa.grid(row=1, column=5, padx=4)
+        cols = ("id", "url", "rango", "carpeta", "prio", "estado", "progreso")
+        self.tree_jobs = ttk.Treeview(tab_jobs, columns=cols, show="headings", height=16)
+        for c, w in zip(cols, (40, 320, 110, 140, 50, 90, 110)):
+            self.tree_jobs.heading(c, text=c.capitalize())
+            self.tree_jobs.column(c, width=w, anchor="w")
+        self.tree_jobs.pack(fill="both", expand=True, padx=8, pady=6)
+        self._refresh_jobs()
+
+        # ---- Red tab ----
+        ttk.Label(tab_net, text="Telemetría de red por host", font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=8, pady=6)
+        ttk.Label(tab_net, text=f"Tasas y percentiles de los últimos {TELEM_WINDOW:g} s; totales de toda la sesión "
+                                "(incluye los procesos del modo repartido).").pack(anchor="w", padx=8)
+        cols = ("host", "peticiones", "req_s", "errores", "reintentos", "mb", "mb_s",
+                "conexion", "ttfb50", "ttfb90", "transfer")
+        titulos = ("Host", "Peticiones", "Req/s", "Errores red", "Reintentos", "MB", "MB/s",
+                   "Conexión p50 ms", "TTFB p50 ms", "TTFB p90 ms", "Transfer. p50 ms")
+        self.tree_net = ttk.Treeview(tab_net, columns=cols, show="headings", height=12)
+        for c, t, w in zip(cols, titulos, (220, 80, 60, 80, 80, 70, 60, 110, 100, 100, 110)):
+            self.tree_net.heading(c, text=t)
+            self.tree_net.column(c, width=w, anchor="w" if c == "host" else "e")
+        self.tree_net.pack(fill="both", expand=True, padx=8, pady=6)
+        self.net_estados_var = tk.StringVar(value="")
+        ttk.Label(tab_net, textvariable=self.net_estados_var).pack(anchor="w", padx=8, pady=4)
+
         # ---- Sound tab ----
         ttk.Label(tab_sound, text="Sonidos UI", font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=8, pady=6)
         sf = ttk.Frame(tab_sound)
@@ -630,6 +434,10 @@ class App(tb.Window if THEME_AVAILABLE else object):
         ttk.Button(sf, text="Probar error", command=lambda: play_ui("err")).pack(anchor="w", pady=4)
         ttk.Button(sf, text="Probar done", command=lambda: play_ui("done")).pack(anchor="w", pady=4)
         ttk.Label(sf, text="(Los sonidos son generados localmente y suaves)").pack(anchor="w", pady=6)
+        ttk.Checkbutton(sf, text="Silenciar sonidos de la interfaz", variable=self.mute_var,
+                        command=lambda: set_muted(self.mute_var.get())).pack(anchor="w", pady=4)
+        self.sound_stats_var = tk.StringVar(value="")
+        ttk.Label(sf, textvariable=self.sound_stats_var).pack(anchor="w", pady=6)
 
     # -----------------------------
     # UI helpers
@@ -652,6 +460,7 @@ class App(tb.Window if THEME_AVAILABLE else object):
             messagebox.showinfo("Info", "La carpeta aún no existe.")
 
     def _open_log_txt(self):
+        flush_logs()
         p = os.path.join(self.carpeta.get(), "download.log.txt")
         if os.path.exists(p):
             if sys.platform.startswith("win"):
@@ -662,6 +471,7 @@ class App(tb.Window if THEME_AVAILABLE else object):
             messagebox.showinfo("Info", "No existe download.log.txt todavía.")
 
     def _open_log_json(self):
+        flush_logs()
         p = os.path.join(self.carpeta.get(), "download.log.jsonl")
         if os.path.exists(p):
             if sys.platform.startswith("win"):
@@ -673,6 +483,7 @@ class App(tb.Window if THEME_AVAILABLE else object):
 
     def _clear_logs(self):
         base = self.carpeta.get()
+        flush_logs(release=True)
         for p in (os.path.join(base, "download.log.txt"), os.path.join(base, "download.log.jsonl")):
             try:
                 if os.path.exists(p):
@@ -680,43 +491,183 @@ class App(tb.Window if THEME_AVAILABLE else object):
             except:
                 pass
         messagebox.showinfo("Logs", "Logs eliminados.")
-        self.log_preview.delete("1.0", "end")
+        self.log_ring.clear()
+        self.log_preview.clear()
+
+    def _thread_rebuild_journal(self):
+        url = self.url_base.get().strip()
+        if not url:
+            messagebox.showwarning("Falta URL", "Escribe la URL base primero.")
+            return
+        carpeta = self.carpeta.get().strip() or "descargas"
+        try:
+            rell = int(self.relleno.get())
+        except:
+            rell = DEFAULT_RELLENO
+
+        def work():
+            try:
+                n = rebuild_journal(carpeta, url, rell)
+                self.queue.put({"type":"status","text":f"Diario reconstruido: {n['video']} videos y {n['img']} imágenes en disco."})
+            except Exception as e:
+                self.queue.put({"type":"status","text":f"Error reconstruyendo diario: {e}"})
+        threading.Thread(target=work, daemon=True).start()
+
+    def _thread_analyze_log(self):
+        carpeta = self.carpeta.get().strip() or "descargas"
+        if not os.path.exists(self._log_json_path()):
+            messagebox.showinfo("Info", "No existe download.log.jsonl todavía.")
+            return
+        self._append_log("Analizando download.log.jsonl...")
+
+        def work():
+            try:
+                flush_logs()
+                informe = analyze_log(carpeta)
+                self.queue.put({"type":"analisis","informe":informe})
+                self.queue.put({"type":"status","text":f"Análisis del log: {len(informe['sesiones'])} sesiones, "
+                                                       f"{informe['lineas']} líneas leídas en {informe['segundos']:.1f} s "
+                                                       f"({informe['del_indice']} sesiones del índice)."})
+            except Exception as e:
+                self.queue.put({"type":"status","text":f"Error analizando el log: {e}"})
+        threading.Thread(target=work, daemon=True).start()
+
+    def _show_analysis(self, informe):
+        """Ventana con hosts, últimas sesiones y series con IDs que faltan (reintento exportable)."""
+        win = tk.Toplevel(self.root)
+        win.title("Análisis del log")
+        win.geometry("1100x700")
+
+        def tabla(titulo, cols, anchos, altura):
+            ttk.Label(win, text=titulo, font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=8, pady=(8, 2))
+            tree = ttk.Treeview(win, columns=cols, show="headings", height=altura)
+            for c, w in zip(cols, anchos):
+                tree.heading(c, text=c.capitalize())
+                tree.column(c, width=w, anchor="w" if c in ("host", "serie", "inicio", "faltan") else "e")
+            tree.pack(fill="both", expand=True, padx=8)
+            return tree
+
+        fecha = lambda ts: time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else ""
+        tree = tabla("Hosts", ("host", "sesiones", "ok", "skip", "404", "bloq", "ráfagas", "mb", "última"),
+                     (260, 70, 80, 80, 70, 70, 70, 90, 130), 5)
+        for host, h in sorted(informe["hosts"].items(), key=lambda x: -x[1]["ultima"]):
+            e = h["estados"]
+            tree.insert("", "end", values=(host, h["sesiones"], e["ok"], e["skip"], e["notfound"], e["blocked"],
+                                           h["rafagas"], f"{h['mb']:.1f}", fecha(h["ultima"])))
+        tree = tabla("Sesiones (las 200 últimas)", ("n", "inicio", "seg", "ok", "skip", "404", "bloq", "it/s", "ráfagas", "serie"),
+                     (50, 130, 70, 70, 70, 60, 60, 60, 60, 330), 10)
+        for s in reversed(informe["sesiones"][-200:]):
+            e = s["estados"]
+            tree.insert("", "end", values=(s["n"], fecha(s["inicio"]) + ("" if s["cerrada"] else " *"), f"{s['duracion']:.0f}",
+                                           e["ok"], e["skip"], e["notfound"], e["blocked"], s["items_s"] or "",
+                                           len(s["rafagas"]) + s["rafagas_extra"], s["url_base"] or ""))
+        series = [(k, d) for k, d in informe["series"].items() if any(d["n_faltan"].values())]
+        tree_series = tabla("Faltan (el último intento falló)", ("serie", "hechos", "notfound", "blocked", "faltan"),
+                            (330, 80, 80, 80, 480), 5)
+        for i, (k, d) in enumerate(series):
+            tree_series.insert("", "end", iid=str(i), values=(k, d["n_hechos"], d["n_faltan"]["notfound"],
+                                                              d["n_faltan"]["blocked"], " | ".join(
+                                                                  d["faltan"][e][:120] for e in FALTAN_ESTADOS if d["faltan"][e])))
+        if series:
+            tree_series.selection_set("0")
+
+        def reintento():
+            sel = tree_series.selection()
+            if not sel:
+                messagebox.showinfo("Info", "No hay IDs que reintentar.", parent=win)
+                return None
+            job = retry_job(informe, series[int(sel[0])][0], FALTAN_ESTADOS)
+            if job is not None:
+                job["prioridad"] = DEFAULT_PRIORIDAD
+            return job
+
+        def exportar():
+            job = reintento()
+            if job is None:
+                return
+            p = filedialog.asksaveasfilename(parent=win, defaultextension=".json", initialfile="reintento.json",
+                                             initialdir=informe["carpeta"], filetypes=[("Job file", "*.json")])
+            if p:
+                write_job(p, job)
+                self._append_log(f"Reintento exportado a {p} (python headless.py --job {os.path.basename(p)}).")
+
+        def encolar():
+            job = reintento()
+            if job is None:
+                return
+            job_id = self.jobs.add(job)
+            self._append_log(f"Trabajo #{job_id} encolado: reintento de {job['url_base']} ({job['indices'][:80]}).")
+            self._refresh_jobs()
+            play_ui("click")
+
+        bf = ttk.Frame(win)
+        bf.pack(anchor="w", padx=8, pady=8)
+        ttk.Button(bf, text="Exportar reintento...", command=exportar).grid(row=0, column=0, padx=4)
+        ttk.Button(bf, text="Encolar reintento", command=encolar).grid(row=0, column=1, padx=4)
+        ttk.Label(bf, text=f"{informe['ficheros']} fichero(s), {informe['bytes'] / (1024 * 1024):.1f} MB; "
+                           "* = sesión sin finish (en curso o interrumpida)").grid(row=0, column=2, padx=12)
 
     # -----------------------------
     # Queue processing (UI updates)
     # -----------------------------
+    @trazado("ui", "ui")
     def _process_queue(self):
-        while not self.queue.empty():
-            item = self.queue.get_nowait()
-            t = item.get("type")
-            if t == "status":
-                self._append_log(item.get("text"))
-            elif t == "progress":
-                try:
-                    self.pb_total["maximum"] = item.get("max", int(self.pb_total["maximum"]) if self.pb_total["maximum"] else 1)
-                except Exception:
-                    self.pb_total["maximum"] = item.get("max", 1)
-                self.pb_total["value"] = item.get("value", 0)
-            elif t == "fileprogress":
-                self.pb_file["value"] = item.get("value", 0)
-            elif t == "detect":
-                self.fin_detectado.set(item.get("value", 0))
-                self._append_log(f"Detección estimada: {item.get('value',0)} archivos.")
-        self.root.after(150, self._process_queue)
+        t0 = time.perf_counter()
+        latest, lines, dropped = self.queue.drain(max_lines=self._lines_per_tick)
+        if dropped:
+            lines.insert(0, (time.time(), f"… {dropped} líneas de estado omitidas en la vista (completas en download.log.txt)", None))
+        item = latest.get("progress")
+        if item:
+            try:
+                self.pb_total["maximum"] = item.get("max", int(self.pb_total["maximum"]) if self.pb_total["maximum"] else 1)
+            except Exception:
+                self.pb_total["maximum"] = item.get("max", 1)
+            self.pb_total["value"] = item.get("value", 0)
+        item = latest.get("fileprogress")
+        if item:
+            self.pb_file["value"] = item.get("value", 0)
+        item = latest.get("aimd")
+        if item:
+            self.ventana_var.set(f"Ventana: {item.get('window')}/{item.get('max')} en vuelo"
+                                 + (f" — bajada por {item['reason']}" if item.get("reason") and item["reason"] != "inicio" else ""))
+        item = latest.get("rate")
+        if item:
+            limite = f"{item.get('rps', 0):g}" if item.get("rps") else "∞"
+            self.tasa_var.set(f"Tasa: {item.get('achieved', 0):g}/{limite} req/s ({item.get('host', '')})")
+        if latest.get("jobs"):
+            self._refresh_jobs()
+        item = latest.get("analisis")
+        if item:
+            self._show_analysis(item["informe"])
+        item = latest.get("detect")
+        if item:
+            self.fin_detectado.set(item.get("value", 0))
+            lines.append((time.time(), f"Detección estimada: {item.get('value',0)} archivos.", None))
+        if lines:
+            self._append_lines(lines)
+
+        # presupuesto por tick: menos líneas si el tick se pasó, más si sobró y queda cola
+        gasto = time.perf_counter() - t0
+        if gasto > UI_FRAME_BUDGET:
+            self._lines_per_tick = max(UI_LINES_MIN, self._lines_per_tick // 2)
+        elif gasto < UI_FRAME_BUDGET / 2 and self.queue.pending():
+            self._lines_per_tick = min(UI_LINES_MAX, self._lines_per_tick * 2)
+        self.root.after(UI_TICK_MS, self._process_queue)
+
+    def _append_lines(self, entries):
+        """[(ts, texto, result), ...] -> al anillo y un solo insert por vista (cada una recorta su ventana)."""
+        self.log_ring.extend(entries)
+        for vista in (self.txt_log, self.log_preview):
+            try:
+                vista.on_new(entries)
+            except Exception:
+                pass
 
     def _append_log(self, text):
-        ts = time.strftime("%Y-%m-%d %H:%M:%S")
-        line = f"[{ts}] {text}"
-        try:
-            self.txt_log.insert("end", line + "\n")
-            self.txt_log.see("end")
-        except Exception:
-            pass
-        try:
-            self.log_preview.insert("end", line + "\n")
-            self.log_preview.see("end")
-        except Exception:
-            pass
+        self._append_lines([(time.time(), text, None)])
+
+    def _log_json_path(self):
+        return os.path.join(self.carpeta.get().strip() or "descargas", "download.log.jsonl")
 
     # -----------------------------
     # Actions: detect / start / pause / stop
@@ -735,16 +686,60 @@ class App(tb.Window if THEME_AVAILABLE else object):
             rell = int(self.relleno.get())
         except:
             rell = DEFAULT_RELLENO
+        self._configure_pool()
+        try:
+            ttl = float(self.det_cache_h_var.get()) * 3600
+        except Exception:
+            ttl = DETECT_CACHE_TTL
         try:
-            fin = detect_range_mixto(self.url_base.get().strip(), relleno=rell, max_busqueda=MAX_DETECT, quiet=False, hilos_det=self.hilos_det_var.get())
+            st = {}
+            fin = detect_range_mixto(self.url_base.get().strip(), relleno=rell, max_busqueda=MAX_DETECT, quiet=False,
+                                     hilos_det=self.hilos_det_var.get(), cache_ttl=ttl, stats=st,
+                                     exts=parse_exts(self.exts_var.get()))
             self.queue.put({"type":"detect","value":fin})
-            self.queue.put({"type":"status","text":f"Detección finalizada: {fin} archivos detectados (estimado)."})
+            origen = {"hit": "desde caché", "forward": "re-sondeo desde caché"}.get(st.get("cache"), "completa")
+            self.queue.put({"type":"status","text":f"Detección finalizada: {fin} archivos detectados (estimado; {origen}, {st.get('rounds', 0)} rondas, {st.get('probes', 0)} sondeos)."})
         except Exception as e:
             self.queue.put({"type":"status","text":f"Error en detección: {e}"})
         finally:
             self.btn_detect["state"] = "normal"
             play_ui("click")
 
+    def _thread_map(self):
+        url = self.url_base.get().strip()
+        if not url:
+            messagebox.showwarning("Falta URL", "Escribe la URL base primero.")
+            return
+        self.btn_map["state"] = "disabled"
+        self._append_log("Mapeando IDs existentes (muestreo + refinado)...")
+        threading.Thread(target=self._map_background, daemon=True).start()
+
+    def _map_background(self):
+        url = self.url_base.get().strip()
+        carpeta = self.carpeta.get().strip() or "descargas"
+        try:
+            rell = int(self.relleno.get())
+        except:
+            rell = DEFAULT_RELLENO
+        try:
+            inicio = max(1, int(self.inicio_var.get()))
+        except Exception:
+            inicio = 1
+        fin_raw = self.fin_manual_var.get().strip()
+        fin = int(fin_raw) if fin_raw.isdigit() else None
+        self._configure_pool()
+        try:
+            m = map_range(url, rell, inicio=inicio, fin=fin, hilos=int(self.hilos.get()),
+                          stride=int(self.map_stride_var.get()), exts=parse_exts(self.exts_var.get()))
+            save_map(carpeta, m)
+            self.queue.put({"type":"detect","value":m["fin"]})
+            self.queue.put({"type":"status","text":f"Mapa: {m['count']} IDs existentes en {len(m['runs'])} tramos ({m['probes']} sondeos, {m['elapsed']}s)."})
+        except Exception as e:
+            self.queue.put({"type":"status","text":f"Error en mapeo: {e}"})
+        finally:
+            self.btn_map["state"] = "normal"
+            play_ui("click")
+
     def _thread_start(self):
         url = self.url_base.get().strip()
         carpeta = self.carpeta.get().strip() or "descargas"
@@ -807,6 +802,17 @@ class App(tb.Window if THEME_AVAILABLE else object):
             play_ui("err")
             return
 
+        indices = hints = None
+        if self.usar_mapa_var.get():
+            m = load_map(carpeta, url, rell)
+            if m is None:
+                self._append_log("No hay mapa de IDs para esta URL: se usa el rango completo.")
+            else:
+                hints = map_hints(m, inicio, fin_final)
+                indices = list(hints)
+                total = len(indices)
+                self._append_log(f"Usando mapa de IDs: {total} de {fin_final - inicio + 1} números del rango existen.")
+
         # ui prepare
         self.queue.put({"type":"progress","value":0,"max":total})
         self.btn_start["state"] = "disabled"
@@ -827,14 +833,183 @@ class App(tb.Window if THEME_AVAILABLE else object):
         # start runner
         self.stop_event.clear()
         self.pause_event.clear()
-        threading.Thread(target=self._run_downloads, args=(url, carpeta, inicio, fin_final, rell, hilos, reint), daemon=True).start()
+        threading.Thread(target=self._run_downloads, args=(url, carpeta, inicio, fin_final, rell, hilos, reint, indices, hints), daemon=True).start()
+        play_ui("click")
+
+    # -----------------------------
+    # Cola de trabajos
+    # -----------------------------
+    def _job_from_form(self):
+        """Trabajo (claves JOB_KEYS) con los valores del formulario; sin FIN manual se detecta al ejecutarlo."""
+        def entero(var, defecto):
+            try:
+                return int(var.get())
+            except Exception:
+                return defecto
+        fin = self.fin_manual_var.get().strip()
+        return {"url_base": self.url_base.get().strip(), "carpeta": self.carpeta.get().strip() or "descargas",
+                "relleno": entero(self.relleno, DEFAULT_RELLENO), "inicio": max(1, entero(self.inicio_var, 1)),
+                "fin": int(fin) if fin.isdigit() else None,
+                "hilos": entero(self.hilos, DEFAULT_HILOS), "reintentos": entero(self.reintentos, DEFAULT_REINTENTOS),
+                "hilos_det": entero(self.hilos_det_var, DEFAULT_HILOS_DET),
+                "lim_err": entero(self.lim_err_var, LIMITE_ERRORES), "motor": self.motor_var.get(),
+                "async_concurrencia": entero(self.async_conc_var, DEFAULT_ASYNC_CONCURRENCIA),
+                "usar_diario": bool(self.diario_var.get()), "reintentar_notfound": bool(self.reint_nf_var.get()),
+                "usar_mapa": bool(self.usar_mapa_var.get()), "map_stride": entero(self.map_stride_var, MAP_STRIDE),
+                "exts": ",".join(parse_exts(self.exts_var.get())), "prediccion": bool(self.prediccion_var.get()),
+                "adaptativo": bool(self.adaptativo_var.get()), "max_hilos": entero(self.max_hilos_var, DEFAULT_AIMD_MAX),
+                "segmentos": entero(self.segmentos_var, SEG_PARTES),
+                "seg_umbral_mb": entero(self.seg_umbral_var, SEG_UMBRAL // (1024 * 1024)),
+                "dedup": self.dedup_var.get(), "sincronizar": bool(self.sincronizar_var.get()),
+                "prioridad": max(1, entero(self.prioridad_var, DEFAULT_PRIORIDAD))}
+
+    def _enqueue_form(self):
+        job = self._job_from_form()
+        if not job["url_base"]:
+            messagebox.showwarning("Falta URL", "Escribe la URL base primero.")
+            return
+        job_id = self.jobs.add(job)
+        self._append_log(f"Trabajo #{job_id} encolado: {job['url_base']} (prioridad {job['prioridad']}).")
+        self._refresh_jobs()
+        play_ui("click")
+
+    def _selected_jobs(self):
+        return [int(i) for i in self.tree_jobs.selection()]
+
+    def _requeue_job(self):
+        for job_id in self._selected_jobs():
+            j = self.jobs.get(job_id)
+            if j is not None and j.get("estado") != ESTADO_ACTIVO:
+                self.jobs.requeue(job_id)
+        self._refresh_jobs()
+
+    def _stop_job(self):
+        if self.scheduler is not None:
+            for job_id in self._selected_jobs():
+                self.scheduler.stop_job(job_id)
+
+    def _remove_job(self):
+        for job_id in self._selected_jobs():
+            j = self.jobs.get(job_id)
+            if j is not None and j.get("estado") == ESTADO_ACTIVO:
+                continue   # primero "Detener trabajo"
+            self.jobs.remove(job_id)
+        self._refresh_jobs()
+
+    def _on_job_event(self, ev):
+        """Eventos del Scheduler (hilos de trabajo) -> bus de la GUI."""
+        t = ev.get("event")
+        if t in ("result", "status"):
+            item = {"type": "status", "text": f"[#{ev.get('job')}] {ev.get('text', '')}"}
+            if "status" in ev:
+                item["result"] = ev["status"]
+            self.queue.put(item)
+        elif t == "job_state":
+            self.queue.put({"type": "status", "text": f"Trabajo #{ev.get('job')}: {ev.get('estado')}"})
+            self.queue.put({"type": "jobs"})
+        elif t == "progress":
+            self.queue.put({"type": "jobs"})
+
+    def _toggle_queue(self):
+        if self.scheduler is None:
+            self._configure_rate_limits()
+            self._configure_log_writer()
+            configure_profiling(self.perfil_var.get(), bool(self.traza_var.get()))
+            try:
+                presupuesto, paralelo = int(self.presupuesto_var.get()), int(self.paralelo_var.get())
+            except Exception:
+                presupuesto, paralelo = DEFAULT_PRESUPUESTO, DEFAULT_MAX_TRABAJOS
+            self.scheduler = Scheduler(self.jobs, presupuesto=presupuesto, max_trabajos=paralelo,
+                                       on_event=self._on_job_event).start()
+            self.btn_cola["text"] = "Detener cola"
+            self.btn_cola_pausa["state"] = "normal"
+            self._append_log(f"Cola iniciada: {paralelo} trabajos a la vez, {presupuesto} elementos en vuelo en total.")
+        else:
+            self.scheduler.stop()
+            self.scheduler = None
+            self.btn_cola["text"] = "Iniciar cola"
+            self.btn_cola_pausa["state"] = "disabled"
+            self.btn_cola_pausa["text"] = "Pausar cola"
+            self._append_log("Cola detenida: los trabajos activos vuelven a pendiente.")
+        play_ui("click")
+
+    def _pause_queue(self):
+        if self.scheduler is None:
+            return
+        if not self.scheduler.pause_event.is_set():
+            configure_pause(self.pausa_inactivo_var.get())
+            self.scheduler.pause_event.set()
+            self.btn_cola_pausa["text"] = "Reanudar cola"
+        else:
+            self.scheduler.pause_event.clear()
+            self.btn_cola_pausa["text"] = "Pausar cola"
         play_ui("click")
 
+    def _refresh_jobs(self):
+        tree = self.tree_jobs
+        vistos = set()
+        for j in self.jobs.snapshot():
+            iid = str(j["id"])
+            vistos.add(iid)
+            prog = j.get("progreso")
+            valores = (j["id"], j.get("url_base", ""), f"{j.get('inicio', 1)}..{j.get('fin') or '?'}",
+                       j.get("carpeta", ""), j.get("prioridad", DEFAULT_PRIORIDAD), j.get("estado", ""),
+                       f"{prog[0]}/{prog[1]}" if prog else "")
+            if tree.exists(iid):
+                tree.item(iid, values=valores)
+            else:
+                tree.insert("", "end", iid=iid, values=valores)
+        for iid in tree.get_children():
+            if iid not in vistos:
+                tree.delete(iid)
+
+    def _refresh_net(self):
+        try:
+            visible = self.notebook.select()
+            if visible == str(self.tab_net):
+                self._paint_net(net_summary(net_stats(), ventana=True))
+            elif visible == str(self.tab_sound):
+                self._paint_sound(audio_stats())
+        finally:
+            self.root.after(UI_NET_MS, self._refresh_net)
+
+    def _paint_net(self, resumen):
+        tree = self.tree_net
+        def ms(v):
+            return f"{v:g}" if v is not None else "-"
+        estados = []
+        for netloc, r in sorted(resumen.items()):
+            v = r.get("ventana") or {}
+            valores = (netloc, r["peticiones"], v.get("req_s", 0), r["errores"], r["reintentos"], r["mb"],
+                       v.get("mb_s", 0), ms(r["connect_ms"]["p50"]),
+                       ms(v.get("ttfb_ms", r["ttfb_ms"])["p50"]), ms(v.get("ttfb_ms", r["ttfb_ms"])["p90"]),
+                       ms(v.get("transfer_ms", r["transfer_ms"])["p50"]))
+            if tree.exists(netloc):
+                tree.item(netloc, values=valores)
+            else:
+                tree.insert("", "end", iid=netloc, values=valores)
+            codigos = ", ".join(f"{c}: {n}" for c, n in sorted(r["estados"].items()))
+            if codigos:
+                estados.append(f"{netloc} — {codigos}")
+        for iid in tree.get_children():
+            if iid not in resumen:
+                tree.delete(iid)
+        self.net_estados_var.set("Códigos de estado: " + (" | ".join(estados) if estados else "-"))
+
+    def _paint_sound(self, st):
+        estado = "sin reproductor de audio" if st["disabled"] else ("silenciado" if st["muted"] else "activo")
+        self.sound_stats_var.set(f"Audio {estado} — reproducidos: {st['played']}, agrupados: {st['coalesced']}, "
+                                 f"limitados: {st['throttled']}, descartados (cola llena): {st['dropped']}")
+
     def _pause(self):
         if not self.pause_event.is_set():
+            try:
+                configure_pause(self.pausa_inactivo_var.get())
+            except Exception:
+                configure_pause(PAUSA_INACTIVO)
             self.pause_event.set()
             self.btn_pause["text"] = "Reanudar"
-            self._append_log("Pausado por el usuario.")
+            self._append_log("Pausado por el usuario: no se envían nuevas descargas y las activas se detienen.")
             play_ui("click")
         else:
             self.pause_event.clear()
@@ -843,55 +1018,78 @@ class App(tb.Window if THEME_AVAILABLE else object):
             play_ui("click")
 
     def _stop(self):
-        self._append_log("Solicitud de detención enviada. Esperando tareas activas...")
+        self._append_log("Solicitud de detención enviada: se cancelan los pendientes y se abortan las descargas activas...")
         self.stop_event.set()
         self.btn_stop["state"] = "disabled"
         play_ui("click")
 
-    def _run_downloads(self, url_base, carpeta, inicio, fin, relleno, hilos, reintentos):
-        os.makedirs(carpeta, exist_ok=True)
-        log_txt = os.path.join(carpeta, "download.log.txt")
-        log_json = os.path.join(carpeta, "download.log.jsonl")
-        bases = [f"{url_base}{str(i).zfill(relleno)}" for i in range(inicio, fin+1)]
-
-        total = len(bases)
-        completed = 0
-        errores_seguidos = 0
-
-        with ThreadPoolExecutor(max_workers=hilos) as ex:
-            futures = {ex.submit(worker_job, b, carpeta, reintentos, self.pausa_min_var.get(), self.pausa_max_var.get()): b for b in bases}
-            for fut in as_completed(futures):
-                try:
-                    res = fut.result()
-                except Exception as e:
-                    res = f"ERROR EXCEPCION: {e}\n{traceback.format_exc()}"
-
-                completed += 1
-                self.queue.put({"type":"progress","value":completed,"max":total})
-                self.queue.put({"type":"status","text":res})
-
-                if res.startswith("NOTFOUND") or "BLOCKED" in res or res.startswith("HTTP_"):
-                    errores_seguidos += 1
-                else:
-                    errores_seguidos = 0
-
-                if errores_seguidos >= self.lim_err_var.get():
-                    self.queue.put({"type": "status", "text": f"⚠ Muchos errores seguidos ({errores_seguidos}) — pausa de emergencia {PAUSA_EMERGENCIA}s"})
-                    time.sleep(PAUSA_EMERGENCIA)
-                    errores_seguidos = 0
+    def _configure_pool(self, hilos=None):
+        try:
+            hilos = int(hilos if hilos is not None else self.hilos.get())
+        except Exception:
+            hilos = DEFAULT_HILOS
+        try:
+            hilos_det = int(self.hilos_det_var.get())
+        except Exception:
+            hilos_det = DEFAULT_HILOS_DET
+        try:
+            maxsize = int(self.pool_maxsize_var.get())
+        except Exception:
+            maxsize = POOL_MAXSIZE
+        return configure_pool(hilos=hilos, hilos_det=hilos_det, maxsize=maxsize, block=bool(self.pool_block_var.get()))
 
-                while self.pause_event.is_set():
-                    time.sleep(0.5)
-                    if self.stop_event.is_set():
-                        break
+    def _configure_rate_limits(self):
+        try:
+            rps = float(self.rate_rps_var.get())
+        except Exception:
+            rps = DEFAULT_RATE_RPS
+        try:
+            burst = int(self.rate_burst_var.get())
+        except Exception:
+            burst = DEFAULT_RATE_BURST
+        return configure_rate_limits(rps=rps, burst=burst, por_host=parse_host_limits(self.limites_host_var.get()))
 
-                if self.stop_event.is_set():
-                    self._append_log("Detención solicitada: esperando a que terminen tareas activas.")
-                    # continue looping until futures finish
-                    pass
+    def _configure_log_writer(self):
+        try:
+            flush_interval = float(self.log_flush_var.get())
+        except Exception:
+            flush_interval = LOG_FLUSH_INTERVAL
+        try:
+            max_bytes = int(self.log_max_mb_var.get()) * 1024 * 1024
+        except Exception:
+            max_bytes = LOG_MAX_BYTES
+        configure_log_writer(flush_interval=flush_interval, durability=self.log_durab_var.get(), max_bytes=max_bytes)
 
-        append_log_txt(log_txt, "==== FIN DE SESIÓN ====")
-        append_log_json(log_json, {"event":"finish","timestamp":time.time()})
+    def _run_downloads(self, url_base, carpeta, inicio, fin, relleno, hilos, reintentos, indices=None, ext_hints=None):
+        adaptativo = bool(self.adaptativo_var.get())
+        try:
+            max_hilos = int(self.max_hilos_var.get())
+        except Exception:
+            max_hilos = DEFAULT_AIMD_MAX
+        # el pool debe admitir tantas conexiones como la ventana pueda llegar a abrir
+        self._configure_pool(max(hilos, max_hilos) if adaptativo else hilos)
+        self._configure_rate_limits()
+        self._configure_log_writer()
+        configure_profiling(self.perfil_var.get(), bool(self.traza_var.get()))
+        try:
+            conc = int(self.async_conc_var.get())
+        except Exception:
+            conc = DEFAULT_ASYNC_CONCURRENCIA
+        try:
+            procesos = int(self.procesos_var.get())
+        except Exception:
+            procesos = DEFAULT_PROCESOS
+        # con varios procesos, run_sharded reparte el rango (mismos eventos en self.queue)
+        ejecutar = partial(run_sharded, procesos=procesos) if procesos > 1 else run_downloads
+        ejecutar(url_base, carpeta, inicio, fin, relleno, hilos, reintentos, self.queue.put,
+                 lim_err=self.lim_err_var.get(), motor=self.motor_var.get(), async_concurrencia=conc,
+                 stop_event=self.stop_event, pause_event=self.pause_event,
+                 usar_diario=bool(self.diario_var.get()), reintentar_notfound=bool(self.reint_nf_var.get()),
+                 indices=indices, exts=parse_exts(self.exts_var.get()),
+                 prediccion=bool(self.prediccion_var.get()), ext_hints=ext_hints,
+                 adaptativo=adaptativo, max_hilos=max_hilos,
+                 segmentos=int(self.segmentos_var.get()), seg_umbral=int(self.seg_umbral_var.get()) * 1024 * 1024,
+                 dedup=self.dedup_var.get(), sincronizar=bool(self.sincronizar_var.get()))
         self.btn_start["state"] = "normal"
         self.btn_stop["state"] = "disabled"
         self.btn_pause["state"] = "disabled"
@@ -909,9 +1107,37 @@ class App(tb.Window if THEME_AVAILABLE else object):
             "hilos": int(self.hilos.get()),
             "reintentos": int(self.reintentos.get()),
             "hilos_det": int(self.hilos_det_var.get()),
-            "pausa_min": float(self.pausa_min_var.get()),
-            "pausa_max": float(self.pausa_max_var.get()),
+            "rate_rps": float(self.rate_rps_var.get()),
+            "rate_burst": int(self.rate_burst_var.get()),
+            "limites_host": parse_host_limits(self.limites_host_var.get()),
             "lim_err": int(self.lim_err_var.get()),
+            "pool_maxsize": int(self.pool_maxsize_var.get()),
+            "pool_block": bool(self.pool_block_var.get()),
+            "motor": self.motor_var.get(),
+            "async_concurrencia": int(self.async_conc_var.get()),
+            "sonido_mute": bool(self.mute_var.get()),
+            "log_durability": self.log_durab_var.get(),
+            "log_flush_interval": float(self.log_flush_var.get()),
+            "log_max_mb": int(self.log_max_mb_var.get()),
+            "usar_diario": bool(self.diario_var.get()),
+            "reintentar_notfound": bool(self.reint_nf_var.get()),
+            "detect_cache_ttl": float(self.det_cache_h_var.get()) * 3600,
+            "usar_mapa": bool(self.usar_mapa_var.get()),
+            "map_stride": int(self.map_stride_var.get()),
+            "exts": ",".join(parse_exts(self.exts_var.get())),
+            "prediccion": bool(self.prediccion_var.get()),
+            "adaptativo": bool(self.adaptativo_var.get()),
+            "max_hilos": int(self.max_hilos_var.get()),
+            "segmentos": int(self.segmentos_var.get()),
+            "seg_umbral_mb": int(self.seg_umbral_var.get()),
+            "pausa_inactivo": float(self.pausa_inactivo_var.get()),
+            "procesos": int(self.procesos_var.get()),
+            "dedup": self.dedup_var.get(),
+            "sincronizar": bool(self.sincronizar_var.get()),
+            "perfil": self.perfil_var.get(),
+            "traza": bool(self.traza_var.get()),
+            "presupuesto": int(self.presupuesto_var.get()),
+            "paralelo": int(self.paralelo_var.get()),
             "inicio": int(self.inicio_var.get()) if self.inicio_var.get().strip().isdigit() else 1,
             "fin_manual": self.fin_manual_var.get().strip()
         })
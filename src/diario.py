@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - diario de completado (1 byte por número de secuencia, fichero mmap)
+- Estados: desconocido / video hecho / imagen hecha / no encontrado / bloqueado
+- Permite saltar índices terminados o ausentes en O(1) sin stat() al disco
+- rebuild_journal() lo reconstruye desde videos/ e imagenes/ con un os.scandir por carpeta
+  (acepta cualquier extensión, no solo mp4/jpg)
+"""
+import os
+import mmap
+import struct
+import hashlib
+import threading
+
+ESTADO_DESCONOCIDO = 0
+ESTADO_VIDEO = 1
+ESTADO_IMG = 2
+ESTADO_NOTFOUND = 3
+ESTADO_BLOCKED = 4
+
+ESTADOS_HECHOS = (ESTADO_VIDEO, ESTADO_IMG)
+
+JOURNAL_MAGIC = b"PDJ1"
+JOURNAL_HEADER = struct.Struct("<4sIQ")   # magic, versión, reservado
+JOURNAL_GROW = 64 * 1024                  # crecimiento mínimo (índices)
+
+def journal_path(carpeta, url_base, relleno):
+    """Un diario por (url_base, relleno) dentro de la carpeta destino."""
+    key = hashlib.sha1(f"{url_base}|{relleno}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(carpeta, f".journal_{key}.bin")
+
+def state_from_result(res):
+    """Estado del diario a partir del texto devuelto por worker_job (None = no registrar)."""
+    if res.startswith("VIDEO OK") or res.startswith("SKIP (video"):
+        return ESTADO_VIDEO
+    if res.startswith("IMG OK") or res.startswith("SKIP (img"):
+        return ESTADO_IMG
+    if res.startswith("NOTFOUND"):
+        return ESTADO_NOTFOUND
+    if "BLOCKED" in res:
+        return ESTADO_BLOCKED
+    return None
+
+class CompletionJournal:
+    """Array de bytes mapeado en memoria e indexado por número de secuencia."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.created = not os.path.exists(path)
+        if self.created:
+            with open(path, "wb") as f:
+                f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, 1, 0))
+                f.truncate(JOURNAL_HEADER.size + JOURNAL_GROW)
+        self._f = open(path, "r+b")
+        magic, _, _ = JOURNAL_HEADER.unpack(self._f.read(JOURNAL_HEADER.size))
+        if magic != JOURNAL_MAGIC:
+            self._f.close()
+            raise ValueError(f"diario inválido: {path}")
+        self._mm = mmap.mmap(self._f.fileno(), 0)
+
+    @property
+    def capacity(self):
+        return len(self._mm) - JOURNAL_HEADER.size
+
+    def _grow(self, index):
+        size = JOURNAL_HEADER.size + max(index + 1, self.capacity * 2, JOURNAL_GROW)
+        self._mm.flush()
+        self._mm.close()
+        self._f.truncate(size)
+        self._mm = mmap.mmap(self._f.fileno(), 0)
+
+    def get(self, index):
+        with self._lock:
+            if index < 0 or index >= self.capacity:
+                return ESTADO_DESCONOCIDO
+            return self._mm[JOURNAL_HEADER.size + index]
+
+    def mark(self, index, estado):
+        with self._lock:
+            if index >= self.capacity:
+                self._grow(index)
+            self._mm[JOURNAL_HEADER.size + index] = estado
+
+    def reserve(self, index):
+        """Agranda el fichero hasta index de una vez (antes de compartirlo entre procesos)."""
+        with self._lock:
+            if index >= self.capacity:
+                self._grow(index)
+
+    def states(self, inicio, fin):
+        """bytes con el estado de inicio..fin (inclusive), de una sola lectura."""
+        with self._lock:
+            a = JOURNAL_HEADER.size + max(0, inicio)
+            b = JOURNAL_HEADER.size + min(fin + 1, self.capacity)
+            out = self._mm[a:b] if b > a else b""
+        return out + bytes(max(0, (fin - inicio + 1) - len(out)))
+
+    def counts(self, inicio=0, fin=None):
+        data = self.states(inicio, self.capacity - 1 if fin is None else fin)
+        return {"video": data.count(ESTADO_VIDEO), "img": data.count(ESTADO_IMG),
+                "notfound": data.count(ESTADO_NOTFOUND), "blocked": data.count(ESTADO_BLOCKED)}
+
+    def clear(self):
+        with self._lock:
+            self._mm[JOURNAL_HEADER.size:] = bytes(self.capacity)
+
+    def flush(self):
+        with self._lock:
+            self._mm.flush()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._mm.flush()
+                self._mm.close()
+            finally:
+                self._f.close()
+
+def open_journal(carpeta, url_base, relleno, rebuild_if_new=True):
+    """Abre (o crea) el diario de la serie. Si es nuevo, lo siembra desde las carpetas."""
+    os.makedirs(carpeta, exist_ok=True)
+    j = CompletionJournal(journal_path(carpeta, url_base, relleno))
+    if j.created and rebuild_if_new:
+        rebuild_journal(carpeta, url_base, relleno, journal=j)
+    return j
+
+def rebuild_journal(carpeta, url_base, relleno, journal=None):
+    """Reconstruye los estados video/imagen desde videos/ e imagenes/ (un os.scandir por carpeta).
+    Los estados notfound/blocked se descartan. Devuelve {"video": n, "img": m}."""
+    own = journal is None
+    j = journal or CompletionJournal(journal_path(carpeta, url_base, relleno))
+    prefix = os.path.basename(url_base)
+    found = {"video": 0, "img": 0}
+    try:
+        j.clear()
+        for sub, estado, key in (("videos", ESTADO_VIDEO, "video"), ("imagenes", ESTADO_IMG, "img")):
+            try:
+                it = os.scandir(os.path.join(carpeta, sub))
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    name = entry.name
+                    # cualquier extensión configurada: <prefijo><número>.<ext>, salvo los .part a medias
+                    if not name.startswith(prefix) or name.endswith(".part"):
+                        continue
+                    num, punto, ext = name[len(prefix):].partition(".")
+                    if not punto or not ext or len(num) < relleno or not num.isdigit():
+                        continue
+                    i = int(num)
+                    if estado == ESTADO_IMG and j.get(i) == ESTADO_VIDEO:
+                        continue   # con video e imagen a la vez, manda el video
+                    j.mark(i, estado)
+                    found[key] += 1
+        j.flush()
+    finally:
+        if own:
+            j.close()
+    return found
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - deduplicación por contenido (hash → ruta) dentro de una carpeta destino
+- El hash (sha256) se calcula mientras el cuerpo pasa por el stream; solo los segmentados
+  o reanudados con 416 se releen del disco al terminar
+- Índice persistente .dedup_index.jsonl (solo se añade): hash → ruta relativa y tamaño, y
+  host|ETag|tamaño → hash para reconocer contenido conocido antes de bajar el cuerpo
+- Un duplicado se sustituye por un enlace duro al original ("enlace") o no se guarda ("omitir");
+  si el sistema de ficheros no admite enlaces se conserva la copia
+- Varios procesos (fragmentos.py) comparten el fichero: cada uno lee lo que añadieron los demás
+"""
+import os
+import json
+import hashlib
+import threading
+
+DEDUP_NO = "no"
+DEDUP_ENLACE = "enlace"      # el duplicado queda como enlace duro al original
+DEDUP_OMITIR = "omitir"      # el duplicado no se guarda (solo consta en el índice y en el log)
+DEDUP_MODOS = (DEDUP_NO, DEDUP_ENLACE, DEDUP_OMITIR)
+DEFAULT_DEDUP = DEDUP_NO      # opt-in: --dedup enlace|omitir o la opción de la GUI
+DEDUP_INDEX_FILE = ".dedup_index.jsonl"
+DEDUP_HASH = "sha256"
+DEDUP_READ = 1024 * 1024
+
+def new_hasher():
+    return hashlib.new(DEDUP_HASH)
+
+def hash_file(path, hasher=None):
+    """Añade el contenido de path a hasher (o a uno nuevo) leyendo por bloques; devuelve el hasher."""
+    h = hasher or new_hasher()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(DEDUP_READ)
+            if not b:
+                break
+            h.update(b)
+    return h
+
+def etag_fuerte(headers):
+    """ETag utilizable como identidad del contenido (las débiles W/ no garantizan bytes iguales)."""
+    etag = (headers or {}).get("ETag") or ""
+    return etag.strip() if etag and not etag.strip().startswith("W/") else None
+
+def _enlazar(orig, destino):
+    """destino pasa a ser un enlace duro a orig (vía temporal + replace: nunca queda a medias)."""
+    tmp = destino + ".lnk"
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+    os.link(orig, tmp)
+    os.replace(tmp, destino)
+
+class IndiceAnexado:
+    """Fichero .jsonl de una carpeta al que solo se añade; la última línea de cada clave manda.
+    Thread-safe; entre procesos se sincroniza releyendo lo que añadieron los demás.
+    Las subclases interpretan cada registro en _cargar(rec)."""
+
+    def __init__(self, carpeta, nombre):
+        self.carpeta = carpeta
+        self.path = os.path.join(carpeta, nombre)
+        self._lock = threading.Lock()
+        self._offset = 0
+
+    def _cargar(self, rec):
+        raise NotImplementedError
+
+    def _rel(self, path):
+        return os.path.relpath(path, self.carpeta)
+
+    def _sync(self):
+        """Lee las líneas añadidas desde la última vez (por este u otros procesos)."""
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return
+        fin = data.rfind(b"\n") + 1     # una línea a medio escribir se lee en el siguiente _sync
+        self._offset += fin
+        for raw in data[:fin].splitlines():
+            try:
+                self._cargar(json.loads(raw))
+            except Exception:
+                continue
+
+    def _append(self, rec):
+        line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)   # una sola escritura en O_APPEND: no se mezcla con otros procesos
+        finally:
+            os.close(fd)
+
+class DedupIndex(IndiceAnexado):
+    """Índice de contenido de una carpeta (hash -> ruta y host|ETag|tamaño -> hash)."""
+
+    def __init__(self, carpeta, modo=DEFAULT_DEDUP):
+        super().__init__(carpeta, DEDUP_INDEX_FILE)
+        self.modo = modo
+        self._hashes = {}     # hash -> (ruta relativa, tamaño, mtime_ns)
+        self._etags = {}      # "host|etag|tamaño" -> hash
+        self.stats = {"unicos": 0, "enlazados": 0, "omitidos": 0, "por_etag": 0, "copias": 0, "bytes_ahorrados": 0}
+        with self._lock:
+            self._sync()
+
+    def _cargar(self, rec):
+        if "e" in rec:
+            self._etags[rec["e"]] = rec["h"]
+        elif "h" in rec:
+            self._hashes[rec["h"]] = (rec["p"], int(rec.get("s", -1)), rec.get("m"))
+
+    def _original(self, digest, size):
+        """Ruta absoluta del contenido digest si sigue en disco sin cambios (tamaño y mtime):
+        un fichero reemplazado después (re-sincronización) ya no cuenta como ese contenido."""
+        known = self._hashes.get(digest)
+        if known is None:
+            return None
+        orig = os.path.join(self.carpeta, known[0])
+        try:
+            st = os.stat(orig)
+        except OSError:
+            return None
+        if st.st_size != size or (known[2] is not None and st.st_mtime_ns != known[2]):
+            return None
+        return orig
+
+    @staticmethod
+    def _clave(host, etag, size):
+        return f"{host}|{etag}|{size}"
+
+    def por_etag(self, host, etag, size):
+        """Original ya descargado con ese ETag y tamaño (antes de pedir el cuerpo) o None."""
+        if not etag or not size or self.modo == DEDUP_NO:
+            return None
+        with self._lock:
+            digest = self._etags.get(self._clave(host, etag, size))
+            if digest is None:
+                self._sync()
+                digest = self._etags.get(self._clave(host, etag, size))
+            return self._original(digest, size) if digest else None
+
+    def materializar(self, orig, destino, size):
+        """Contenido reconocido por ETag: crea destino sin descargar (enlace o nada). True si se hizo."""
+        try:
+            if self.modo == DEDUP_ENLACE:
+                _enlazar(orig, destino)
+            with self._lock:
+                self.stats["por_etag"] += 1
+                self.stats["enlazados" if self.modo == DEDUP_ENLACE else "omitidos"] += 1
+                self.stats["bytes_ahorrados"] += size
+            return True
+        except OSError:
+            return False
+
+    def registrar(self, destino, digest, host=None, etag=None):
+        """destino ya está completo: si su contenido es conocido se enlaza u omite y se devuelve
+        el original; si no, se añade al índice y se devuelve None."""
+        size = os.path.getsize(destino)
+        with self._lock:
+            self._sync()
+            orig = self._original(digest, size)
+            if etag and size and self._etags.get(self._clave(host, etag, size)) != digest:
+                self._etags[self._clave(host, etag, size)] = digest
+                self._append({"e": self._clave(host, etag, size), "h": digest})
+            if orig is None or os.path.abspath(orig) == os.path.abspath(destino):
+                rel = self._rel(destino)
+                mtime = os.stat(destino).st_mtime_ns
+                self._hashes[digest] = (rel, size, mtime)
+                self._append({"h": digest, "p": rel, "s": size, "m": mtime})
+                self.stats["unicos"] += 1
+                return None
+        try:
+            if os.path.samefile(orig, destino):
+                return orig
+            if self.modo == DEDUP_OMITIR:
+                os.remove(destino)
+            else:
+                _enlazar(orig, destino)
+        except OSError:
+            with self._lock:
+                self.stats["copias"] += 1   # sin enlaces (FAT, otro volumen...): se queda la copia
+            return None
+        with self._lock:
+            self.stats["omitidos" if self.modo == DEDUP_OMITIR else "enlazados"] += 1
+            self.stats["bytes_ahorrados"] += size
+        return orig
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+_INDICES = {}
+_INDICES_LOCK = threading.Lock()
+
+def open_index(carpeta, modo=DEFAULT_DEDUP):
+    """Índice de la carpeta (uno por proceso y carpeta); None si modo es DEDUP_NO."""
+    if modo not in (DEDUP_ENLACE, DEDUP_OMITIR):
+        return None
+    key = os.path.abspath(carpeta)
+    with _INDICES_LOCK:
+        idx = _INDICES.get(key)
+        if idx is None:
+            idx = _INDICES[key] = DedupIndex(carpeta, modo)
+        idx.modo = modo
+        return idx
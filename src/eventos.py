@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - bus de eventos para la GUI (sustituye a App.queue)
+- put(dict) con la misma forma que los eventos de run_downloads; nunca bloquea al productor
+- progress / fileprogress / aimd / rate / detect: solo cuenta el último valor (coalescing)
+- status: líneas (con su result ok/skip/... si lo trae) en una cola acotada; si se llena se descartan las más viejas y se resume cuántas
+- drain() entrega todo lo pendiente de una vez para pintarlo en un solo tick
+"""
+import time
+import threading
+from collections import deque
+
+BUS_MAX_LINES = 5000        # líneas de estado pendientes como máximo (el resto ya está en download.log.txt)
+BUS_COALESCE = ("progress", "fileprogress", "aimd", "rate", "detect")
+
+class EventBus:
+    """Productores en cualquier hilo, un único consumidor (el tick de Tk)."""
+
+    def __init__(self, max_lines=BUS_MAX_LINES):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._lines = deque()
+        self.max_lines = max(1, int(max_lines))
+        self._dropped = 0
+        self.stats = {"events": 0, "coalesced": 0, "lines": 0, "dropped": 0}
+
+    def put(self, item):
+        t = item.get("type")
+        with self._lock:
+            self.stats["events"] += 1
+            if t in BUS_COALESCE:
+                if t in self._latest:
+                    self.stats["coalesced"] += 1
+                self._latest[t] = item
+                return
+            if t == "status":
+                if len(self._lines) >= self.max_lines:
+                    self._lines.popleft()
+                    self._dropped += 1
+                    self.stats["dropped"] += 1
+                self._lines.append((time.time(), item.get("text", ""), item.get("result")))
+                self.stats["lines"] += 1
+                return
+            # tipos desconocidos: se conservan como el último de su clase
+            self._latest[t] = item
+
+    # compatibilidad con queue.Queue (App.queue.put / empty)
+    put_nowait = put
+
+    def empty(self):
+        with self._lock:
+            return not self._latest and not self._lines and not self._dropped
+
+    def drain(self, max_lines=None):
+        """(últimos valores por tipo, [(ts, texto, result), ...], líneas descartadas desde el último drain).
+        Con max_lines, el resto de líneas queda para el siguiente tick."""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            if max_lines is None or len(self._lines) <= max_lines:
+                lines, self._lines = list(self._lines), deque()
+            else:
+                lines = [self._lines.popleft() for _ in range(max_lines)]
+            dropped, self._dropped = self._dropped, 0
+        return latest, lines, dropped
+
+    def pending(self):
+        with self._lock:
+            return len(self._lines)
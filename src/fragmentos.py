@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - ejecución repartida en varios procesos (rangos muy grandes)
+- run_sharded: mismo contrato que run_downloads (emit, stop_event, pause_event, resumen) pero con
+  N procesos hijos, cada uno con su GIL, su pool HTTP y su escritor de logs
+- El coordinador trocea [inicio, fin] (o los índices de un mapa) en fragmentos de tamaño decreciente
+  (grandes al principio, pequeños al final) y los sirve desde una cola: el proceso que acaba pide el
+  siguiente, así un fragmento lento no deja parados a los demás al final del rango
+- Si un proceso muere, su fragmento vuelve a la cola (el diario salta lo que ya hizo)
+- Los hijos devuelven progreso, líneas de resultado y ventanas AIMD por lotes; el coordinador los
+  suma y los emite como si fuera una sola sesión
+- También su telemetría de red: el coordinador la publica (net_stats() de la GUI y de /metrics la ve)
+"""
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+from collections import deque
+
+from nucleo import (
+    DEFAULT_AIMD_MAX, DEFAULT_ASYNC_CONCURRENCIA, MOTOR_ASYNC, DEFAULT_MOTOR,
+    configure_pool, configure_rate_limits, configure_log_writer, configure_pause, rate_limits_config,
+    append_log_json, append_log_txt, flush_logs, run_downloads,
+)
+from diario import open_journal
+from telemetria import net_export, net_publish, net_merge, net_summary, format_summary
+from perfil import configure_profiling, profiling_config, profile_session
+
+DEFAULT_PROCESOS = 1       # 1 = todo en este proceso (run_downloads normal)
+SHARD_MIN = 256            # índices mínimos por fragmento
+SHARD_MAX = 20000          # ...y máximos (acota lo que se repite si un proceso muere)
+SHARD_FACTOR = 2           # fragmento = restante / (factor * procesos)
+SHARD_EV_BATCH = 256       # líneas por mensaje de un hijo al coordinador
+SHARD_EV_SECS = 0.2        # ...o cada N segundos
+SHARD_POLL = 0.2
+SHARD_NET_SECS = 1.0       # cada cuánto manda un hijo su telemetría de red
+
+_SESIONES = itertools.count()
+
+def procesos_disponibles():
+    return os.cpu_count() or 1
+
+def plan_fragmentos(inicio, fin, procesos, indices=None, minimo=SHARD_MIN, maximo=SHARD_MAX):
+    """Genera (lo, hi, indices|None): ceil(restante / (SHARD_FACTOR*procesos)) acotado a [minimo, maximo]."""
+    total = len(indices) if indices is not None else max(0, fin - inicio + 1)
+    hecho = 0
+    while hecho < total:
+        n = -(-(total - hecho) // (SHARD_FACTOR * max(1, procesos)))
+        n = min(max(n, minimo), maximo, total - hecho)
+        if indices is None:
+            yield inicio + hecho, inicio + hecho + n - 1, None
+        else:
+            sub = indices[hecho:hecho + n]
+            yield sub[0], sub[-1], sub
+        hecho += n
+
+def _reparto(valor, n, minimo=1):
+    return max(minimo, -(-int(valor) // n))
+
+def _limites_por_proceso(n):
+    """El límite de peticiones es por host y por proceso: cada hijo se queda con 1/n."""
+    cfg = rate_limits_config()
+
+    def parte(lim):
+        lim = dict(lim)
+        if lim.get("rps"):
+            lim["rps"] = float(lim["rps"]) / n
+        if "burst" in lim:
+            lim["burst"] = _reparto(lim["burst"], n)
+        return lim
+    base = parte({"rps": cfg["rps"], "burst": cfg["burst"]})
+    return {"rps": base["rps"], "burst": base["burst"],
+            "por_host": {h: parte(v) for h, v in cfg["por_host"].items()}}
+
+# -----------------------------
+# Proceso hijo
+# -----------------------------
+class _Emisor:
+    """emit() de un hijo: progreso/aimd/rate solo el último valor, líneas de resultado por lotes."""
+    REENVIAR = ("progress", "aimd", "rate")
+
+    def __init__(self, salida, wid):
+        self.salida = salida
+        self.wid = wid
+        self.cid = None
+        self._lineas = []
+        self._ultimos = {}
+        self._t = time.monotonic()
+        self._t_red = 0.0
+
+    def emit(self, item):
+        t = item.get("type")
+        if t in self.REENVIAR:
+            self._ultimos[t] = item
+        elif t == "status" and ("result" in item or item.get("text", "").startswith("⚠")):
+            self._lineas.append(item)
+        else:
+            return   # resúmenes por fragmento (pool, predicción...): el coordinador da el suyo
+        if len(self._lineas) >= SHARD_EV_BATCH or time.monotonic() - self._t >= SHARD_EV_SECS:
+            self.flush()
+
+    def flush(self, red=False):
+        if red or time.monotonic() - self._t_red >= SHARD_NET_SECS:
+            self._ultimos["net"] = net_export()
+            self._t_red = time.monotonic()
+        if self._lineas or self._ultimos:
+            self.salida.put(("ev", self.wid, self.cid, self._lineas, self._ultimos))
+            self._lineas, self._ultimos = [], {}
+        self._t = time.monotonic()
+
+def _worker_main(wid, ajustes, tareas, salida, cancelar, pausa):
+    """Bucle de un hijo: pide fragmentos hasta recibir None o la cancelación."""
+    configure_pool(hilos=ajustes["pool"], hilos_det=1)
+    configure_rate_limits(**ajustes["rate"])
+    configure_log_writer(**ajustes["log"])
+    configure_pause(ajustes["pausa_inactivo"])
+    configure_profiling(**ajustes["perfil"])
+    emisor = _Emisor(salida, wid)
+    try:
+        # un perfil por hijo para todos sus fragmentos (los run_downloads de dentro se suman a él)
+        with profile_session(ajustes["run"]["carpeta"], f"shard-{wid}") as perfil:
+            _servir_fragmentos(wid, ajustes, tareas, salida, cancelar, pausa, emisor)
+        if perfil.ficheros:
+            salida.put(("perfil", wid, perfil.ficheros))
+    finally:
+        flush_logs()
+        salida.put(("exit", wid))
+
+def _servir_fragmentos(wid, ajustes, tareas, salida, cancelar, pausa, emisor):
+    while not cancelar.is_set():
+        try:
+            tarea = tareas.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if tarea is None:
+            break
+        cid, lo, hi, indices, hints = tarea
+        emisor.cid = cid
+        salida.put(("start", wid, cid))
+        try:
+            resumen = run_downloads(inicio=lo, fin=hi, indices=indices, ext_hints=hints, emit=emisor.emit,
+                                    stop_event=cancelar, pause_event=pausa, **ajustes["run"])
+        except Exception as e:
+            emisor.flush()
+            salida.put(("error", wid, cid, str(e)))
+            continue
+        emisor.flush(red=True)
+        salida.put(("chunk", wid, cid, resumen))
+
+# -----------------------------
+# Coordinador
+# -----------------------------
+def run_sharded(url_base, carpeta, inicio, fin, relleno, hilos, reintentos, emit, procesos=DEFAULT_PROCESOS,
+                stop_event=None, pause_event=None, indices=None, ext_hints=None, **opciones):
+    """run_downloads repartido en `procesos` procesos (spawn). opciones son las de run_downloads salvo
+    cupo (un FairBudget no cruza procesos). hilos, max_hilos, la concurrencia async y los límites
+    por host se dividen entre los hijos: el total que ve cada origen no cambia.
+    Devuelve el resumen sumado de todos los fragmentos."""
+    stop_event = stop_event or threading.Event()
+    pause_event = pause_event or threading.Event()
+    procesos = max(1, int(procesos))
+    indices = None if indices is None else sorted(set(indices))
+    total = len(indices) if indices is not None else max(0, fin - inicio + 1)
+    resumen = {"ok": 0, "skip": 0, "notfound": 0, "blocked": 0, "cancelled": 0, "error": 0}
+    if not total:
+        resumen["total"] = 0
+        return resumen
+    procesos = min(procesos, -(-total // SHARD_MIN))
+    os.makedirs(carpeta, exist_ok=True)
+    log_txt = os.path.join(carpeta, "download.log.txt")
+    log_json = os.path.join(carpeta, "download.log.jsonl")
+    if opciones.get("usar_diario", True):
+        # se crea (y se siembra desde el disco) una sola vez y con sitio hasta el final del rango:
+        # así ningún hijo tiene que agrandar el fichero mientras los demás lo tienen mapeado
+        try:
+            j = open_journal(carpeta, url_base, relleno)
+            j.reserve(indices[-1] if indices is not None else fin)
+            j.close()
+        except Exception as e:
+            emit({"type":"status","text":f"Diario no disponible ({e}): se comprueba el disco por archivo."})
+
+    adaptativo = opciones.get("adaptativo", True)
+    hilos_p = _reparto(hilos, procesos)
+    max_hilos_p = _reparto(opciones.get("max_hilos") or DEFAULT_AIMD_MAX, procesos)
+    run = dict(opciones, url_base=url_base, carpeta=carpeta, relleno=relleno, hilos=hilos_p, reintentos=reintentos,
+               max_hilos=max_hilos_p,
+               async_concurrencia=_reparto(opciones.get("async_concurrencia") or DEFAULT_ASYNC_CONCURRENCIA, procesos))
+    run.pop("cupo", None)
+    writer = configure_log_writer()
+    ajustes = {"run": run, "rate": _limites_por_proceso(procesos),
+               "pool": max(hilos_p, max_hilos_p) if adaptativo else hilos_p,
+               # los hijos no rotan: varios procesos renombrando el mismo log se pisarían
+               "log": {"flush_interval": writer.flush_interval, "durability": writer.durability, "max_bytes": 0},
+               "pausa_inactivo": configure_pause(None), "perfil": profiling_config()}
+
+    ctx = mp.get_context("spawn")
+    tareas, salida = ctx.Queue(), ctx.Queue()
+    cancelar, pausa = ctx.Event(), ctx.Event()
+    workers = {wid: ctx.Process(target=_worker_main, args=(wid, ajustes, tareas, salida, cancelar, pausa),
+                                name=f"shard-{wid}", daemon=True) for wid in range(procesos)}
+    for p in workers.values():
+        p.start()
+    motor = opciones.get("motor", DEFAULT_MOTOR)
+    emit({"type":"status","text":f"Modo repartido: {procesos} procesos, {hilos_p} hilos"
+                                 f"{' (máx. ' + str(max_hilos_p) + ')' if adaptativo else ''} cada uno"
+                                 f"{' con motor asyncio' if motor == MOTOR_ASYNC else ''}."})
+    append_log_json(log_json, {"event":"sharded_start","url_base":url_base,"relleno":relleno,"inicio":inicio,"fin":fin,
+                               "procesos":procesos,"total":total,"timestamp":time.time()})
+
+    plan = enumerate(plan_fragmentos(inicio, fin, procesos, indices))
+    fragmentos = {}          # cid -> tarea, hasta que llega su resumen
+    asignado = {}            # wid -> cid en curso
+    hechos = {}              # cid -> elementos completados (progreso del fragmento)
+    reencolar = deque()
+    agotado = False
+    en_cola = 0
+    reasignados = 0
+    vivos = set(workers)
+    ultimos = {"aimd": {}, "rate": {}, "net": {}}
+    sesion = next(_SESIONES)
+    ultimo_progreso = -1
+    fin_enviado = False
+
+    def alimentar():
+        nonlocal agotado, en_cola
+        while en_cola < 2 * procesos and not cancelar.is_set():
+            if reencolar:
+                tarea = reencolar.popleft()
+            elif not agotado:
+                try:
+                    cid, (lo, hi, sub) = next(plan)
+                except StopIteration:
+                    agotado = True
+                    continue
+                hints = {i: ext_hints[i] for i in sub if i in ext_hints} if sub is not None and ext_hints else None
+                tarea = (cid, lo, hi, sub, hints)
+                fragmentos[cid] = tarea
+            else:
+                return
+            tareas.put(tarea)
+            en_cola += 1
+
+    def progreso():
+        nonlocal ultimo_progreso
+        hecho = sum(hechos.values())
+        if hecho != ultimo_progreso:
+            ultimo_progreso = hecho
+            emit({"type":"progress","value":hecho,"max":total})
+
+    alimentar()
+    try:
+        while vivos:
+            if stop_event.is_set() and not cancelar.is_set():
+                cancelar.set()
+                emit({"type":"status","text":"Detención solicitada: pendientes cancelados, abortando descargas activas (.part conservados)."})
+            if pause_event.is_set() != pausa.is_set():
+                (pausa.set if pause_event.is_set() else pausa.clear)()
+            if agotado and not fragmentos and not fin_enviado:
+                for _ in vivos:
+                    tareas.put(None)
+                fin_enviado = True
+            try:
+                msg = salida.get(timeout=SHARD_POLL)
+            except queue.Empty:
+                for wid in [w for w in vivos if not workers[w].is_alive()]:
+                    # murió sin despedirse: su fragmento vuelve a la cola
+                    vivos.discard(wid)
+                    cid = asignado.pop(wid, None)
+                    if cid in fragmentos and not cancelar.is_set():
+                        hechos.pop(cid, None)
+                        reencolar.append(fragmentos[cid])
+                        reasignados += 1
+                        emit({"type":"status","text":f"⚠ Proceso {wid} terminó inesperadamente (código {workers[wid].exitcode}): fragmento {cid} reasignado."})
+                        alimentar()
+                if not vivos and fragmentos and not cancelar.is_set():
+                    emit({"type":"status","text":"⚠ No queda ningún proceso: fragmentos sin completar."})
+                continue
+            kind, wid = msg[0], msg[1]
+            if kind == "ev":
+                _, _, cid, lineas, ult = msg
+                for item in lineas:
+                    emit(item)
+                if "progress" in ult:
+                    hechos[cid] = ult["progress"].get("value", 0)
+                    progreso()
+                for t in ("aimd", "rate", "net"):
+                    if t in ult:
+                        ultimos[t][wid] = ult[t]
+                if "net" in ult:
+                    net_publish((sesion, wid), ult["net"])
+                if "aimd" in ult:
+                    a = ultimos["aimd"].values()
+                    emit({"type":"aimd","window":sum(x.get("window", 0) for x in a),
+                          "inflight":sum(x.get("inflight", 0) for x in a),"max":sum(x.get("max", 0) for x in a),
+                          "reason":ult["aimd"].get("reason", "")})
+                if "rate" in ult:
+                    r = ultimos["rate"].values()
+                    emit(dict(ult["rate"], rps=round(sum(x.get("rps", 0) for x in r), 2),
+                              achieved=round(sum(x.get("achieved", 0) for x in r), 2),
+                              waits=sum(x.get("waits", 0) for x in r)))
+            elif kind == "start":
+                asignado[wid] = msg[2]
+                en_cola -= 1
+                alimentar()
+            elif kind in ("chunk", "error"):
+                cid = msg[2]
+                asignado.pop(wid, None)
+                tarea = fragmentos.pop(cid, None)
+                if kind == "chunk":
+                    for k, v in msg[3].items():
+                        if k in resumen:
+                            resumen[k] += v
+                    hechos[cid] = msg[3].get("total", 0)
+                elif tarea is not None:
+                    n = len(tarea[3]) if tarea[3] is not None else tarea[2] - tarea[1] + 1
+                    resumen["error"] += n
+                    hechos[cid] = n
+                    emit({"type":"status","text":f"ERROR fragmento {tarea[1]}..{tarea[2]}: {msg[3]}","result":"error"})
+                progreso()
+            elif kind == "perfil":
+                emit({"type":"status","text":f"Perfil del proceso {wid}: " + ", ".join(os.path.basename(p) for p in msg[2])})
+            elif kind == "exit":
+                vivos.discard(wid)
+    except KeyboardInterrupt:
+        cancelar.set()
+        raise
+    finally:
+        if not cancelar.is_set() and vivos:
+            cancelar.set()
+        tareas.cancel_join_thread()
+        for p in workers.values():
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        detenido = stop_event.is_set()
+
+    completados = sum(v for k, v in resumen.items() if k != "total")
+    if detenido or resumen["cancelled"]:
+        emit({"type":"status","text":f"Detenido: {resumen['cancelled']} descargas abortadas, "
+                                     f"{total - completados} elementos sin empezar."})
+    emit({"type":"status","text":f"Modo repartido: {len(hechos)} fragmentos en {procesos} procesos"
+                                 f"{f', {reasignados} reasignados' if reasignados else ''}."})
+    red = net_summary(net_merge(*ultimos["net"].values()))
+    for netloc in sorted(red):
+        emit({"type":"status","text":format_summary(netloc, red[netloc])})
+    append_log_txt(log_txt, "==== FIN DE SESIÓN (repartida) ====")
+    append_log_json(log_json, {"event":"sharded_finish","procesos":procesos,"fragmentos":len(hechos),
+                               "reasignados":reasignados,"resumen":dict(resumen),"red":red,"timestamp":time.time()})
+    flush_logs()
+    resumen["total"] = total
+    return resumen
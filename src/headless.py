@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - modo headless / batch (sin tkinter, ttkbootstrap ni sonidos)
+- Un trabajo por línea de comandos o varios desde un job file (JSON: objeto o lista)
+- Si no se da --fin, se detecta con detect_range_mixto
+- Progreso legible por máquina: una línea JSON por evento en stdout
+- Cola persistente (trabajos.py): --encolar añade, --cola ejecuta varias series a la vez
+- Telemetría de red en vivo (telemetria.py): --metricas PUERTO sirve /metrics (Prometheus) y /metrics.json
+- Perfilado (perfil.py): --perfil cprofile|muestreo y --traza escriben perfil_* junto a los logs
+Run:
+    python headless.py https://host/ruta/img_ --inicio 1 --fin 500 --hilos 16
+    python headless.py --job trabajos.json
+    python headless.py https://host/ruta/img_ --fin 5000000 --procesos 8 --hilos 64   # varios procesos
+    python headless.py https://host/ruta/img_ --fin 500 --sincronizar                  # solo lo que cambió
+    python headless.py https://host/a/img_ --fin 900 --prioridad 2 --encolar   # a la cola persistente
+    python headless.py --cola --paralelo 4 --presupuesto 32                      # vaciar la cola
+    python headless.py https://host/ruta/img_ --fin 500 --metricas 9108          # curl localhost:9108/metrics
+    python headless.py https://host/ruta/img_ --fin 500 --perfil muestreo --traza  # .folded + .trace.json
+"""
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+from nucleo import (
+    DEFAULT_RELLENO, DEFAULT_HILOS, DEFAULT_HILOS_DET, DEFAULT_REINTENTOS,
+    DEFAULT_RATE_RPS, DEFAULT_RATE_BURST, SEG_PARTES, SEG_UMBRAL, LIMITE_ERRORES, DETECT_CACHE_TTL, POOL_MAXSIZE,
+    MOTOR_HILOS, MOTOR_ASYNC, DEFAULT_MOTOR, DEFAULT_ASYNC_CONCURRENCIA, DEFAULT_AIMD_MAX,
+    LOG_FLUSH_INTERVAL, LOG_MAX_BYTES, DEFAULT_LOG_DURABILITY,
+    LOG_DURABILITY_NONE, LOG_DURABILITY_INTERVAL, LOG_DURABILITY_SESSION, DEFAULT_EXTS,
+    configure_log_writer, configure_rate_limits, parse_host_limits,
+)
+from mapa import MAP_STRIDE
+from trabajos import (
+    JOB_KEYS, JOBS_FILE, DEFAULT_PRESUPUESTO, DEFAULT_MAX_TRABAJOS, DEFAULT_PRIORIDAD,
+    ESTADO_ERROR, load_jobs, run_job as _run_job, JobStore, Scheduler,
+)
+from fragmentos import DEFAULT_PROCESOS
+from duplicados import DEDUP_MODOS, DEFAULT_DEDUP
+from telemetria import METRICS_HOST, start_metrics_server
+from perfil import PROFILE_MODOS, PROFILE_NO, PROFILE_SAMPLE_MS, configure_profiling
+
+# -----------------------------
+# Output (JSON lines)
+# -----------------------------
+_OUT_LOCK = threading.Lock()
+
+def emit_json(obj):
+    obj.setdefault("ts", round(time.time(), 3))
+    line = json.dumps(obj, ensure_ascii=False)
+    with _OUT_LOCK:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+def run_job(job, job_id=0, stop_event=None):
+    """Ejecuta un trabajo (dict con claves JOB_KEYS) escribiendo sus eventos como JSON lines."""
+    return _run_job(job, job_id=job_id, out=emit_json, stop_event=stop_event)
+
+def run_queue(store, presupuesto=DEFAULT_PRESUPUESTO, paralelo=DEFAULT_MAX_TRABAJOS, defaults=None):
+    """Vacía la cola persistente con el Scheduler (varias series a la vez). Devuelve el código de salida."""
+    defaults = defaults or {}
+    limites = defaults.get("limites_host") or {}
+    configure_rate_limits(rps=float(defaults.get("rate_rps", DEFAULT_RATE_RPS)),
+                          burst=int(defaults.get("rate_burst", DEFAULT_RATE_BURST)),
+                          por_host=parse_host_limits(limites) if isinstance(limites, str) else limites)
+    configure_log_writer(flush_interval=float(defaults.get("log_flush_interval", LOG_FLUSH_INTERVAL)),
+                         durability=defaults.get("log_durability", DEFAULT_LOG_DURABILITY),
+                         max_bytes=int(defaults.get("log_max_mb", LOG_MAX_BYTES // (1024 * 1024))) * 1024 * 1024)
+    emit_json({"event": "queue_start", "pending": len(store.pending()), "presupuesto": presupuesto, "paralelo": paralelo})
+    sched = Scheduler(store, presupuesto=presupuesto, max_trabajos=paralelo, on_event=emit_json, hasta_vaciar=True)
+    try:
+        sched.start().join()
+    except KeyboardInterrupt:
+        # los activos vuelven a pendiente; un segundo Ctrl+C sale sin esperar (como un trabajo suelto)
+        emit_json({"event": "interrupted"})
+        try:
+            sched.stop(wait=True)
+        except KeyboardInterrupt:
+            sys.stdout.flush()
+            os._exit(130)
+        return 130
+    errores = [j["id"] for j in store.snapshot() if j.get("estado") == ESTADO_ERROR]
+    emit_json({"event": "queue_finish", "errors": errores})
+    return 2 if errores else 0
+
+# -----------------------------
+# CLI
+# -----------------------------
+def build_parser():
+    p = argparse.ArgumentParser(description="Downloader PRO sin GUI: progreso en JSON lines por stdout.")
+    p.add_argument("url_base", nargs="?", help="URL base (sin número ni extensión)")
+    p.add_argument("--job", help="job file JSON (objeto, lista o {'jobs': [...]}); los flags hacen de valores por defecto")
+    p.add_argument("--carpeta", default="descargas")
+    p.add_argument("--relleno", type=int, default=DEFAULT_RELLENO)
+    p.add_argument("--inicio", type=int, default=1)
+    p.add_argument("--fin", type=int, default=None, help="último número (si se omite, se detecta)")
+    p.add_argument("--hilos", type=int, default=DEFAULT_HILOS)
+    p.add_argument("--hilos-det", dest="hilos_det", type=int, default=DEFAULT_HILOS_DET)
+    p.add_argument("--max-hilos", dest="max_hilos", type=int, default=DEFAULT_AIMD_MAX,
+                   help="techo de la ventana adaptativa (--hilos es la ventana inicial)")
+    p.add_argument("--sin-adaptativo", dest="adaptativo", action="store_false",
+                   help="concurrencia fija en --hilos con pausa de emergencia tras --lim-err errores")
+    p.add_argument("--reintentos", type=int, default=DEFAULT_REINTENTOS)
+    p.add_argument("--segmentos", type=int, default=SEG_PARTES,
+                   help="rangos en paralelo para archivos grandes (1 = un solo flujo)")
+    p.add_argument("--segmentar-mb", dest="seg_umbral_mb", type=int, default=SEG_UMBRAL // (1024 * 1024),
+                   help="tamaño a partir del que se segmenta")
+    p.add_argument("--rps", dest="rate_rps", type=float, default=DEFAULT_RATE_RPS,
+                   help="peticiones por segundo por host (0 = sin límite)")
+    p.add_argument("--rafaga", dest="rate_burst", type=int, default=DEFAULT_RATE_BURST)
+    p.add_argument("--limites-host", dest="limites_host", default=None,
+                   help="límites propios por host: 'host=req/s[/ráfaga], ...'")
+    p.add_argument("--lim-err", dest="lim_err", type=int, default=LIMITE_ERRORES)
+    p.add_argument("--motor", choices=(MOTOR_HILOS, MOTOR_ASYNC), default=DEFAULT_MOTOR)
+    p.add_argument("--concurrencia", dest="async_concurrencia", type=int, default=DEFAULT_ASYNC_CONCURRENCIA,
+                   help="elementos en vuelo con --motor asyncio")
+    p.add_argument("--dedup", choices=DEDUP_MODOS, default=DEFAULT_DEDUP,
+                   help="contenido repetido: enlace duro al original, omitir la copia o no deduplicar")
+    p.add_argument("--sincronizar", action="store_true",
+                   help="revalidar lo ya descargado (ETag/Last-Modified) y bajar solo lo que cambió")
+    p.add_argument("--procesos", type=int, default=DEFAULT_PROCESOS,
+                   help="repartir el rango entre N procesos (rangos muy grandes; hilos y límites se dividen)")
+    p.add_argument("--pool-maxsize", dest="pool_maxsize", type=int, default=POOL_MAXSIZE)
+    p.add_argument("--log-durability", dest="log_durability", default=DEFAULT_LOG_DURABILITY,
+                   choices=(LOG_DURABILITY_NONE, LOG_DURABILITY_INTERVAL, LOG_DURABILITY_SESSION))
+    p.add_argument("--log-flush", dest="log_flush_interval", type=float, default=LOG_FLUSH_INTERVAL,
+                   help="segundos entre escrituras por lotes de los logs")
+    p.add_argument("--log-max-mb", dest="log_max_mb", type=int, default=LOG_MAX_BYTES // (1024 * 1024),
+                   help="rotar los logs al superar este tamaño (0 = nunca)")
+    p.add_argument("--sin-diario", dest="usar_diario", action="store_false",
+                   help="no usar el diario de completado (comprobar el disco por archivo)")
+    p.add_argument("--reintentar-notfound", dest="reintentar_notfound", action="store_true")
+    p.add_argument("--mapa", action="store_true",
+                   help="mapear los IDs existentes (series con huecos) y descargar solo esos")
+    p.add_argument("--usar-mapa", dest="usar_mapa", action="store_true", help="reutilizar el mapa guardado")
+    p.add_argument("--stride", dest="map_stride", type=int, default=MAP_STRIDE, help="paso de muestreo del mapa")
+    p.add_argument("--exts", default=",".join(DEFAULT_EXTS),
+                   help="extensiones a probar separadas por comas (vídeos a videos/, el resto a imagenes/)")
+    p.add_argument("--sin-prediccion", dest="prediccion", action="store_false",
+                   help="probar siempre las extensiones en el orden dado, sin aprender de los aciertos")
+    p.add_argument("--cache-deteccion", dest="detect_cache_ttl", type=float, default=DETECT_CACHE_TTL,
+                   help="segundos que vale un fin detectado en caché (0 = re-sondear hacia delante siempre)")
+    p.add_argument("--reconstruir-diario", dest="reconstruir_diario", action="store_true",
+                   help="reconstruir el diario desde videos/ e imagenes/ antes de descargar")
+    p.add_argument("--encolar", action="store_true",
+                   help="añadir el trabajo (o los del --job) a la cola persistente y salir")
+    p.add_argument("--cola", action="store_true",
+                   help="ejecutar los trabajos pendientes de la cola, varios a la vez")
+    p.add_argument("--fichero-cola", dest="fichero_cola", default=JOBS_FILE, help="cola persistente de trabajos")
+    p.add_argument("--prioridad", type=int, default=DEFAULT_PRIORIDAD,
+                   help="peso del trabajo en la cola (2 = el doble de cupo que 1)")
+    p.add_argument("--metricas", type=int, default=None, metavar="PUERTO",
+                   help="servir la telemetría de red en http://127.0.0.1:PUERTO/metrics (y /metrics.json)")
+    p.add_argument("--metricas-host", dest="metricas_host", default=METRICS_HOST,
+                   help="interfaz del endpoint de métricas (0.0.0.0 = accesible desde fuera)")
+    p.add_argument("--perfil", choices=PROFILE_MODOS, default=PROFILE_NO,
+                   help="perfilar cada sesión: cprofile (.prof/.txt) o muestreo de pilas (.folded)")
+    p.add_argument("--traza", action="store_true",
+                   help="tramos probe/get/download/body/write/log en .trace.json (Perfetto, chrome://tracing)")
+    p.add_argument("--muestreo-ms", dest="muestreo_ms", type=int, default=PROFILE_SAMPLE_MS,
+                   help="intervalo del perfil por muestreo")
+    p.add_argument("--paralelo", type=int, default=DEFAULT_MAX_TRABAJOS, help="trabajos de la cola a la vez")
+    p.add_argument("--presupuesto", type=int, default=DEFAULT_PRESUPUESTO,
+                   help="elementos en vuelo entre todos los trabajos de la cola")
+    return p
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    defaults = {k: v for k, v in vars(args).items() if k in JOB_KEYS and v is not None}
+    if args.job:
+        try:
+            jobs = [dict(defaults, **j) for j in load_jobs(args.job)]
+        except Exception as e:
+            emit_json({"event": "error", "text": f"job file inválido: {e}"})
+            return 2
+    elif args.url_base:
+        jobs = [defaults]
+    elif args.cola:
+        jobs = []
+    else:
+        build_parser().print_usage(sys.stderr)
+        return 2
+
+    if args.metricas is not None and not (args.encolar and not args.cola):
+        try:
+            srv = start_metrics_server(args.metricas, args.metricas_host)
+        except OSError as e:
+            emit_json({"event": "error", "text": f"endpoint de métricas no disponible: {e}"})
+            return 2
+        host, puerto = srv.server_address[:2]
+        emit_json({"event": "metrics", "url": f"http://{host}:{puerto}/metrics"})
+
+    configure_profiling(args.perfil, args.traza, args.muestreo_ms)
+
+    if args.encolar or args.cola:
+        store = JobStore(args.fichero_cola)
+        for job in jobs:
+            try:
+                job_id = store.add(job)
+            except ValueError as e:
+                emit_json({"event": "error", "text": str(e)})
+                return 2
+            emit_json({"event": "queued", "job": job_id, "url_base": job.get("url_base"),
+                       "prioridad": job.get("prioridad", DEFAULT_PRIORIDAD)})
+        if not args.cola:
+            return 0
+        return run_queue(store, presupuesto=args.presupuesto, paralelo=args.paralelo, defaults=defaults)
+
+    stop_event = threading.Event()
+    rc = 0
+    try:
+        for i, job in enumerate(jobs):
+            try:
+                run_job(job, job_id=i, stop_event=stop_event)
+            except ValueError as e:
+                emit_json({"event": "error", "job": i, "text": str(e)})
+                rc = 2
+    except KeyboardInterrupt:
+        stop_event.set()
+        emit_json({"event": "interrupted"})
+        sys.stdout.flush()
+        os._exit(130)
+    return rc
+
+if __name__ == "__main__":
+    sys.exit(main())
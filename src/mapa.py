@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - mapa de IDs existentes para series con huecos
+- Muestreo concurrente cada `stride` números y refinado solo alrededor de los aciertos
+- Índice compacto: tramos [inicio, fin, ext] guardados en la carpeta destino
+- run_downloads puede consumir el índice en lugar de range(inicio, fin+1)
+"""
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from nucleo import DEFAULT_EXTS, DEFAULT_HILOS, MAX_DETECT, head_ok
+
+MAP_STRIDE = 16          # un sondeo cada N números en la pasada de muestreo
+MAP_GAP_LIMIT = 8        # muestras seguidas sin acierto que cierran un mapeo sin fin conocido
+MAP_MAX = MAX_DETECT * 50
+MAP_EXTS = DEFAULT_EXTS
+
+def map_path(carpeta, url_base, relleno):
+    key = hashlib.sha1(f"{url_base}|{relleno}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(carpeta, f".mapa_{key}.json")
+
+def _probe_ext(url_base, relleno, i, exts):
+    s = str(i).zfill(relleno)
+    for ext in exts:
+        if head_ok(f"{url_base}{s}.{ext}"):
+            return ext
+    return None
+
+def _to_runs(found):
+    """{id: ext} -> [[a, b, ext], ...] con tramos consecutivos de la misma extensión."""
+    runs = []
+    for i in sorted(found):
+        ext = found[i]
+        if runs and runs[-1][1] == i - 1 and runs[-1][2] == ext:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i, ext])
+    return runs
+
+def map_range(url_base, relleno, inicio=1, fin=None, hilos=DEFAULT_HILOS, stride=MAP_STRIDE,
+              gap_limit=MAP_GAP_LIMIT, max_busqueda=MAP_MAX, exts=MAP_EXTS, progress=None, stop_event=None):
+    """Mapea qué IDs existen en inicio..fin (o hasta gap_limit muestras vacías si fin es None).
+    Un tramo de más de `stride` números sin ningún acierto alrededor se asume vacío:
+    stride menor = más precisión y más sondeos.
+    progress(probados, descubiertos) opcional. Devuelve el dict del mapa (ver save_map)."""
+    stride = max(1, int(stride))
+    abierto = fin is None
+    tope = max_busqueda if abierto else fin
+    found = {}
+    probed = set()
+    t0 = time.time()
+
+    with ThreadPoolExecutor(max_workers=max(1, int(hilos))) as ex:
+        def probe(ids):
+            ids = [i for i in ids if i not in probed and inicio <= i <= tope]
+            probed.update(ids)
+            for i, ext in zip(ids, ex.map(lambda i: _probe_ext(url_base, relleno, i, exts), ids)):
+                if ext:
+                    found[i] = ext
+            if progress:
+                try:
+                    progress(len(probed), len(found))
+                except Exception:
+                    pass
+
+        # 1) muestreo
+        muestras = []
+        if not abierto:
+            muestras = list(range(inicio, fin + 1, stride))     # vacío si fin < inicio: mapa vacío
+            if muestras and muestras[-1] != fin:
+                muestras.append(fin)
+            lote = max(1, int(hilos)) * 4
+            for a in range(0, len(muestras), lote):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                probe(muestras[a:a + lote])
+        else:
+            pos, vacias = inicio, 0
+            while vacias < gap_limit and pos <= max_busqueda:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                lote = [pos + j * stride for j in range(max(1, int(hilos))) if pos + j * stride <= max_busqueda]
+                probe(lote)
+                muestras.extend(lote)
+                for m in lote:
+                    vacias = 0 if m in found else vacias + 1
+                pos = lote[-1] + stride
+
+        # 2) refinado: todo ID a menos de `stride` de un acierto se sondea; se repite con los
+        #    nuevos aciertos, así una región densa se cubre aunque alguna muestra cayera en un hueco
+        lote = max(1, int(hilos)) * 4
+        frente = [m for m in muestras if m in found]
+        while frente and not (stop_event is not None and stop_event.is_set()):
+            candidatos = set()
+            for i in frente:
+                candidatos.update(range(max(inicio, i - stride), min(tope, i + stride) + 1))
+            candidatos = sorted(candidatos - probed)
+            previos = set(found)
+            for a in range(0, len(candidatos), lote):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                probe(candidatos[a:a + lote])
+            frente = [i for i in found if i not in previos]
+
+    if abierto:
+        fin = max(found) if found else inicio
+    return {"url_base": url_base, "relleno": relleno, "inicio": inicio, "fin": fin, "stride": stride,
+            "exts": list(exts), "ts": time.time(), "elapsed": round(time.time() - t0, 3),
+            "probes": len(probed), "count": len(found), "runs": _to_runs(found)}
+
+def save_map(carpeta, mapa):
+    os.makedirs(carpeta, exist_ok=True)
+    path = map_path(carpeta, mapa["url_base"], mapa["relleno"])
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(mapa, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+def load_map(carpeta, url_base, relleno):
+    try:
+        with open(map_path(carpeta, url_base, relleno), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def map_hints(mapa, inicio=None, fin=None):
+    """{id: ext} del mapa: run_downloads lo usa para ir directo a GET con la extensión conocida."""
+    return dict(iter_map(mapa, inicio, fin))
+
+def iter_map(mapa, inicio=None, fin=None):
+    """Genera (id, ext) del mapa, opcionalmente recortado a inicio..fin."""
+    for a, b, ext in mapa.get("runs", []):
+        if inicio is not None:
+            a = max(a, inicio)
+        if fin is not None:
+            b = min(b, fin)
+        for i in range(a, b + 1):
+            yield i, ext
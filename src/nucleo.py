@@ -0,0 +1,2411 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - núcleo sin GUI
+- Config, logs, pool HTTP, detección mixta, descargas con resume, motores hilos/asyncio
+- No importa tkinter/ttkbootstrap ni el código de sonido: lo usan la GUI (codigo.py)
+  y el modo headless (headless.py)
+"""
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import os
+import time
+import json
+import math
+import random
+import threading
+import traceback
+import queue
+import atexit
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from diario import ESTADO_NOTFOUND, ESTADOS_HECHOS, open_journal, state_from_result
+from duplicados import DEFAULT_DEDUP, new_hasher, hash_file, etag_fuerte, open_index
+from sincro import open_store, validadores, if_range, condicionales
+from telemetria import net_observe, net_transfer, net_retry, net_export, net_diff, net_summary, format_summary
+from perfil import profile_session, span, trazado, trazando, EscrituraTrazada
+
+import asyncio
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except Exception:
+    AIOHTTP_AVAILABLE = False
+
+# -----------------------------
+# GLOBALS / DEFAULTS
+# -----------------------------
+APP_NAME = "Downloader PRO"
+CONFIG_FILE = "downloader_config.json"
+
+DEFAULT_RELLENO = 4
+DEFAULT_HILOS = 10
+DEFAULT_HILOS_DET = 3
+DEFAULT_REINTENTOS = 4
+
+DEFAULT_RATE_RPS = 25.0   # peticiones/s por host (0 = sin límite); sustituye a las pausas por archivo
+DEFAULT_RATE_BURST = 10   # peticiones que pueden salir seguidas tras un rato inactivo
+RATE_JITTER = 0.5         # jitter aleatorio, en fracciones del intervalo 1/rps
+RATE_WINDOW = 10.0        # s sobre los que se mide la tasa conseguida
+RATE_REPORT_INTERVAL = 2.0
+SEG_PARTES = 4                   # rangos en paralelo para archivos grandes (1 = desactivado)
+SEG_UMBRAL = 32 * 1024 * 1024    # bytes a partir de los que se segmenta
+SEG_MIN = 4 * 1024 * 1024        # tamaño mínimo de cada segmento
+SEG_CHUNK = 256 * 1024
+SEG_SAVE_EVERY = 4 * 1024 * 1024 # bytes entre guardados del estado de un segmento
+STREAM_CHUNK_MIN = 64 * 1024          # primera lectura y mínimo del chunk adaptativo
+STREAM_CHUNK_MAX = 4 * 1024 * 1024    # tope del chunk adaptativo (= tamaño del buffer reutilizado)
+STREAM_CHUNK_SECS = 0.075             # lectura objetivo: el chunk se duplica si tarda menos y se reduce si tarda
+                                      # más del doble (pausa, stop y progreso se miran entre lecturas)
+STREAM_PROGRESS_BYTES = 1024 * 1024   # progress_callback como mucho cada N bytes...
+STREAM_PROGRESS_SECS = 0.25           # ...o cada N segundos
+PAUSA_EMERGENCIA = 5
+PAUSA_INACTIVO = 30.0                 # segundos en pausa antes de cerrar las conexiones de las descargas activas
+LIMITE_ERRORES = 10
+TIMEOUT_BASE = (8, 30)
+MAX_DETECT = 2000
+DETECT_CACHE_FILE = "detect_cache.json"
+DETECT_CACHE_TTL = 6 * 3600   # s durante los que se confía en un fin detectado sin volver a sondear
+DETECT_WINDOW = 10            # ventana final ±N verificada en paralelo
+POOL_MAXSIZE = 0          # conexiones keep-alive por host (0 = auto: max(hilos, hilos_det))
+POOL_BLOCK = False        # True: esperar conexión libre en vez de abrir una extra
+DEFAULT_AIMD_MAX = 64     # techo de la ventana adaptativa (hilos en vuelo por host)
+AIMD_BACKOFF = 0.5        # factor de reducción ante 429/403, timeouts o TTFB disparado
+AIMD_COOLDOWN = 0.5       # s mínimos entre dos reducciones (una ráfaga de 429 cuenta una vez)
+AIMD_TTFB_FACTOR = 3.0    # TTFB medio > factor * mejor TTFB visto => congestión
+AIMD_EWMA = 0.2           # suavizado del TTFB medio
+MOTOR_HILOS = "hilos"
+MOTOR_ASYNC = "asyncio"
+DEFAULT_MOTOR = MOTOR_HILOS
+DEFAULT_ASYNC_CONCURRENCIA = 500
+ASYNC_CHUNK = 64 * 1024
+DEFAULT_EXTS = ("mp4", "jpg")           # orden de prueba por defecto
+VIDEO_EXTS = ("mp4", "webm", "mov", "mkv", "m4v", "avi")   # van a videos/; el resto a imagenes/
+PRED_VECINOS = 8          # índices a cada lado que cuentan como vecinos para la predicción
+PRED_RECIENTES = 512      # aciertos recientes recordados por serie
+PRED_MIN_MUESTRAS = 8     # aciertos antes de fiarse lo bastante como para saltar el HEAD
+PRED_UMBRAL_GET = 0.85    # confianza mínima para ir directo a GET sin HEAD
+LOG_QUEUE_MAX = 20000          # líneas en memoria antes de aplicar backpressure
+LOG_FLUSH_INTERVAL = 0.5       # s entre escrituras por lotes
+LOG_PUT_TIMEOUT = 2.0          # s que espera un worker con la cola llena antes de descartar
+LOG_BATCH_MAX = 4096           # líneas pendientes que fuerzan escritura antes del intervalo
+LOG_MAX_BYTES = 64 * 1024 * 1024   # rotación por tamaño (0 = sin rotar)
+LOG_BACKUPS = 5
+LOG_DURABILITY_NONE = "none"           # sin fsync
+LOG_DURABILITY_INTERVAL = "interval"   # fsync tras cada lote
+LOG_DURABILITY_SESSION = "session"     # fsync al terminar la sesión
+DEFAULT_LOG_DURABILITY = LOG_DURABILITY_SESSION
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:123.0) Gecko/20100101 Firefox/123.0",
+    "Mozilla/5.0 (Linux; Android 11; SM-A505F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0 Mobile Safari/537.36",
+]
+
+# -----------------------------
+# Utils: config persistence
+# -----------------------------
+def load_config():
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_config(cfg):
+    try:
+        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=2)
+    except Exception:
+        pass
+
+# -----------------------------
+# Logging helpers (escritor asíncrono por lotes)
+# -----------------------------
+class LogWriter:
+    """Un hilo escritor con cola acotada: agrupa líneas por fichero, escribe por lotes
+    cada flush_interval, mantiene los ficheros abiertos y rota por tamaño.
+    Si la cola está llena el llamador espera put_timeout (backpressure) y luego descarta."""
+
+    def __init__(self, maxsize=LOG_QUEUE_MAX, flush_interval=LOG_FLUSH_INTERVAL,
+                 durability=DEFAULT_LOG_DURABILITY, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+                 put_timeout=LOG_PUT_TIMEOUT):
+        self._q = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._files = {}
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.put_timeout = put_timeout
+        self.stats = {"lines": 0, "batches": 0, "backpressured": 0, "dropped": 0, "rotations": 0, "errors": 0}
+
+    def configure(self, flush_interval=None, durability=None, max_bytes=None, backups=None):
+        if flush_interval is not None:
+            self.flush_interval = max(0.01, float(flush_interval))
+        if durability in (LOG_DURABILITY_NONE, LOG_DURABILITY_INTERVAL, LOG_DURABILITY_SESSION):
+            self.durability = durability
+        if max_bytes is not None:
+            self.max_bytes = max(0, int(max_bytes))
+        if backups is not None:
+            self.backups = max(0, int(backups))
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+
+    def write(self, path, text):
+        self._ensure_thread()
+        try:
+            self._q.put_nowait(("line", path, text))
+            return True
+        except queue.Full:
+            self.stats["backpressured"] += 1
+        try:
+            self._q.put(("line", path, text), timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+
+    def flush(self, fsync=False, release=False, timeout=10.0):
+        """Barrera: espera a que todo lo encolado antes esté escrito.
+        fsync fuerza a disco; release cierra los ficheros (p.ej. antes de borrarlos)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._q.put(("flush", done, fsync, release))
+        return done.wait(timeout)
+
+    def end_session(self):
+        return self.flush(fsync=self.durability != LOG_DURABILITY_NONE)
+
+    def _run(self):
+        pending = {}
+        n_pending = 0
+        last = time.monotonic()
+        while True:
+            wait = max(0.0, self.flush_interval - (time.monotonic() - last))
+            try:
+                item = self._q.get(timeout=wait)
+            except queue.Empty:
+                item = None
+            while item is not None:
+                if item[0] == "line":
+                    pending.setdefault(item[1], []).append(item[2])
+                    n_pending += 1
+                    if n_pending >= LOG_BATCH_MAX:
+                        break
+                else:
+                    _, done, fsync, release = item
+                    self._write_pending(pending, fsync=fsync)
+                    last = time.monotonic()
+                    n_pending = 0
+                    if release:
+                        self._close_files()
+                    done.set()
+                try:
+                    item = self._q.get_nowait()
+                except queue.Empty:
+                    item = None
+            if n_pending and (n_pending >= LOG_BATCH_MAX or time.monotonic() - last >= self.flush_interval):
+                self._write_pending(pending, fsync=self.durability == LOG_DURABILITY_INTERVAL)
+                n_pending = 0
+                last = time.monotonic()
+
+    def _write_pending(self, pending, fsync=False):
+        for path, lines in pending.items():
+            if not lines:
+                continue
+            try:
+                with span("log", "disco", os.path.basename(path)):
+                    f = self._files.get(path)
+                    if f is None:
+                        f = open(path, "a", encoding="utf-8")
+                        self._files[path] = f
+                    f.write("".join(lines))
+                    f.flush()
+                    if fsync:
+                        os.fsync(f.fileno())
+                    self.stats["lines"] += len(lines)
+                    self.stats["batches"] += 1
+                    if self.max_bytes and f.tell() >= self.max_bytes:
+                        self._rotate(path)
+            except Exception:
+                self.stats["errors"] += 1
+                self._close_file(path)
+        pending.clear()
+
+    def _rotate(self, path):
+        self._close_file(path)
+        try:
+            if self.backups <= 0:
+                os.remove(path)
+            else:
+                for i in range(self.backups - 1, 0, -1):
+                    if os.path.exists(f"{path}.{i}"):
+                        os.replace(f"{path}.{i}", f"{path}.{i+1}")
+                os.replace(path, f"{path}.1")
+            self.stats["rotations"] += 1
+        except Exception:
+            self.stats["errors"] += 1
+
+    def _close_file(self, path):
+        f = self._files.pop(path, None)
+        if f is not None:
+            try:
+                f.close()
+            except Exception:
+                pass
+
+    def _close_files(self):
+        for path in list(self._files):
+            self._close_file(path)
+
+_LOG_WRITER = LogWriter()
+atexit.register(_LOG_WRITER.flush, True, True, 5.0)
+
+def configure_log_writer(flush_interval=None, durability=None, max_bytes=None, backups=None):
+    _LOG_WRITER.configure(flush_interval=flush_interval, durability=durability, max_bytes=max_bytes, backups=backups)
+    return _LOG_WRITER
+
+def flush_logs(release=False):
+    """Vuelca lo pendiente (y cierra los ficheros si release) — p.ej. antes de abrir o borrar un log."""
+    return _LOG_WRITER.flush(release=release)
+
+def log_writer_stats():
+    return dict(_LOG_WRITER.stats, queued=_LOG_WRITER._q.qsize(), durability=_LOG_WRITER.durability)
+
+def append_log_txt(path, line):
+    _LOG_WRITER.write(path, line + "\n")
+
+def append_log_json(path, obj):
+    try:
+        _LOG_WRITER.write(path, json.dumps(obj, ensure_ascii=False) + "\n")
+    except Exception:
+        pass
+
+# -----------------------------
+# HTTP session pool (keep-alive por host)
+# -----------------------------
+_CONEXION = threading.local()   # segundos de la última conexión abierta por este hilo (telemetría)
+
+class _HTTPConnectionMedida(HTTPConnection):
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _CONEXION.segundos = time.perf_counter() - t0
+
+class _HTTPSConnectionMedida(HTTPSConnection):
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            super().connect()   # TCP + TLS
+        finally:
+            _CONEXION.segundos = time.perf_counter() - t0
+
+class _HTTPPoolMedido(HTTPConnectionPool):
+    ConnectionCls = _HTTPConnectionMedida
+
+class _HTTPSPoolMedido(HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnectionMedida
+
+class _AdapterMedido(HTTPAdapter):
+    """HTTPAdapter cuyas conexiones apuntan cuánto tardaron en abrirse (solo las nuevas)."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPPoolMedido, "https": _HTTPSPoolMedido}
+
+class SessionPool:
+    """Una requests.Session por host (scheme+netloc) con conexiones keep-alive.
+    Thread-safe. Lleva stats de hits/misses de sesión y de conexión."""
+
+    def __init__(self, maxsize=DEFAULT_HILOS, block=POOL_BLOCK):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self.maxsize = max(1, int(maxsize))
+        self.block = bool(block)
+        self.session_hits = 0
+        self.session_misses = 0
+
+    def configure(self, maxsize=None, block=None):
+        """Ajusta límites del pool. Si cambian, las sesiones se recrean en el próximo uso."""
+        with self._lock:
+            new_max = self.maxsize if maxsize is None else max(1, int(maxsize))
+            new_block = self.block if block is None else bool(block)
+            if new_max == self.maxsize and new_block == self.block:
+                return
+            self.maxsize = new_max
+            self.block = new_block
+            old = list(self._sessions.values())
+            self._sessions.clear()
+        for s in old:
+            try:
+                s.close()
+            except Exception:
+                pass
+
+    def _new_session(self):
+        s = requests.Session()
+        adapter = _AdapterMedido(pool_connections=1, pool_maxsize=self.maxsize, pool_block=self.block)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        return s
+
+    def session(self, url):
+        p = urlparse(url)
+        key = (p.scheme, p.netloc)
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is not None:
+                self.session_hits += 1
+                return s
+            self.session_misses += 1
+            s = self._new_session()
+            self._sessions[key] = s
+            return s
+
+    def _request(self, method, url, **kw):
+        with span("rate", "red"):
+            _RATE_LIMITER.acquire(url)
+        _CONEXION.segundos = None
+        try:
+            # tramo hasta las cabeceras: un HEAD es un sondeo; el cuerpo de un GET va en "body"
+            with span("probe" if method == "HEAD" else "get", "red", url):
+                r = self.session(url).request(method, url, **kw)
+        except (requests.Timeout, requests.ConnectionError):
+            aimd_observe(url, timeout=True)
+            net_observe(url, method, connect=_CONEXION.segundos, error=True)
+            raise
+        # r.elapsed = hasta tener las cabeceras (TTFB), también con stream=True
+        aimd_observe(url, r.status_code, r.elapsed.total_seconds())
+        net_observe(url, method, r.status_code, _CONEXION.segundos, r.elapsed.total_seconds())
+        return r
+
+    def head(self, url, **kw):
+        kw.setdefault("allow_redirects", False)   # como requests.Session.head
+        return self._request("HEAD", url, **kw)
+
+    def get(self, url, **kw):
+        return self._request("GET", url, **kw)
+
+    def stats(self):
+        """Dict con hits/misses de sesión y, por host, conexiones nuevas vs reutilizadas."""
+        with self._lock:
+            items = list(self._sessions.items())
+            out = {"sessions": len(items), "session_hits": self.session_hits,
+                   "session_misses": self.session_misses, "maxsize": self.maxsize,
+                   "block": self.block, "hosts": {}}
+        conn_new = conn_reused = 0
+        for (scheme, netloc), s in items:
+            requests_n = new_n = 0
+            for adapter in set(s.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for k in list(pools.keys()):
+                    cp = pools.get(k)
+                    if cp is None:
+                        continue
+                    requests_n += getattr(cp, "num_requests", 0)
+                    new_n += getattr(cp, "num_connections", 0)
+            reused = max(0, requests_n - new_n)
+            out["hosts"][f"{scheme}://{netloc}"] = {"requests": requests_n, "conn_new": new_n, "conn_reused": reused}
+            conn_new += new_n
+            conn_reused += reused
+        out["conn_new"] = conn_new
+        out["conn_reused"] = conn_reused
+        return out
+
+    def close_all(self):
+        with self._lock:
+            old = list(self._sessions.values())
+            self._sessions.clear()
+        for s in old:
+            try:
+                s.close()
+            except Exception:
+                pass
+
+_SESSION_POOL = SessionPool()
+
+def configure_pool(hilos=DEFAULT_HILOS, hilos_det=DEFAULT_HILOS_DET, maxsize=POOL_MAXSIZE, block=POOL_BLOCK):
+    """Dimensiona el pool global: maxsize explícito o, si es 0, max(hilos, hilos_det)."""
+    try:
+        size = int(maxsize or 0)
+    except Exception:
+        size = 0
+    if size <= 0:
+        size = max(int(hilos or 1), int(hilos_det or 1))
+    _SESSION_POOL.configure(maxsize=size, block=block)
+    return _SESSION_POOL
+
+def pool_stats():
+    return _SESSION_POOL.stats()
+
+# -----------------------------
+# Concurrencia adaptativa (AIMD por host)
+# -----------------------------
+class AIMDController:
+    """Ventana de elementos en vuelo para un host: +1 por ventana completa de respuestas sanas,
+    x AIMD_BACKOFF ante 429/403, timeouts o un TTFB medio muy por encima del mejor visto.
+    Las respuestas llegan desde SessionPool y el motor async vía observe(). Thread-safe."""
+
+    def __init__(self, inicial=DEFAULT_HILOS, minimo=1, maximo=DEFAULT_AIMD_MAX):
+        self._lock = threading.Lock()
+        self.minimo = max(1, int(minimo))
+        self.maximo = max(self.minimo, int(maximo))
+        self.cwnd = float(min(self.maximo, max(self.minimo, int(inicial))))
+        self.inflight = 0
+        self.ttfb = None
+        self.ttfb_min = None
+        self._last_decrease = 0.0
+        self.stats = {"increases": 0, "decreases": 0, "observed": 0, "last_reason": ""}
+
+    @property
+    def window(self):
+        return int(self.cwnd)
+
+    def try_acquire(self):
+        with self._lock:
+            if self.inflight < int(self.cwnd):
+                self.inflight += 1
+                return True
+            return False
+
+    def release(self):
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+
+    def observe(self, status=None, ttfb=None, timeout=False):
+        """Una respuesta (status, segundos hasta cabeceras) o un timeout/conexión fallida."""
+        with self._lock:
+            self.stats["observed"] += 1
+            if timeout:
+                return self._decrease("timeout")
+            if status in (403, 429):
+                return self._decrease(f"HTTP {status}")
+            if ttfb is not None:
+                self.ttfb = ttfb if self.ttfb is None else (1 - AIMD_EWMA) * self.ttfb + AIMD_EWMA * ttfb
+                self.ttfb_min = self.ttfb if self.ttfb_min is None else min(self.ttfb_min, self.ttfb)
+                if self.ttfb > AIMD_TTFB_FACTOR * max(self.ttfb_min, 0.005):
+                    return self._decrease(f"TTFB {self.ttfb * 1000:.0f} ms")
+            # solo se crece si la ventana se está usando entera (si no, no hay señal de capacidad)
+            if status is not None and status < 500 and self.cwnd < self.maximo and self.inflight >= int(self.cwnd) - 1:
+                antes = int(self.cwnd)
+                self.cwnd = min(self.maximo, self.cwnd + 1.0 / self.cwnd)
+                if int(self.cwnd) > antes:
+                    self.stats["increases"] += 1
+
+    def _decrease(self, reason):
+        now = time.time()
+        if now - self._last_decrease < AIMD_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.cwnd = max(float(self.minimo), self.cwnd * AIMD_BACKOFF)
+        # tras reducir, el TTFB de referencia vuelve a medirse con la nueva carga
+        self.ttfb = None
+        self.stats["decreases"] += 1
+        self.stats["last_reason"] = reason
+
+    def snapshot(self):
+        with self._lock:
+            return {"window": int(self.cwnd), "inflight": self.inflight, "min": self.minimo, "max": self.maximo,
+                    "ttfb_ms": round(self.ttfb * 1000, 1) if self.ttfb is not None else None,
+                    **self.stats}
+
+_AIMD_LOCK = threading.Lock()
+_AIMD = {}
+_AIMD_USOS = {}         # (scheme, netloc) -> sesiones que tienen el controlador (aimd_release al acabar)
+
+def aimd_controller(url, inicial=DEFAULT_HILOS, maximo=DEFAULT_AIMD_MAX, compartir=False):
+    """Controlador nuevo para el host de url (una sesión de descarga = una ventana nueva).
+    Con compartir (trabajos en paralelo), si otra sesión del host aún lo tiene (no ha llamado a
+    aimd_release) se reutiliza: las series del mismo host comparten ventana en vez de pisarse."""
+    p = urlparse(url)
+    clave = (p.scheme, p.netloc)
+    with _AIMD_LOCK:
+        c = _AIMD.get(clave)
+        if compartir and c is not None and _AIMD_USOS.get(clave, 0) > 0:
+            c.maximo = max(c.maximo, int(maximo))
+            _AIMD_USOS[clave] += 1
+            return c
+        c = _AIMD[clave] = AIMDController(inicial=inicial, maximo=maximo)
+        _AIMD_USOS[clave] = 1
+    return c
+
+def aimd_release(url, control):
+    """Fin de la sesión que obtuvo control con aimd_controller."""
+    p = urlparse(url)
+    clave = (p.scheme, p.netloc)
+    with _AIMD_LOCK:
+        if _AIMD.get(clave) is control and _AIMD_USOS.get(clave, 0) > 0:
+            _AIMD_USOS[clave] -= 1
+
+def aimd_observe(url, status=None, ttfb=None, timeout=False):
+    p = urlparse(url)
+    c = _AIMD.get((p.scheme, p.netloc))
+    if c is not None:
+        c.observe(status, ttfb, timeout)
+
+def aimd_stats():
+    with _AIMD_LOCK:
+        items = list(_AIMD.items())
+    return {f"{scheme}://{netloc}": c.snapshot() for (scheme, netloc), c in items}
+
+# -----------------------------
+# Límite de peticiones por host (token bucket)
+# -----------------------------
+class TokenBucket:
+    """rps tokens por segundo, hasta burst acumulados. reserve() toma un token y devuelve
+    cuánto hay que esperar: los tokens pueden quedar en negativo, así cada petición en cola
+    tiene su hueco reservado sin sondeos ni esperas en bucle."""
+
+    def __init__(self, rps=DEFAULT_RATE_RPS, burst=DEFAULT_RATE_BURST, jitter=RATE_JITTER):
+        self._lock = threading.Lock()
+        self.rps = max(0.0, float(rps or 0))
+        self.burst = max(1.0, float(burst or 1))
+        self.jitter = max(0.0, float(jitter or 0))
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self._recent = deque()
+        self.requests = 0
+        self.waits = 0
+        self.waited = 0.0
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self.requests += 1
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > RATE_WINDOW:
+                self._recent.popleft()
+            if self.rps <= 0:
+                return 0.0
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rps)
+            self.last = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            wait = -self.tokens / self.rps
+            if self.jitter:
+                wait += random.uniform(0, self.jitter / self.rps)
+            self.waits += 1
+            self.waited += wait
+            return wait
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            recientes = [t for t in self._recent if now - t <= RATE_WINDOW]
+            lapso = min(RATE_WINDOW, now - recientes[0]) if len(recientes) > 1 else 0.0
+            return {"rps": self.rps, "burst": self.burst, "achieved": round(len(recientes) / lapso, 2) if lapso else 0.0,
+                    "requests": self.requests, "waits": self.waits, "waited_s": round(self.waited, 2)}
+
+def parse_host_limits(texto):
+    """"host=rps[/ráfaga], ..." -> {host: {"rps": x, "burst": y}} (lo que se guarda en la config)."""
+    out = {}
+    for parte in str(texto or "").replace(";", ",").split(","):
+        host, igual, valor = parte.partition("=")
+        host = host.strip().lower()
+        if not igual or not host:
+            continue
+        rps, _, burst = valor.partition("/")
+        try:
+            lim = {"rps": float(rps)}
+            if burst.strip():
+                lim["burst"] = int(burst)
+        except ValueError:
+            continue
+        out[host] = lim
+    return out
+
+def format_host_limits(limites):
+    partes = []
+    for host, lim in (limites or {}).items():
+        txt = f"{host}={lim.get('rps', 0):g}"
+        if "burst" in lim:
+            txt += f"/{lim['burst']}"
+        partes.append(txt)
+    return ", ".join(partes)
+
+class RateLimiter:
+    """Un TokenBucket por host (netloc). Los límites de `por_host` se buscan por netloc
+    y luego por hostname sin puerto; el resto usa rps/burst por defecto."""
+
+    def __init__(self, rps=DEFAULT_RATE_RPS, burst=DEFAULT_RATE_BURST, por_host=None):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._prepago = threading.local()
+        self.por_host = {}
+        self.configure(rps, burst, por_host)
+
+    def configure(self, rps=None, burst=None, por_host=None):
+        with self._lock:
+            if rps is not None:
+                self.rps = float(rps)
+            if burst is not None:
+                self.burst = int(burst)
+            if por_host is not None:
+                self.por_host = {str(h).lower(): dict(v) for h, v in por_host.items()}
+            self._buckets.clear()
+
+    def _bucket(self, url):
+        p = urlparse(url)
+        netloc = p.netloc.lower()
+        with self._lock:
+            b = self._buckets.get(netloc)
+            if b is None:
+                lim = self.por_host.get(netloc) or self.por_host.get(p.hostname or "") or {}
+                b = TokenBucket(lim.get("rps", self.rps), lim.get("burst", self.burst))
+                self._buckets[netloc] = b
+            return b
+
+    def reserve(self, url):
+        """Toma ya el token de la próxima petición a url y devuelve cuánto falta para que toque:
+        el motor de hilos espera en su bucle de envío, no en un hilo del pool."""
+        return self._bucket(url).reserve()
+
+    def set_prepaid(self, url):
+        """La próxima petición a ese host desde este hilo usa el token ya reservado (url=None lo quita)."""
+        self._prepago.netloc = urlparse(url).netloc.lower() if url else None
+
+    def acquire(self, url):
+        netloc = getattr(self._prepago, "netloc", None)
+        if netloc is not None and netloc == urlparse(url).netloc.lower():
+            self._prepago.netloc = None
+            return 0.0
+        wait = self._bucket(url).reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url):
+        wait = self._bucket(url).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            items = list(self._buckets.items())
+        return {netloc: b.snapshot() for netloc, b in items}
+
+_RATE_LIMITER = RateLimiter()
+
+def configure_rate_limits(rps=DEFAULT_RATE_RPS, burst=DEFAULT_RATE_BURST, por_host=None):
+    _RATE_LIMITER.configure(rps, burst, por_host or {})
+    return _RATE_LIMITER
+
+def rate_limits_config():
+    """Límites vigentes {"rps", "burst", "por_host"} (p.ej. para repartirlos entre procesos)."""
+    with _RATE_LIMITER._lock:
+        return {"rps": _RATE_LIMITER.rps, "burst": _RATE_LIMITER.burst,
+                "por_host": {h: dict(v) for h, v in _RATE_LIMITER.por_host.items()}}
+
+def rate_stats():
+    return _RATE_LIMITER.stats()
+
+# -----------------------------
+# Pausa y cancelación (pause_event / stop_event de la sesión, vistos desde cada descarga)
+# -----------------------------
+_PAUSA = {"inactivo": PAUSA_INACTIVO}
+
+class _PausaLarga(Exception):
+    """La pausa superó el tiempo de inactividad: se cierra la conexión y se reanuda con Range."""
+
+def configure_pause(inactivo=PAUSA_INACTIVO):
+    """Segundos que una descarga activa espera en pausa con la conexión abierta (0 = cerrar ya).
+    Con None solo devuelve el valor vigente."""
+    if inactivo is not None:
+        _PAUSA["inactivo"] = max(0.0, float(inactivo))
+    return _PAUSA["inactivo"]
+
+def _cancelado(cancelar):
+    return cancelar is not None and cancelar.is_set()
+
+def _pausado(pausa):
+    return pausa is not None and pausa.is_set()
+
+def _esperar_pausa(pausa, cancelar=None, inactivo=None):
+    """Bloquea mientras dure la pausa. Con inactivo, deja de esperar pasados esos segundos.
+    True si se puede seguir (reanudada o cancelada), False si se agotó el tiempo en pausa."""
+    t0 = time.monotonic()
+    while _pausado(pausa) and not _cancelado(cancelar):
+        if inactivo is not None and time.monotonic() - t0 >= inactivo:
+            return False
+        time.sleep(0.1)
+    return True
+
+async def _async_esperar_pausa(pausa, cancelar=None, inactivo=None):
+    t0 = time.monotonic()
+    while _pausado(pausa) and not _cancelado(cancelar):
+        if inactivo is not None and time.monotonic() - t0 >= inactivo:
+            return False
+        await asyncio.sleep(0.1)
+    return True
+
+# -----------------------------
+# Networking helpers (head, detect, download resume)
+# -----------------------------
+def head_ok(url, headers=None, timeout=8):
+    headers = headers or {"User-Agent": random.choice(USER_AGENTS)}
+    try:
+        r = _SESSION_POOL.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        if r.status_code == 200:
+            return True
+        # fallback to quick GET (cerrar para devolver la conexión al pool)
+        with _SESSION_POOL.get(url, headers=headers, timeout=timeout, stream=True) as r:
+            return r.status_code == 200
+    except Exception:
+        return False
+
+# -----------------------------
+# Detection (galope especulativo en paralelo + caché persistente)
+# -----------------------------
+_DETECT_CACHE_LOCK = threading.Lock()
+
+def _load_detect_cache():
+    try:
+        with open(DETECT_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def detect_cache_get(url_base, relleno):
+    """Entrada cacheada {"fin": n, "ts": epoch} o None."""
+    with _DETECT_CACHE_LOCK:
+        return _load_detect_cache().get(f"{url_base}|{relleno}")
+
+def detect_cache_put(url_base, relleno, fin):
+    with _DETECT_CACHE_LOCK:
+        cache = _load_detect_cache()
+        cache[f"{url_base}|{relleno}"] = {"fin": int(fin), "ts": time.time()}
+        try:
+            with open(DETECT_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=2)
+        except Exception:
+            pass
+
+def _index_exists(url_base, relleno, i, exts=DEFAULT_EXTS):
+    s = str(i).zfill(relleno)
+    return any(head_ok(f"{url_base}{s}.{ext}") for ext in exts)
+
+@trazado("detect")
+def detect_range_mixto(url_base, relleno=DEFAULT_RELLENO, max_busqueda=MAX_DETECT, quiet=False, hilos_det=DEFAULT_HILOS_DET,
+                       usar_cache=True, cache_ttl=DETECT_CACHE_TTL, stats=None, exts=DEFAULT_EXTS):
+    """Exponencial -> binaria -> ventana final, sondeando hilos_det puntos a la vez en cada ronda.
+    Con caché: si el fin guardado es reciente se devuelve tal cual; si no, solo se galopa hacia
+    delante desde él. stats (dict opcional) recibe rondas, sondeos y origen del resultado."""
+    k = max(1, int(hilos_det or 1))
+    info = {"rounds": 0, "probes": 0, "cache": "miss"}
+    if stats is not None:
+        stats.update(info)
+        info = stats
+
+    cached = detect_cache_get(url_base, relleno) if usar_cache else None
+    if cached and cache_ttl and time.time() - cached.get("ts", 0) < cache_ttl:
+        info["cache"] = "hit"
+        if not quiet:
+            print(f"✅ Detección en caché: {cached['fin']}")
+        return int(cached["fin"])
+
+    with ThreadPoolExecutor(max_workers=k) as ex:
+        def probe(puntos):
+            puntos = sorted(set(p for p in puntos if 1 <= p <= max_busqueda))
+            info["rounds"] += 1
+            info["probes"] += len(puntos)
+            return dict(zip(puntos, ex.map(lambda i: _index_exists(url_base, relleno, i, exts), puntos)))
+
+        def gallop(low):
+            """Galope desde low (existe, o 0): k saltos exponenciales por ronda.
+            Devuelve (low, high) con high = primer punto que falló (o el máximo)."""
+            base = low
+            e = 0
+            while True:
+                puntos = []
+                while len(puntos) < k:
+                    p = min(max_busqueda, base + (1 << e))
+                    puntos.append(p)
+                    e += 1
+                    if p >= max_busqueda:
+                        break
+                res = probe(puntos)
+                for p in sorted(res):
+                    if not res[p]:
+                        return low, p
+                    low = p
+                if low >= max_busqueda:
+                    return low, max_busqueda
+
+        low = 0
+        if cached and cached.get("fin", 0) > 0:
+            c = min(int(cached["fin"]), max_busqueda)
+            if not quiet:
+                print(f"🔁 Caché caducada: re-sondeando hacia delante desde {c}...")
+            if probe([c]).get(c):
+                info["cache"] = "forward"
+                low = c
+        if not quiet and info["cache"] != "forward":
+            print("🔍 Detección mixta: búsqueda exponencial...")
+        low, high = gallop(low)
+        if low == 0:
+            # try small block
+            res = probe(range(1, min(8, max_busqueda) + 1))
+            hits = [i for i in sorted(res) if res[i]]
+            if not hits:
+                return 0
+            low = hits[0]
+        if high < low:
+            high = low
+        if not quiet:
+            print(f"🔎 Refinando por búsqueda {k + 1}-aria entre {low} y {high}...")
+        while low < high:
+            ancho = high - low
+            n = min(k, ancho)
+            res = probe(low + math.ceil(ancho * (j + 1) / (n + 1)) for j in range(n))
+            for p in sorted(res):
+                if res[p]:
+                    low = p
+                else:
+                    high = p - 1
+                    break
+        est_fin = low
+        window_start = max(1, est_fin - DETECT_WINDOW)
+        window_end = min(max_busqueda, est_fin + DETECT_WINDOW)
+        if not quiet:
+            print(f"🔬 Verificando ventana final {window_start}..{window_end} con hilos={k}...")
+        res = probe(range(window_start, window_end + 1))
+        found = [i for i, ok in res.items() if ok]
+    final = max(found) if found else est_fin
+    if usar_cache and final > 0:
+        detect_cache_put(url_base, relleno, final)
+    if not quiet:
+        print(f"✅ Detección estimada: {final} ({info['rounds']} rondas, {info['probes']} sondeos)")
+    return final
+
+def download_with_resume(url, destino, headers, timeout=TIMEOUT_BASE, reintentos=DEFAULT_REINTENTOS, progress_callback=None,
+                         segmentos=SEG_PARTES, seg_umbral=SEG_UMBRAL, cancelar=None, pausa=None, dedup=None,
+                         sincro=None):
+    """Descarga con resume (temp .part). progress_callback(bytes_received, total_bytes) optional.
+    Con segmentos > 1, un archivo de al menos seg_umbral bytes se baja en varios rangos en
+    paralelo (estado en destino.seg); si el servidor ignora Range se sigue en un solo flujo.
+    cancelar (threading.Event) corta el flujo entre chunks: (False, "CANCELLED") y el .part
+    (o el .seg) queda para reanudar. Con pausa (threading.Event) activada el flujo se detiene
+    entre chunks; si dura más de PAUSA_INACTIVO se cierra la conexión y al reanudar se sigue
+    con Range desde el .part, sin gastar reintentos. Con dedup (duplicados.DedupIndex) el cuerpo
+    se hashea al pasar y un contenido ya conocido acaba como enlace al original: (True, "DUP:<original>")
+    ("DUP_ETAG:..." si se reconoció por ETag y tamaño sin bajar el cuerpo). Con sincro
+    (sincro.ValidatorStore) se guardan los validadores del .part y toda reanudación lleva If-Range:
+    si el objeto cambió llega entero (200) y el .part se reescribe en vez de mezclar versiones."""
+    temp = destino + ".part"
+    ir = if_range(sincro.get(temp)) if sincro is not None else None
+    if os.path.exists(_seg_path(destino)):
+        if segmentos > 1:
+            res = _download_segmented(url, temp, destino, dict(headers, **{"If-Range": ir}) if ir else headers,
+                                      timeout, reintentos, progress_callback, segmentos,
+                                      state=_SegState.load(_seg_path(destino), temp), cancelar=cancelar, pausa=pausa)
+            if res is not None:
+                return _dedup_tras(dedup, res, destino, url)
+        # estado inválido, servidor sin Range o segmentado desactivado: el .part no es contiguo
+        _discard_segmented(temp, destino)
+        segmentos = 1
+    intento = 0
+    while intento < reintentos:
+        _esperar_pausa(pausa, cancelar)
+        if _cancelado(cancelar):
+            return (False, "CANCELLED")
+        intento += 1
+        if intento > 1:
+            net_retry(url)
+        h = headers.copy()
+        mode = "wb"
+        pos = 0
+        if os.path.exists(temp):
+            pos = os.path.getsize(temp)
+            if pos > 0:
+                h["Range"] = f"bytes={pos}-"
+                mode = "ab"
+                ir = if_range(sincro.get(temp)) if sincro is not None else None
+                if ir:
+                    h["If-Range"] = ir
+        elif segmentos > 1:
+            # 206 + Content-Range dice el tamaño y que hay soporte de Range; un 200 es un flujo normal
+            h["Range"] = "bytes=0-"
+        try:
+            r = _SESSION_POOL.get(url, stream=True, headers=h, timeout=timeout, allow_redirects=True)
+        except Exception:
+            time.sleep(random.uniform(1.0, 2.5))
+            continue
+        with r:
+            total = _content_range_total(r.headers.get("Content-Range")) if r.status_code == 206 and pos == 0 else None
+            if segmentos > 1 and total and total >= seg_umbral:
+                seg_headers = headers
+                if sincro is not None:
+                    sincro.put(temp, r.headers, total)
+                    ir = if_range(validadores(r.headers, total))
+                    if ir:
+                        # los demás segmentos solo valen si el objeto sigue siendo el mismo
+                        seg_headers = dict(headers, **{"If-Range": ir})
+                if dedup is not None:
+                    orig = _dedup_por_etag(dedup, url, r.headers, destino, total)
+                    if orig:
+                        return (True, f"DUP_ETAG:{orig}")
+                res = _download_segmented(url, temp, destino, seg_headers, timeout, reintentos, progress_callback, segmentos,
+                                          total=total, first=r, cancelar=cancelar, pausa=pausa)
+                if res is not None:
+                    return _dedup_tras(dedup, res, destino, url, r.headers)
+                _discard_segmented(temp, destino)
+                segmentos = 1
+                continue
+            res = _consume_response(r, temp, destino, mode, pos, progress_callback, cancelar, pausa, dedup, url, sincro)
+        if res == _PAUSADA:
+            intento -= 1   # conexión cerrada por pausa larga: no es un fallo
+            continue
+        if res is None:
+            time.sleep(0.5)
+            continue
+        return res
+    return (False, "FAILED_RETRIES")
+
+# -----------------------------
+# Escritura en streaming (chunks adaptativos, buffer reutilizado, preasignación)
+# -----------------------------
+_BUFFERS = threading.local()
+
+def _stream_buffer():
+    """Buffer de STREAM_CHUNK_MAX por hilo: se reutiliza entre descargas en vez de crear un bytes por chunk."""
+    buf = getattr(_BUFFERS, "view", None)
+    if buf is None:
+        buf = _BUFFERS.view = memoryview(bytearray(STREAM_CHUNK_MAX))
+    return buf
+
+def _throttled_progress(progress_callback):
+    """progress_callback(recibidos, total) limitado a cada STREAM_PROGRESS_BYTES o STREAM_PROGRESS_SECS."""
+    if not progress_callback:
+        return None
+    estado = {"bytes": 0, "t": 0.0}
+    def progress(received, total, final=False):
+        ahora = time.monotonic()
+        if not final and received - estado["bytes"] < STREAM_PROGRESS_BYTES and ahora - estado["t"] < STREAM_PROGRESS_SECS:
+            return
+        estado["bytes"], estado["t"] = received, ahora
+        try:
+            progress_callback(received, total)
+        except Exception:
+            pass
+    return progress
+
+def _preallocate(f, size):
+    """Reserva size bytes de verdad (posix_fallocate) y, si el sistema no puede, como hueco (truncate)."""
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except (AttributeError, OSError):
+        f.truncate(size)
+
+class _Transferencia:
+    """Bytes y segundos de lectura de un cuerpo para la telemetría; las pausas no cuentan."""
+
+    def __init__(self, url):
+        self.url = url
+        self.t0 = time.perf_counter()
+        self.pausado = 0.0
+
+    def esperar(self, pausa, cancelar=None):
+        """Espera la pausa en curso; _PausaLarga si supera PAUSA_INACTIVO."""
+        t = time.perf_counter()
+        seguir = _esperar_pausa(pausa, cancelar, _PAUSA["inactivo"])
+        self.pausado += time.perf_counter() - t
+        if not seguir:
+            raise _PausaLarga()
+
+    async def esperar_async(self, pausa):
+        t = time.perf_counter()
+        seguir = await _async_esperar_pausa(pausa, None, _PAUSA["inactivo"])
+        self.pausado += time.perf_counter() - t
+        if not seguir:
+            raise _PausaLarga()
+
+    def cerrar(self, nbytes):
+        net_transfer(self.url, nbytes, time.perf_counter() - self.t0 - self.pausado)
+
+@trazado("body", "red")
+def _stream_body(r, f, on_bytes, limite=None, cancelar=None, pausa=None, hasher=None):
+    """Copia el cuerpo de la respuesta r (requests, stream=True) a f y devuelve los bytes escritos.
+    Sin Content-Encoding lee con readinto sobre un buffer reutilizado; readinto espera a llenar
+    el chunk, así que su tamaño (STREAM_CHUNK_MIN..STREAM_CHUNK_MAX) sigue a lo que tarda cada
+    lectura (STREAM_CHUNK_SECS): un enlace lento no deja pausa ni stop esperando segundos.
+    Con Content-Encoding usa iter_content con chunks grandes.
+    on_bytes(n) tras cada escritura; limite corta a ese número de bytes (segmentos);
+    con cancelar activado se deja de leer en el siguiente chunk. Con pausa activada se deja
+    de leer (el servidor se frena por TCP) y, pasado PAUSA_INACTIVO, se lanza _PausaLarga.
+    hasher (hashlib) recibe cada chunk escrito: el hash sale sin volver a leer el fichero.
+    Bytes y tiempo de lectura (sin las pausas) van a la telemetría aunque el flujo se corte.
+    Con traza, cada write es un tramo: lo que queda de "body" es red y coste por chunk."""
+    medida = _Transferencia(r.url)
+    if trazando():
+        f = EscrituraTrazada(f)
+    escritos = 0
+    raw = r.raw
+    try:
+        if r.headers.get("Content-Encoding", "identity").lower() in ("", "identity") and hasattr(raw, "readinto"):
+            buf = _stream_buffer()
+            size = STREAM_CHUNK_MIN
+            while (limite is None or escritos < limite) and not _cancelado(cancelar):
+                pedir = size if limite is None else min(size, limite - escritos)
+                t = time.perf_counter()
+                n = raw.readinto(buf[:pedir])
+                dt = time.perf_counter() - t
+                if not n:
+                    break
+                f.write(buf[:n])
+                if hasher is not None:
+                    hasher.update(buf[:n])
+                escritos += n
+                on_bytes(n)
+                if _pausado(pausa):
+                    medida.esperar(pausa, cancelar)
+                if dt < STREAM_CHUNK_SECS:
+                    if n == pedir and size < STREAM_CHUNK_MAX:
+                        size *= 2
+                elif dt > 2 * STREAM_CHUNK_SECS:
+                    # a la tasa medida, lo que cabe en STREAM_CHUNK_SECS
+                    objetivo = n * STREAM_CHUNK_SECS / dt
+                    while size > STREAM_CHUNK_MIN and size > objetivo:
+                        size //= 2
+            return escritos
+        for chunk in r.iter_content(chunk_size=STREAM_CHUNK_MAX // 4):
+            if limite is not None and escritos + len(chunk) > limite:
+                chunk = chunk[:limite - escritos]
+            if chunk:
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                escritos += len(chunk)
+                on_bytes(len(chunk))
+                if _pausado(pausa):
+                    medida.esperar(pausa, cancelar)
+            if (limite is not None and escritos >= limite) or _cancelado(cancelar):
+                break
+        return escritos
+    finally:
+        medida.cerrar(escritos)
+
+_PAUSADA = (False, "PAUSED")
+
+def _consume_response(r, temp, destino, mode, pos, progress_callback, cancelar=None, pausa=None,
+                      dedup=None, url=None, sincro=None):
+    """Vuelca una respuesta en temp y renombra. None = error de stream (reintentar);
+    _PAUSADA = conexión cerrada por una pausa larga (reanudar con Range)."""
+    if r.status_code in (403, 429):
+        return (False, f"BLOCK_{r.status_code}")
+    if r.status_code == 416:
+        if os.path.exists(temp):
+            _finalize_part(temp, destino)
+            return _dedup_tras(dedup, (True, "RESUMED_RENAMED"), destino, url)
+        return (False, f"HTTP_{r.status_code}")
+    if r.status_code not in (200, 206):
+        return (False, f"HTTP_{r.status_code}")
+    if _cancelado(cancelar):
+        return (False, "CANCELLED")
+    if r.status_code == 200 and pos:
+        # el servidor ignoró el Range o el If-Range no casó (objeto cambiado): cuerpo completo
+        mode, pos = "wb", 0
+    if sincro is not None and not pos:
+        sincro.put(temp, r.headers)
+    hasher = None
+    if dedup is not None:
+        if r.status_code == 200:
+            orig = _dedup_por_etag(dedup, url, r.headers, destino)
+            if orig:
+                return (True, f"DUP_ETAG:{orig}")   # cuerpo sin leer: la conexión se descarta
+        try:
+            # al reanudar, lo que ya estaba en el .part entra en el hash antes que el resto
+            hasher = hash_file(temp) if mode == "ab" else new_hasher()
+        except OSError:
+            hasher = None
+    total = None
+    try:
+        total = int(r.headers.get("content-length") or 0) + (pos or 0)
+    except:
+        total = None
+    progress = _throttled_progress(progress_callback)
+    received = [pos or 0]
+    def on_bytes(n):
+        received[0] += n
+        if progress:
+            progress(received[0], total)
+    try:
+        # sin preasignar: el tamaño del .part es lo que dice desde dónde reanudar
+        with open(temp, mode) as f:
+            _stream_body(r, f, on_bytes, cancelar=cancelar, pausa=pausa, hasher=hasher)
+        if progress:
+            progress(received[0], total, final=True)
+        if _cancelado(cancelar):
+            return (False, "CANCELLED")
+        _finalize_part(temp, destino)
+        if dedup is not None:
+            return _dedup_tras(dedup, (True, "OK"), destino, url, r.headers,
+                               hasher.hexdigest() if hasher is not None else None)
+        return (True, "OK")
+    except _PausaLarga:
+        return _PAUSADA
+    except Exception:
+        return None
+
+def _finalize_part(temp, destino):
+    try:
+        os.replace(temp, destino)
+    except:
+        try:
+            os.rename(temp, destino)
+        except:
+            pass
+
+def _dedup_por_etag(dedup, url, headers, destino, size=None):
+    """Contenido ya descargado con el mismo ETag y tamaño: crea destino desde el original sin
+    leer el cuerpo. Devuelve la ruta del original o None."""
+    try:
+        size = size or int(headers.get("Content-Length") or 0)
+    except (TypeError, ValueError):
+        return None
+    orig = dedup.por_etag(urlparse(url).netloc.lower(), etag_fuerte(headers), size)
+    if not orig or os.path.abspath(orig) == os.path.abspath(destino):
+        return None
+    if not dedup.materializar(orig, destino, size):
+        return None
+    for path in (destino + ".part", _seg_path(destino)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return orig
+
+def _dedup_tras(dedup, res, destino, url, headers=None, digest=None):
+    """Tras completar destino: lo registra en el índice o lo cambia por el original ya conocido.
+    Sin digest (segmentados, 416) el fichero se relee para hashearlo."""
+    if dedup is None or not res[0]:
+        return res
+    try:
+        if digest is None:
+            digest = hash_file(destino).hexdigest()
+        orig = dedup.registrar(destino, digest, urlparse(url).netloc.lower(), etag_fuerte(headers))
+    except OSError:
+        return res
+    return (True, f"DUP:{orig}") if orig else res
+
+# -----------------------------
+# Descargas segmentadas (varios Range en paralelo sobre un .part preasignado)
+# -----------------------------
+def _seg_path(destino):
+    return destino + ".seg"
+
+def _content_range_total(value):
+    """"bytes 0-99/1000" -> 1000 (None si no se conoce el total)."""
+    try:
+        total = str(value).rsplit("/", 1)[1].strip()
+        return int(total) if total != "*" else None
+    except Exception:
+        return None
+
+def _discard_segmented(temp, destino):
+    for path in (_seg_path(destino), temp):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class _SegState:
+    """Tamaño total y [inicio, fin, bytes_hechos] por segmento, guardado en destino.seg.
+    Los segmentos escriben en su zona del .part preasignado; el estado se guarda cada
+    SEG_SAVE_EVERY bytes, así un corte pierde como mucho eso por segmento."""
+
+    def __init__(self, path, size, segs):
+        self._lock = threading.Lock()
+        self.path = path
+        self.size = size
+        self.segs = segs
+        self._unsaved = 0
+
+    @classmethod
+    def plan(cls, path, size, partes):
+        n = max(1, min(int(partes), size // SEG_MIN or 1))
+        step = -(-size // n)
+        segs = [[a, min(size, a + step) - 1, 0] for a in range(0, size, step)]
+        return cls(path, size, segs)
+
+    @classmethod
+    def load(cls, path, temp):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            st = cls(path, int(data["size"]), [[int(a), int(b), int(d)] for a, b, d in data["segs"]])
+        except Exception:
+            return None
+        # un .part de otro tamaño no es el preasignado por este estado
+        if not os.path.exists(temp) or os.path.getsize(temp) != st.size:
+            return None
+        return st
+
+    def save(self):
+        with self._lock:
+            data = {"size": self.size, "segs": [list(x) for x in self.segs]}
+            self._unsaved = 0
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def remaining(self, k):
+        a, b, d = self.segs[k]
+        return (b - a + 1) - d
+
+    def offset(self, k):
+        return self.segs[k][0] + self.segs[k][2]
+
+    def advance(self, k, n):
+        with self._lock:
+            self.segs[k][2] += n
+            self._unsaved += n
+            guardar = self._unsaved >= SEG_SAVE_EVERY
+        if guardar:
+            self.save()
+
+    def received(self):
+        return sum(x[2] for x in self.segs)
+
+    def pending(self):
+        return [k for k in range(len(self.segs)) if self.remaining(k) > 0]
+
+def _write_segment(r, temp, state, k, progress, cancelar=None, pausa=None):
+    """Vuelca la respuesta r en la zona del segmento k. True si el segmento quedó completo."""
+    def on_bytes(n):
+        state.advance(k, n)
+        progress()
+    with open(temp, "r+b") as f:
+        f.seek(state.offset(k))
+        _stream_body(r, f, on_bytes, limite=state.remaining(k), cancelar=cancelar, pausa=pausa)
+    return state.remaining(k) <= 0
+
+def _fetch_segment(url, temp, headers, timeout, state, k, reintentos, progress, cancelar=None, pausa=None):
+    """Un segmento con sus propios reintentos: "ok", "fail", "norange", "cancel" o "BLOCK_xxx"."""
+    intento = 0
+    while intento < reintentos:
+        _esperar_pausa(pausa, cancelar)
+        if state.remaining(k) <= 0:
+            return "ok"
+        if _cancelado(cancelar):
+            return "cancel"
+        intento += 1
+        if intento > 1:
+            net_retry(url)
+        a, b, _ = state.segs[k]
+        h = headers.copy()
+        h["Range"] = f"bytes={state.offset(k)}-{b}"
+        try:
+            r = _SESSION_POOL.get(url, stream=True, headers=h, timeout=timeout, allow_redirects=True)
+        except Exception:
+            time.sleep(random.uniform(1.0, 2.5))
+            continue
+        with r:
+            if r.status_code in (403, 429):
+                return f"BLOCK_{r.status_code}"
+            if r.status_code != 206 or _content_range_total(r.headers.get("Content-Range")) != state.size:
+                return "norange"
+            try:
+                if _write_segment(r, temp, state, k, progress, cancelar, pausa):
+                    return "ok"
+            except _PausaLarga:
+                state.save()
+                intento -= 1
+                continue
+            except Exception:
+                pass
+        if _cancelado(cancelar):
+            return "cancel"
+        time.sleep(0.5)
+    return "fail"
+
+def _seg_outcome(resultados, state, temp, destino):
+    """Resultado común (hilos y async) de una descarga segmentada; None = volver a un solo flujo."""
+    if "cancel" in resultados:
+        state.save()
+        return (False, "CANCELLED")
+    if "norange" in resultados:
+        return None
+    for res in resultados:
+        if res.startswith("BLOCK"):
+            state.save()
+            return (False, res)
+    if state.pending():
+        state.save()   # se reanuda segmento a segmento en el próximo intento
+        return (False, "FAILED_RETRIES")
+    try:
+        os.remove(state.path)
+    except OSError:
+        pass
+    _finalize_part(temp, destino)
+    return (True, f"OK_SEG{len(state.segs)}")
+
+def _seg_progress(state, progress_callback):
+    progress = _throttled_progress(progress_callback)
+    if not progress:
+        return lambda final=False: None
+    return lambda final=False: progress(state.received(), state.size, final)
+
+def _download_segmented(url, temp, destino, headers, timeout, reintentos, progress_callback, partes,
+                        total=None, first=None, state=None, cancelar=None, pausa=None):
+    """Descarga (o reanuda, con state) en segmentos paralelos. `first` es la respuesta 206 a
+    bytes=0- ya abierta: alimenta el segmento 0 sin pedirlo otra vez."""
+    if state is None:
+        if total is None:
+            return None
+        state = _SegState.plan(_seg_path(destino), total, partes)
+        with open(temp, "wb") as f:
+            _preallocate(f, total)
+        state.save()
+    progress = _seg_progress(state, progress_callback)
+    pendientes = state.pending()
+    resultados = []
+    with ThreadPoolExecutor(max_workers=max(1, len(pendientes))) as ex:
+        futs = [ex.submit(_fetch_segment, url, temp, headers, timeout, state, k, reintentos, progress, cancelar, pausa)
+                for k in pendientes if not (first is not None and k == 0)]
+        if first is not None and 0 in pendientes:
+            try:
+                hecho = _write_segment(first, temp, state, 0, progress, cancelar, pausa)
+            except Exception:
+                hecho = False
+            resultados.append("ok" if hecho else
+                              _fetch_segment(url, temp, headers, timeout, state, 0, reintentos, progress, cancelar, pausa))
+        resultados.extend(f.result() for f in futs)
+    progress(final=True)
+    return _seg_outcome(resultados, state, temp, destino)
+
+def parse_exts(texto, default=DEFAULT_EXTS):
+    """"mp4, jpg,.png" -> ("mp4", "jpg", "png") (sin duplicados, en orden)."""
+    out = []
+    for e in str(texto or "").replace(";", ",").split(","):
+        e = e.strip().lstrip(".").lower()
+        if e and e not in out:
+            out.append(e)
+    return tuple(out) or tuple(default)
+
+def ext_tipo(ext):
+    """("video", "videos", "VIDEO") o ("img", "imagenes", "IMG") según la extensión."""
+    if ext in VIDEO_EXTS:
+        return "video", "videos", "VIDEO"
+    return "img", "imagenes", "IMG"
+
+class ExtPredictor:
+    """Aprende qué extensión tiene cada serie: tasa de aciertos por extensión y por vecinos
+    recientes (índices cercanos pesan más). Ordena las extensiones a probar y decide si la
+    primera es tan probable que conviene un GET directo sin HEAD. Thread-safe."""
+
+    def __init__(self, exts=DEFAULT_EXTS, get_directo=True):
+        self.exts = tuple(exts)
+        self.get_directo = get_directo
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._recent = {}
+        self.stats = {"items": 0, "acierto_primera": 0, "get_directo": 0, "get_directo_fallo": 0, "heads": 0}
+
+    def predict(self, serie, indice):
+        """(extensiones en orden de probabilidad, confianza de la primera)."""
+        with self._lock:
+            hits = self._hits.get(serie, {})
+            total = sum(hits.values())
+            scores = {e: (hits.get(e, 0) + 1.0) / (total + len(self.exts)) for e in self.exts}
+            recent = self._recent.get(serie)
+            if recent and indice is not None:
+                vec = {}
+                for d in range(1, PRED_VECINOS + 1):
+                    for j in (indice - d, indice + d):
+                        e = recent.get(j)
+                        if e in scores:
+                            vec[e] = vec.get(e, 0.0) + 1.0 / d
+                peso = sum(vec.values())
+                if peso:
+                    for e in scores:
+                        scores[e] = 0.5 * scores[e] + 0.5 * vec.get(e, 0.0) / peso
+        orden = sorted(self.exts, key=lambda e: (-scores[e], self.exts.index(e)))
+        conf = scores[orden[0]] if total >= PRED_MIN_MUESTRAS else 0.0
+        return orden, conf
+
+    def record(self, serie, indice, ext, primera):
+        with self._lock:
+            hits = self._hits.setdefault(serie, {})
+            hits[ext] = hits.get(ext, 0) + 1
+            if indice is not None:
+                recent = self._recent.setdefault(serie, OrderedDict())
+                recent[indice] = ext
+                if len(recent) > PRED_RECIENTES:
+                    recent.popitem(last=False)
+            self.stats["items"] += 1
+            if primera:
+                self.stats["acierto_primera"] += 1
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+def _plan_exts(exts, predictor, serie, indice, ext_hint):
+    """Orden de extensiones a probar y si la primera va por GET directo (sin HEAD)."""
+    if ext_hint in exts:
+        return [ext_hint] + [e for e in exts if e != ext_hint], True
+    if predictor is None:
+        return list(exts), False
+    orden, conf = predictor.predict(serie, indice)
+    return orden, bool(predictor.get_directo and conf >= PRED_UMBRAL_GET)
+
+def _existing_destino(carpeta_base, nombre, exts):
+    for ext in exts:
+        tipo, sub, _ = ext_tipo(ext)
+        destino = os.path.join(carpeta_base, sub, f"{nombre}.{ext}")
+        if os.path.exists(destino):
+            return tipo, destino
+    return None, None
+
+_DIRS_OK = set()
+
+def _ensure_dirs(carpeta_base):
+    """Crea videos/ e imagenes/ una sola vez por carpeta y proceso."""
+    if carpeta_base not in _DIRS_OK:
+        os.makedirs(os.path.join(carpeta_base, "videos"), exist_ok=True)
+        os.makedirs(os.path.join(carpeta_base, "imagenes"), exist_ok=True)
+        _DIRS_OK.add(carpeta_base)
+
+@trazado("download")
+def worker_job(base_no_ext, carpeta_base, reintentos, check_exists=True,
+               exts=DEFAULT_EXTS, predictor=None, serie=None, indice=None, ext_hint=None,
+               segmentos=SEG_PARTES, seg_umbral=SEG_UMBRAL, cancelar=None, pausa=None, dedup=None,
+               sincro=None, sincronizar=False):
+    """Prueba las extensiones en orden (mp4 primero, luego jpg por defecto, o el que prediga
+    `predictor`). Logs y separa en subcarpetas. check_exists=False cuando el diario ya
+    garantiza que no hay fichero previo; ext_hint (p.ej. del mapa) va directo a GET.
+    Con cancelar activado devuelve "CANCELLED: ..." sin registrarlo (no cuenta como no encontrado);
+    con pausa activada espera antes de cada petición y detiene la descarga en curso.
+    Con dedup, un contenido repetido queda como "... OK: destino (duplicado de original)".
+    Con sincronizar, un fichero existente no se salta: se revalida contra el origen (_revalidar)."""
+    nombre = os.path.basename(base_no_ext)
+    _ensure_dirs(carpeta_base)
+
+    log_txt = os.path.join(carpeta_base, "download.log.txt")
+    log_json = os.path.join(carpeta_base, "download.log.jsonl")
+
+    headers = {"User-Agent": random.choice(USER_AGENTS),
+               "Referer": urlparse(base_no_ext).scheme + "://" + urlparse(base_no_ext).netloc,
+               "Accept": "*/*"}
+
+    if check_exists:
+        tipo, destino = _existing_destino(carpeta_base, nombre, exts)
+        if destino and sincronizar and sincro is not None:
+            return _revalidar(base_no_ext, destino, headers, reintentos, log_txt, log_json,
+                              segmentos, seg_umbral, cancelar, pausa, dedup, sincro)
+        if destino:
+            msg = f"SKIP ({tipo} exists): {destino}"
+            append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"skip","type":tipo,"path":destino,"timestamp":time.time()})
+            return msg
+
+    orden, directo = _plan_exts(exts, predictor, serie, indice, ext_hint)
+    for n, ext in enumerate(orden):
+        _esperar_pausa(pausa, cancelar)
+        if _cancelado(cancelar):
+            return f"CANCELLED: {base_no_ext}"
+        url = f"{base_no_ext}.{ext}"
+        tipo, sub, etiqueta = ext_tipo(ext)
+        destino = os.path.join(carpeta_base, sub, f"{nombre}.{ext}")
+        r_head = None
+        if n == 0 and directo:
+            # GET directo: si el servidor responde 404 cuesta lo mismo que el HEAD
+            status = 200
+            if predictor is not None:
+                predictor.count("get_directo")
+        else:
+            try:
+                r_head = _SESSION_POOL.head(url, headers=headers, timeout=8, allow_redirects=True)
+                status = r_head.status_code
+            except Exception:
+                status = None   # try direct
+            if predictor is not None:
+                predictor.count("heads")
+            if status is not None and status != 200:
+                continue
+        # el HEAD ya trae ETag y tamaño: un contenido conocido no necesita ni el GET
+        orig = _dedup_por_etag(dedup, url, r_head.headers, destino) if dedup is not None and r_head is not None else None
+        try:
+            ok, detail = ((True, f"DUP_ETAG:{orig}") if orig else
+                          download_with_resume(url, destino, headers, reintentos=reintentos, segmentos=segmentos,
+                                               seg_umbral=seg_umbral, cancelar=cancelar, pausa=pausa, dedup=dedup,
+                                               sincro=sincro))
+        except Exception:
+            continue
+        if detail == "CANCELLED":
+            return f"CANCELLED: {base_no_ext}"
+        if ok:
+            if predictor is not None:
+                predictor.record(serie, indice, ext, primera=(n == 0))
+            _sincro_ok(sincro, destino, r_head.headers if orig else None, guardar=sincronizar)
+            return _log_ok(log_txt, log_json, etiqueta, tipo, destino, detail, dedup)
+        if status == 200 and detail.startswith("BLOCK"):
+            msg = f"BLOCKED {detail}: {url}"
+            append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"blocked","detail":detail,"url":url,"timestamp":time.time()})
+            return msg
+        if n == 0 and directo and predictor is not None:
+            predictor.count("get_directo_fallo")
+
+    msg = f"NOTFOUND: {base_no_ext}"
+    append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"notfound","base":base_no_ext,"timestamp":time.time()})
+    return msg
+
+def _sincro_ok(sincro, destino, cabeceras=None, guardar=False):
+    """Validadores del fichero terminado: los del .part o, si no hubo cuerpo, los del HEAD.
+    Se escriben en disco solo con guardar (re-sincronización), ver sincro.ValidatorStore.put."""
+    if sincro is None:
+        return
+    if cabeceras is not None:
+        sincro.put(destino, cabeceras, guardar=guardar)
+    else:
+        sincro.promote(destino + ".part", destino, guardar=guardar)
+
+def _revalidar(base_no_ext, destino, headers, reintentos, log_txt, log_json,
+               segmentos=SEG_PARTES, seg_umbral=SEG_UMBRAL, cancelar=None, pausa=None, dedup=None, sincro=None):
+    """Re-sincronización de un fichero existente. Con validadores guardados, GET condicional
+    (If-None-Match / If-Modified-Since): 304 no trae cuerpo y un 200 ya es la versión nueva.
+    Sin ellos, HEAD: mismo tamaño = sin cambios y sus validadores quedan como referencia.
+    La versión nueva se escribe en .part y sustituye al fichero solo al terminar; si el objeto
+    ya no está en el origen se conserva la copia local."""
+    ext = destino.rsplit(".", 1)[1]
+    tipo, _, etiqueta = ext_tipo(ext)
+    url = f"{base_no_ext}.{ext}"
+    temp = destino + ".part"
+    sincro.count("revalidados")
+    cond = condicionales(sincro.get(destino))
+    estado, res = None, None
+    try:
+        if cond:
+            r = _SESSION_POOL.get(url, stream=True, headers=dict(headers, **cond), timeout=TIMEOUT_BASE,
+                                  allow_redirects=True)
+            with r:
+                if r.status_code == 200:
+                    res = _consume_response(r, temp, destino, "wb", 0, None, cancelar, pausa, dedup, url, sincro)
+            status = r.status_code
+        else:
+            sincro.count("sin_validadores")
+            r = _SESSION_POOL.head(url, headers=headers, timeout=8, allow_redirects=True)
+            status = r.status_code
+            if status == 200 and validadores(r.headers)["s"] == os.path.getsize(destino):
+                sincro.put(destino, r.headers, guardar=True)
+                status = 304
+        if status == 304:
+            estado = "unchanged"
+        elif status in (404, 410):
+            estado = "gone"
+        elif status in (403, 429):
+            estado = "error"
+    except Exception:
+        estado = "error"
+    if estado is None:
+        if res is None or res == _PAUSADA:
+            # sin validadores y tamaño distinto, o el cuerpo se cortó: descarga normal (reanuda el .part)
+            res = download_with_resume(url, destino, headers, reintentos=reintentos, segmentos=segmentos,
+                                       seg_umbral=seg_umbral, cancelar=cancelar, pausa=pausa, dedup=dedup,
+                                       sincro=sincro)
+        ok, detail = res
+        if detail == "CANCELLED":
+            return f"CANCELLED: {base_no_ext}"
+        if ok:
+            sincro.count("actualizados")
+            _sincro_ok(sincro, destino, guardar=True)
+            return _log_ok(log_txt, log_json, etiqueta, tipo, destino, detail, dedup, sync="updated")
+        estado = "error"
+    if estado == "unchanged":
+        sincro.count("sin_cambios")
+        msg = f"SKIP ({tipo} sin cambios): {destino}"
+    elif estado == "gone":
+        sincro.count("desaparecidos")
+        msg = f"SKIP ({tipo} exists, ya no está en el origen): {destino}"
+    else:
+        msg = f"SKIP ({tipo} exists, revalidación fallida): {destino}"
+    append_log_txt(log_txt, msg)
+    append_log_json(log_json, {"status":"skip","type":tipo,"path":destino,"sync":estado,"timestamp":time.time()})
+    return msg
+
+def _log_ok(log_txt, log_json, etiqueta, tipo, destino, detail, dedup=None, sync=None):
+    """Mensaje y registro de una descarga correcta; los duplicados llevan el original y cómo se resolvió."""
+    msg = f"{etiqueta} OK: {destino}" + (" (actualizado)" if sync == "updated" else "")
+    rec = {"status":"ok","type":tipo,"path":destino,"timestamp":time.time()}
+    if sync:
+        rec["sync"] = sync
+    if detail.startswith("DUP"):
+        via, _, orig = detail.partition(":")
+        msg += f" (duplicado de {orig})"
+        rec.update(dup_of=orig, dedup=dedup.modo if dedup is not None else None, via_etag=via == "DUP_ETAG")
+    append_log_txt(log_txt, msg); append_log_json(log_json, rec)
+    return msg
+
+def _item_kwargs(opciones, i):
+    """kwargs por elemento para worker_job/async_worker_job a partir de las opciones de sesión."""
+    opciones = opciones or {}
+    hints = opciones.get("hints") or {}
+    return {"exts": opciones.get("exts", DEFAULT_EXTS), "predictor": opciones.get("predictor"),
+            "serie": opciones.get("serie"), "indice": i, "ext_hint": hints.get(i),
+            "segmentos": opciones.get("segmentos", SEG_PARTES), "seg_umbral": opciones.get("seg_umbral", SEG_UMBRAL),
+            "cancelar": opciones.get("cancelar"), "pausa": opciones.get("pausa"), "dedup": opciones.get("dedup"),
+            "sincro": opciones.get("sincro"), **({"sincronizar": True} if opciones.get("sincronizar") else {})}
+
+def _sin_red(b, carpeta_base, check_exists, kw):
+    """True si worker_job resolverá el elemento sin peticiones (SKIP de un fichero existente)."""
+    if not check_exists or (kw.get("sincronizar") and kw.get("sincro") is not None):
+        return False
+    return _existing_destino(carpeta_base, os.path.basename(b), kw["exts"])[1] is not None
+
+def _worker_prepagado(url, *args, **kw):
+    """worker_job cuya primera petición a ese host ya tiene su token reservado."""
+    _RATE_LIMITER.set_prepaid(url)
+    try:
+        return worker_job(*args, **kw)
+    finally:
+        _RATE_LIMITER.set_prepaid(None)
+
+def _iter_thread_results(items, carpeta_base, reintentos, hilos, check_exists=True, opciones=None):
+    """Motor clásico: ThreadPoolExecutor con worker_job. items = (índice, base), puede ser un
+    generador: se consume a medida que hay hueco, así que la memoria no depende del rango.
+    Entrega (índice, resultado) al terminar cada uno. En vuelo como mucho 2*hilos (uno corriendo
+    y uno en cola por hilo) o, con opciones["control"] (AIMDController), lo que marque su ventana.
+    Con opciones["cancelar"] activado no se envía nada más, se cancela lo que seguía en cola y
+    los activos cortan su descarga en el siguiente chunk. Con opciones["pausa"] activada no se
+    envía nada nuevo y los activos se detienen entre chunks. opciones["cupo"] (trabajos en
+    paralelo) es un límite más, compartido con otras series: cada elemento necesita su ficha.
+    El token del límite por host de la primera petición se reserva aquí y el elemento espera
+    en este bucle hasta que toca, sin ocupar hilo, ficha AIMD ni cupo (como el motor async)."""
+    opciones = opciones or {}
+    control = opciones.get("control")
+    cancelar = opciones.get("cancelar")
+    pausa = opciones.get("pausa")
+    cupo = opciones.get("cupo")
+    hilos = max(1, int(hilos))
+    trabajadores = control.maximo if control is not None else hilos
+    pendientes = iter(items)
+    agotado = False
+    retenido = None     # (índice, base, kwargs, instante en que toca su token o None si no hace falta)
+    en_vuelo = {}
+
+    def hay_hueco():
+        if _pausado(pausa):
+            return False
+        if control is None and len(en_vuelo) >= (hilos if cupo is not None else 2 * hilos):
+            return False
+        if cupo is not None and not cupo.try_acquire():
+            return False
+        if control is not None and not control.try_acquire():
+            if cupo is not None:
+                cupo.release()
+            return False
+        return True
+
+    def soltar():
+        if control is not None:
+            control.release()
+        if cupo is not None:
+            cupo.release()
+
+    with ThreadPoolExecutor(max_workers=trabajadores) as ex:
+        while True:
+            if _cancelado(cancelar) and not agotado:
+                agotado = True
+                retenido = None
+                for fut in list(en_vuelo):
+                    if fut.cancel():
+                        en_vuelo.pop(fut)
+                        soltar()
+            while not agotado:
+                if retenido is None:
+                    siguiente = next(pendientes, None)
+                    if siguiente is None:
+                        agotado = True
+                        break
+                    i, b = siguiente
+                    kw = _item_kwargs(opciones, i)
+                    toca = None
+                    if not _sin_red(b, carpeta_base, check_exists, kw):
+                        toca = time.monotonic() + _RATE_LIMITER.reserve(b)
+                    retenido = (i, b, kw, toca)
+                if (retenido[3] or 0) > time.monotonic() or not hay_hueco():
+                    break
+                i, b, kw, toca = retenido
+                retenido = None
+                if toca is not None:
+                    fut = ex.submit(_worker_prepagado, b, b, carpeta_base, reintentos, check_exists, **kw)
+                else:
+                    fut = ex.submit(worker_job, b, carpeta_base, reintentos, check_exists, **kw)
+                en_vuelo[fut] = i
+            if not en_vuelo and retenido is None:
+                return
+            # timeout corto: si la ventana crece (o llega la detención) se atiende sin esperar a un resultado;
+            # si hay un elemento esperando su token, se despierta justo cuando toca
+            timeout = 0.25
+            if retenido is not None and retenido[3] is not None:
+                timeout = min(timeout, max(0.0, retenido[3] - time.monotonic()))
+            if not en_vuelo:
+                time.sleep(timeout)
+                continue
+            hechos, _ = futures_wait(list(en_vuelo), timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in hechos:
+                soltar()
+                i = en_vuelo.pop(fut)
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    res = f"ERROR EXCEPCION: {e}\n{traceback.format_exc()}"
+                yield i, res
+
+# -----------------------------
+# Async engine (asyncio + aiohttp): mismo flujo que worker_job en un solo event loop
+# -----------------------------
+async def async_download_with_resume(session, url, destino, headers, reintentos=DEFAULT_REINTENTOS,
+                                     segmentos=SEG_PARTES, seg_umbral=SEG_UMBRAL, pausa=None, dedup=None,
+                                     sincro=None):
+    """Equivalente async de download_with_resume (mismos códigos de resultado, mismo .seg, misma pausa,
+    mismo dedup y mismo If-Range con sincro)."""
+    temp = destino + ".part"
+    ir = if_range(sincro.get(temp)) if sincro is not None else None
+    if os.path.exists(_seg_path(destino)):
+        if segmentos > 1:
+            res = await _async_download_segmented(session, url, temp, destino,
+                                                  dict(headers, **{"If-Range": ir}) if ir else headers,
+                                                  reintentos, segmentos,
+                                                  state=_SegState.load(_seg_path(destino), temp), pausa=pausa)
+            if res is not None:
+                return _dedup_tras(dedup, res, destino, url)
+        _discard_segmented(temp, destino)
+        segmentos = 1
+    intento = 0
+    while intento < reintentos:
+        await _async_esperar_pausa(pausa)
+        intento += 1
+        if intento > 1:
+            net_retry(url)
+        h = headers.copy()
+        mode = "wb"
+        pos = 0
+        if os.path.exists(temp):
+            pos = os.path.getsize(temp)
+            if pos > 0:
+                h["Range"] = f"bytes={pos}-"
+                mode = "ab"
+                ir = if_range(sincro.get(temp)) if sincro is not None else None
+                if ir:
+                    h["If-Range"] = ir
+        elif segmentos > 1:
+            h["Range"] = "bytes=0-"
+        try:
+            await _RATE_LIMITER.acquire_async(url)
+            t0 = time.monotonic()
+            async with session.get(url, headers=h, allow_redirects=True) as r:
+                aimd_observe(url, r.status, time.monotonic() - t0)
+                total = _content_range_total(r.headers.get("Content-Range")) if r.status == 206 and pos == 0 else None
+                if segmentos > 1 and total and total >= seg_umbral:
+                    seg_headers = headers
+                    if sincro is not None:
+                        sincro.put(temp, r.headers, total)
+                        ir = if_range(validadores(r.headers, total))
+                        if ir:
+                            seg_headers = dict(headers, **{"If-Range": ir})
+                    orig = _dedup_por_etag(dedup, url, r.headers, destino, total) if dedup is not None else None
+                    if orig:
+                        return (True, f"DUP_ETAG:{orig}")
+                    res = await _async_download_segmented(session, url, temp, destino, seg_headers, reintentos, segmentos,
+                                                          total=total, first=r, pausa=pausa)
+                    if res is not None:
+                        return _dedup_tras(dedup, res, destino, url, r.headers)
+                    _discard_segmented(temp, destino)
+                    segmentos = 1
+                    continue
+                if r.status in (403, 429):
+                    return (False, f"BLOCK_{r.status}")
+                if r.status == 416:
+                    if os.path.exists(temp):
+                        _finalize_part(temp, destino)
+                        return _dedup_tras(dedup, (True, "RESUMED_RENAMED"), destino, url)
+                    return (False, f"HTTP_{r.status}")
+                if r.status not in (200, 206):
+                    return (False, f"HTTP_{r.status}")
+                if r.status == 200 and pos:
+                    mode, pos = "wb", 0   # el servidor ignoró el Range o el If-Range no casó: cuerpo completo
+                if sincro is not None and not pos:
+                    sincro.put(temp, r.headers)
+                hasher = None
+                if dedup is not None:
+                    if r.status == 200:
+                        orig = _dedup_por_etag(dedup, url, r.headers, destino)
+                        if orig:
+                            return (True, f"DUP_ETAG:{orig}")
+                    hasher = hash_file(temp) if mode == "ab" else new_hasher()
+                    cabeceras = r.headers
+                medida = _Transferencia(url)
+                escritos = 0
+                try:
+                    with open(temp, mode) as f:
+                        async for chunk in r.content.iter_chunked(ASYNC_CHUNK):
+                            f.write(chunk)
+                            escritos += len(chunk)
+                            if hasher is not None:
+                                hasher.update(chunk)
+                            if _pausado(pausa):
+                                await medida.esperar_async(pausa)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                    await asyncio.sleep(0.5)
+                    continue
+                finally:
+                    medida.cerrar(escritos)
+            _finalize_part(temp, destino)
+            if hasher is not None:
+                return _dedup_tras(dedup, (True, "OK"), destino, url, cabeceras, hasher.hexdigest())
+            return (True, "OK")
+        except _PausaLarga:
+            intento -= 1   # conexión cerrada por pausa larga: se sigue con Range al reanudar
+            continue
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            if isinstance(e, (asyncio.TimeoutError, aiohttp.ClientConnectionError)):
+                aimd_observe(url, timeout=True)
+            await asyncio.sleep(random.uniform(1.0, 2.5))
+            continue
+    return (False, "FAILED_RETRIES")
+
+async def _async_write_segment(chunks, temp, state, k, progress, pausa=None, url=None):
+    medida = _Transferencia(url)
+    escritos = 0
+    try:
+        with open(temp, "r+b") as f:
+            f.seek(state.offset(k))
+            async for chunk in chunks:
+                resto = state.remaining(k)
+                if len(chunk) > resto:
+                    chunk = chunk[:resto]
+                f.write(chunk)
+                escritos += len(chunk)
+                state.advance(k, len(chunk))
+                progress()
+                if state.remaining(k) <= 0:
+                    return True
+                if _pausado(pausa):
+                    await medida.esperar_async(pausa)
+        return state.remaining(k) <= 0
+    finally:
+        medida.cerrar(escritos)
+
+async def _async_fetch_segment(session, url, temp, headers, state, k, reintentos, progress, pausa=None):
+    """Como _fetch_segment: "ok", "fail", "norange" o "BLOCK_xxx"."""
+    intento = 0
+    while intento < reintentos:
+        await _async_esperar_pausa(pausa)
+        if state.remaining(k) <= 0:
+            return "ok"
+        intento += 1
+        if intento > 1:
+            net_retry(url)
+        h = headers.copy()
+        h["Range"] = f"bytes={state.offset(k)}-{state.segs[k][1]}"
+        try:
+            await _RATE_LIMITER.acquire_async(url)
+            t0 = time.monotonic()
+            async with session.get(url, headers=h, allow_redirects=True) as r:
+                aimd_observe(url, r.status, time.monotonic() - t0)
+                if r.status in (403, 429):
+                    return f"BLOCK_{r.status}"
+                if r.status != 206 or _content_range_total(r.headers.get("Content-Range")) != state.size:
+                    return "norange"
+                if await _async_write_segment(r.content.iter_chunked(SEG_CHUNK), temp, state, k, progress, pausa, url):
+                    return "ok"
+        except _PausaLarga:
+            state.save()
+            intento -= 1
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            await asyncio.sleep(random.uniform(1.0, 2.5))
+    return "fail"
+
+async def _async_download_segmented(session, url, temp, destino, headers, reintentos, partes,
+                                    total=None, first=None, state=None, pausa=None):
+    if state is None:
+        if total is None:
+            return None
+        state = _SegState.plan(_seg_path(destino), total, partes)
+        with open(temp, "wb") as f:
+            _preallocate(f, total)
+        state.save()
+    progress = _seg_progress(state, None)
+    pendientes = state.pending()
+    tareas = [_async_fetch_segment(session, url, temp, headers, state, k, reintentos, progress, pausa)
+              for k in pendientes if not (first is not None and k == 0)]
+
+    async def primero():
+        try:
+            if await _async_write_segment(first.content.iter_chunked(SEG_CHUNK), temp, state, 0, progress, pausa, url):
+                return "ok"
+        except (_PausaLarga, aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            pass
+        return await _async_fetch_segment(session, url, temp, headers, state, 0, reintentos, progress, pausa)
+
+    if first is not None and 0 in pendientes:
+        tareas.append(primero())
+    try:
+        resultados = await asyncio.gather(*tareas)
+    except asyncio.CancelledError:
+        state.save()   # detención: lo escrito hasta aquí se reanuda en la próxima sesión
+        raise
+    return _seg_outcome(list(resultados), state, temp, destino)
+
+async def _async_head_status(session, url, headers):
+    """(status, cabeceras) del HEAD."""
+    await _RATE_LIMITER.acquire_async(url)
+    t0 = time.monotonic()
+    try:
+        async with session.head(url, headers=headers, allow_redirects=True,
+                                timeout=aiohttp.ClientTimeout(total=8)) as r:
+            aimd_observe(url, r.status, time.monotonic() - t0)
+            return r.status, r.headers
+    except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+        aimd_observe(url, timeout=True)
+        raise
+
+async def async_worker_job(session, base_no_ext, carpeta_base, reintentos, check_exists=True,
+                           exts=DEFAULT_EXTS, predictor=None, serie=None, indice=None, ext_hint=None,
+                           segmentos=SEG_PARTES, seg_umbral=SEG_UMBRAL, cancelar=None, pausa=None, dedup=None,
+                           sincro=None, sincronizar=False):
+    """Versión async de worker_job: mismo orden de extensiones, mismos mensajes y logs.
+    La cancelación llega como CancelledError desde _async_run; cancelar solo evita empezar otra extensión.
+    La re-sincronización (sincronizar) es solo del motor de hilos: run_downloads no la manda aquí."""
+    nombre = os.path.basename(base_no_ext)
+    _ensure_dirs(carpeta_base)
+
+    log_txt = os.path.join(carpeta_base, "download.log.txt")
+    log_json = os.path.join(carpeta_base, "download.log.jsonl")
+
+    headers = {"User-Agent": random.choice(USER_AGENTS),
+               "Referer": urlparse(base_no_ext).scheme + "://" + urlparse(base_no_ext).netloc,
+               "Accept": "*/*"}
+
+    if check_exists:
+        tipo, destino = _existing_destino(carpeta_base, nombre, exts)
+        if destino:
+            msg = f"SKIP ({tipo} exists): {destino}"
+            append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"skip","type":tipo,"path":destino,"timestamp":time.time()})
+            return msg
+
+    orden, directo = _plan_exts(exts, predictor, serie, indice, ext_hint)
+    for n, ext in enumerate(orden):
+        await _async_esperar_pausa(pausa, cancelar)
+        if _cancelado(cancelar):
+            return f"CANCELLED: {base_no_ext}"
+        url = f"{base_no_ext}.{ext}"
+        tipo, sub, etiqueta = ext_tipo(ext)
+        destino = os.path.join(carpeta_base, sub, f"{nombre}.{ext}")
+        cabeceras = None
+        if n == 0 and directo:
+            status = 200
+            if predictor is not None:
+                predictor.count("get_directo")
+        else:
+            try:
+                status, cabeceras = await _async_head_status(session, url, headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = None   # como en worker_job: si el HEAD falla, intentar directo
+            if predictor is not None:
+                predictor.count("heads")
+            if status is not None and status != 200:
+                continue
+        orig = _dedup_por_etag(dedup, url, cabeceras, destino) if dedup is not None and cabeceras is not None else None
+        if orig:
+            ok, detail = True, f"DUP_ETAG:{orig}"
+        else:
+            ok, detail = await async_download_with_resume(session, url, destino, headers, reintentos=reintentos,
+                                                          segmentos=segmentos, seg_umbral=seg_umbral, pausa=pausa,
+                                                          dedup=dedup, sincro=sincro)
+        if ok:
+            if predictor is not None:
+                predictor.record(serie, indice, ext, primera=(n == 0))
+            _sincro_ok(sincro, destino, cabeceras if orig else None)
+            return _log_ok(log_txt, log_json, etiqueta, tipo, destino, detail, dedup)
+        if status == 200 and detail.startswith("BLOCK"):
+            msg = f"BLOCKED {detail}: {url}"
+            append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"blocked","detail":detail,"url":url,"timestamp":time.time()})
+            return msg
+        if n == 0 and directo and predictor is not None:
+            predictor.count("get_directo_fallo")
+
+    msg = f"NOTFOUND: {base_no_ext}"
+    append_log_txt(log_txt, msg); append_log_json(log_json, {"status":"notfound","base":base_no_ext,"timestamp":time.time()})
+    return msg
+
+def _net_trace_config():
+    """TraceConfig de aiohttp: cada petición del motor async (y cada salto de redirección) va a la
+    telemetría con su conexión nueva, si la hubo, y el tiempo hasta las cabeceras."""
+    tc = aiohttp.TraceConfig()
+
+    async def inicio(session, ctx, params):
+        ctx.t0 = time.perf_counter()
+        ctx.connect = None
+
+    async def conexion_inicio(session, ctx, params):
+        ctx.tc = time.perf_counter()
+
+    async def conexion_fin(session, ctx, params):
+        ctx.connect = time.perf_counter() - ctx.tc
+
+    async def respuesta(session, ctx, params):
+        net_observe(str(params.url), params.method, params.response.status, ctx.connect, time.perf_counter() - ctx.t0)
+        ctx.t0, ctx.connect = time.perf_counter(), None   # el siguiente salto de una redirección mide lo suyo
+
+    async def fallo(session, ctx, params):
+        net_observe(str(params.url), params.method, connect=ctx.connect, error=True)
+
+    tc.on_request_start.append(inicio)
+    tc.on_connection_create_start.append(conexion_inicio)
+    tc.on_connection_create_end.append(conexion_fin)
+    tc.on_request_redirect.append(respuesta)
+    tc.on_request_end.append(respuesta)
+    tc.on_request_exception.append(fallo)
+    return tc
+
+async def _async_run(items, carpeta_base, reintentos, concurrencia, on_result, check_exists=True,
+                     opciones=None):
+    timeout = aiohttp.ClientTimeout(sock_connect=TIMEOUT_BASE[0], sock_read=TIMEOUT_BASE[1])
+    connector = aiohttp.TCPConnector(limit=concurrencia, limit_per_host=0)
+    pendientes = iter(items)
+    control = (opciones or {}).get("control")
+    cancelar = (opciones or {}).get("cancelar")
+    pausa = (opciones or {}).get("pausa")
+    cupo = (opciones or {}).get("cupo")
+
+    def soltar():
+        if control is not None:
+            control.release()
+        if cupo is not None:
+            cupo.release()
+
+    async def runner(session):
+        # N corrutinas tirando de un iterador compartido: memoria plana aunque el rango sea enorme;
+        # con control AIMD (y cupo de trabajos en paralelo) solo avanzan las que tengan ficha
+        while not _cancelado(cancelar):
+            await _async_esperar_pausa(pausa, cancelar)
+            if cupo is not None:
+                while not cupo.try_acquire():
+                    await asyncio.sleep(0.05)
+            if control is not None:
+                while not control.try_acquire():
+                    await asyncio.sleep(0.05)
+            siguiente = next(pendientes, None)
+            if siguiente is None:
+                soltar()
+                return
+            i, b = siguiente
+            try:
+                res = await async_worker_job(session, b, carpeta_base, reintentos, check_exists,
+                                             **_item_kwargs(opciones, i))
+            except asyncio.CancelledError:
+                # detención: la petición en curso se aborta y su conexión se libera; el .part se conserva
+                on_result((i, f"CANCELLED: {b}"))
+                raise
+            except Exception as e:
+                res = f"ERROR EXCEPCION: {e}\n{traceback.format_exc()}"
+            finally:
+                soltar()
+            on_result((i, res))
+
+    async def vigilar(tareas):
+        while not all(t.done() for t in tareas):
+            if _cancelado(cancelar):
+                for t in tareas:
+                    t.cancel()
+                return
+            await asyncio.sleep(0.1)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     trace_configs=[_net_trace_config()]) as session:
+        tareas = [asyncio.ensure_future(runner(session)) for _ in range(max(1, concurrencia))]
+        if cancelar is not None:
+            asyncio.ensure_future(vigilar(tareas))
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+def iter_async_results(items, carpeta_base, reintentos, concurrencia=DEFAULT_ASYNC_CONCURRENCIA,
+                       check_exists=True, opciones=None):
+    """Ejecuta el motor async en un hilo propio y va entregando (índice, resultado) al terminar,
+    igual que as_completed en el motor de hilos."""
+    if not AIOHTTP_AVAILABLE:
+        raise RuntimeError("aiohttp no está instalado (pip install aiohttp)")
+    resultados = queue.Queue()
+    fin = object()
+
+    def loop_thread():
+        try:
+            asyncio.run(_async_run(items, carpeta_base, reintentos, concurrencia,
+                                   resultados.put, check_exists, opciones))
+        except Exception as e:
+            resultados.put((None, f"ERROR EXCEPCION: {e}\n{traceback.format_exc()}"))
+        finally:
+            resultados.put(fin)
+
+    threading.Thread(target=loop_thread, daemon=True).start()
+    while True:
+        res = resultados.get()
+        if res is fin:
+            return
+        yield res
+
+# -----------------------------
+# Session runner (compartido por GUI y headless)
+# -----------------------------
+def result_status(res):
+    """Clasifica el texto devuelto por worker_job: ok / skip / notfound / blocked / cancelled / error."""
+    if " OK: " in res:
+        return "ok"
+    if res.startswith("SKIP"):
+        return "skip"
+    if res.startswith("NOTFOUND"):
+        return "notfound"
+    if "BLOCKED" in res:
+        return "blocked"
+    if res.startswith("CANCELLED"):
+        return "cancelled"
+    return "error"
+
+def run_downloads(url_base, carpeta, inicio, fin, relleno, hilos, reintentos, emit, **opciones):
+    """Descarga inicio..fin. emit(dict) recibe los mismos eventos que App.queue
+    ({"type":"progress"|"status", ...}). Devuelve un dict resumen por estado.
+    Con usar_diario, los índices ya hechos (o no encontrados) se saltan sin tocar el disco.
+    indices (p.ej. de un mapa de IDs) sustituye a range(inicio, fin+1); ext_hints {índice: ext}
+    (del mismo mapa) permite ir directo a GET. Con prediccion, el orden de extensiones se aprende
+    de los aciertos de la sesión. Con adaptativo, hilos (o la concurrencia async) es solo la ventana
+    inicial: un AIMDController la ajusta entre 1 y max_hilos y sustituye a la pausa de emergencia.
+    Los archivos de al menos seg_umbral bytes se bajan en `segmentos` rangos en paralelo.
+    Los elementos se generan a medida que hay hueco en el motor; stop_event cancela los pendientes
+    y aborta las descargas activas (sus .part quedan para reanudar). pause_event detiene los envíos
+    y las descargas en curso entre chunks (ver download_with_resume). cupo (trabajos.FairBudget)
+    reparte un presupuesto global de elementos en vuelo entre varias sesiones a la vez.
+    dedup (duplicados.DEDUP_*) decide qué hacer con un contenido ya descargado en la carpeta.
+    Con sincronizar, lo ya descargado no se salta: se revalida con ETag / Last-Modified y solo se
+    baja de nuevo lo que cambió en el origen (siempre con el motor de hilos).
+    Con perfil.configure_profiling activo, la sesión se perfila y los ficheros quedan en carpeta."""
+    with profile_session(carpeta) as perfil:
+        resumen = _run_downloads(url_base, carpeta, inicio, fin, relleno, hilos, reintentos, emit, **opciones)
+    if perfil.ficheros:
+        emit({"type":"status","text":"Perfil: " + ", ".join(os.path.basename(p) for p in perfil.ficheros)})
+        append_log_json(os.path.join(carpeta, "download.log.jsonl"),
+                        {"event":"profile","files":perfil.ficheros,"timestamp":time.time()})
+    return resumen
+
+def _run_downloads(url_base, carpeta, inicio, fin, relleno, hilos, reintentos, emit,
+                   lim_err=LIMITE_ERRORES,
+                   motor=DEFAULT_MOTOR, async_concurrencia=DEFAULT_ASYNC_CONCURRENCIA,
+                   stop_event=None, pause_event=None, usar_diario=True, reintentar_notfound=False, indices=None,
+                   exts=DEFAULT_EXTS, prediccion=True, get_directo=True, ext_hints=None,
+                   adaptativo=True, max_hilos=DEFAULT_AIMD_MAX, segmentos=SEG_PARTES, seg_umbral=SEG_UMBRAL,
+                   cupo=None, dedup=DEFAULT_DEDUP, sincronizar=False):
+    """Cuerpo de run_downloads (ver allí)."""
+    stop_event = stop_event or threading.Event()
+    pause_event = pause_event or threading.Event()
+    os.makedirs(carpeta, exist_ok=True)
+    _ensure_dirs(carpeta)
+    log_txt = os.path.join(carpeta, "download.log.txt")
+    log_json = os.path.join(carpeta, "download.log.jsonl")
+
+    indices = range(inicio, fin+1) if indices is None else sorted(set(indices))
+    total = len(indices)
+    completed = 0
+    errores_seguidos = 0
+    resumen = {"ok": 0, "skip": 0, "notfound": 0, "blocked": 0, "cancelled": 0, "error": 0}
+    red_antes = net_export()
+    # abre la sesión en el log (analisis.py la delimita con start/finish)
+    append_log_json(log_json, {"event":"start","url_base":url_base,"relleno":relleno,"inicio":inicio,"fin":fin,
+                               "total":total,"motor":motor,"pid":os.getpid(),"timestamp":time.time()})
+
+    diario = None
+    if usar_diario:
+        try:
+            diario = open_journal(carpeta, url_base, relleno)
+        except Exception as e:
+            emit({"type":"status","text":f"Diario no disponible ({e}): se comprueba el disco por archivo."})
+    if diario is not None and total:
+        lo = indices[0]
+        estados = diario.states(lo, indices[-1])
+        saltar = set() if sincronizar else set(ESTADOS_HECHOS)   # re-sincronizar: lo hecho se revalida
+        if not reintentar_notfound:
+            saltar.add(ESTADO_NOTFOUND)
+        # generador: los motores lo consumen a medida que hay hueco (nada proporcional al rango)
+        items = ((i, f"{url_base}{str(i).zfill(relleno)}") for i in indices if estados[i - lo] not in saltar)
+        hechos = sum(1 for i in indices if estados[i - lo] in saltar and estados[i - lo] in ESTADOS_HECHOS)
+        ausentes = sum(1 for i in indices if estados[i - lo] in saltar) - hechos
+        resumen["skip"] += hechos
+        resumen["notfound"] += ausentes
+        completed = hechos + ausentes
+        if completed:
+            emit({"type":"status","text":f"Diario: {hechos} ya descargados y {ausentes} no encontrados omitidos sin consultar el disco."})
+            emit({"type":"progress","value":completed,"max":total})
+            append_log_json(log_json, {"event":"journal_skip","done":hechos,"notfound":ausentes,"timestamp":time.time()})
+    else:
+        items = ((i, f"{url_base}{str(i).zfill(relleno)}") for i in indices)
+    check_exists = diario is None or sincronizar
+    exts = tuple(exts or DEFAULT_EXTS)
+    predictor = ExtPredictor(exts, get_directo=get_directo) if prediccion and len(exts) > 1 else None
+    opciones = {"exts": exts, "predictor": predictor, "serie": url_base, "hints": ext_hints or {},
+                "segmentos": max(1, int(segmentos or 1)), "seg_umbral": int(seg_umbral or SEG_UMBRAL),
+                "cancelar": stop_event, "pausa": pause_event, "cupo": cupo}
+    indice_dup = None
+    try:
+        indice_dup = open_index(carpeta, dedup)
+    except Exception as e:
+        emit({"type":"status","text":f"Índice de duplicados no disponible ({e}): se guardan todas las copias."})
+    opciones["dedup"] = indice_dup
+    dup_antes = indice_dup.snapshot() if indice_dup is not None else None
+    validadores_st = None
+    try:
+        validadores_st = open_store(carpeta)
+    except Exception as e:
+        emit({"type":"status","text":f"Validadores no disponibles ({e}): reanudación sin If-Range."})
+    opciones["sincro"] = validadores_st
+    sync_antes = validadores_st.snapshot() if validadores_st is not None else None
+    if sincronizar and validadores_st is not None:
+        opciones["sincronizar"] = True
+        if motor == MOTOR_ASYNC:
+            emit({"type":"status","text":"Re-sincronización: se usa el motor de hilos."})
+            motor = MOTOR_HILOS
+
+    if motor == MOTOR_ASYNC and not AIOHTTP_AVAILABLE:
+        emit({"type":"status","text":"Motor asyncio no disponible (falta aiohttp): usando hilos."})
+        motor = MOTOR_HILOS
+    control = None
+    if adaptativo:
+        techo = (max(1, int(async_concurrencia or DEFAULT_ASYNC_CONCURRENCIA)) if motor == MOTOR_ASYNC
+                 else max(int(hilos), int(max_hilos or DEFAULT_AIMD_MAX)))
+        control = aimd_controller(url_base, inicial=hilos, maximo=techo, compartir=cupo is not None)
+        opciones["control"] = control
+        emit({"type":"aimd","window":control.window,"inflight":0,"max":control.maximo,"reason":"inicio"})
+        emit({"type":"status","text":f"Concurrencia adaptativa: ventana inicial {control.window}, máximo {control.maximo}."})
+    if motor == MOTOR_ASYNC:
+        conc = max(1, int(async_concurrencia or DEFAULT_ASYNC_CONCURRENCIA))
+        emit({"type":"status","text":f"Motor asyncio: hasta {conc} elementos en vuelo."})
+        resultados = iter_async_results(items, carpeta, reintentos, concurrencia=conc,
+                                        check_exists=check_exists, opciones=opciones)
+    else:
+        resultados = _iter_thread_results(items, carpeta, reintentos, hilos, check_exists, opciones)
+
+    stop_avisado = False
+    ventana = control.window if control is not None else None
+    host = urlparse(url_base).netloc.lower()
+    ultimo_rate = time.time()
+    try:
+        for i, res in resultados:
+            completed += 1
+            resumen[result_status(res)] += 1
+            if diario is not None and i is not None:
+                estado = state_from_result(res)
+                if estado is not None:
+                    diario.mark(i, estado)
+            emit({"type":"progress","value":completed,"max":total})
+            emit({"type":"status","text":res,"result":result_status(res)})
+            if time.time() - ultimo_rate >= RATE_REPORT_INTERVAL:
+                ultimo_rate = time.time()
+                rs = rate_stats().get(host)
+                if rs:
+                    emit({"type":"rate","host":host,"rps":rs["rps"],"achieved":rs["achieved"],"waits":rs["waits"]})
+
+            if control is not None:
+                if control.window != ventana:
+                    snap = control.snapshot()
+                    emit({"type":"aimd","window":snap["window"],"inflight":snap["inflight"],"max":snap["max"],
+                          "reason":snap["last_reason"] if snap["window"] < ventana else "", "ttfb_ms":snap["ttfb_ms"]})
+                    if snap["window"] < ventana:
+                        append_log_txt(log_txt, f"AIMD: ventana {ventana} -> {snap['window']} ({snap['last_reason']})")
+                    append_log_json(log_json, {"event":"aimd","from":ventana,"window":snap["window"],
+                                               "reason":snap["last_reason"] if snap["window"] < ventana else "increase",
+                                               "ttfb_ms":snap["ttfb_ms"],"timestamp":time.time()})
+                    ventana = snap["window"]
+            elif res.startswith("NOTFOUND") or "BLOCKED" in res or res.startswith("HTTP_"):
+                errores_seguidos += 1
+            else:
+                errores_seguidos = 0
+
+            if errores_seguidos >= lim_err:
+                emit({"type": "status", "text": f"⚠ Muchos errores seguidos ({errores_seguidos}) — pausa de emergencia {PAUSA_EMERGENCIA}s"})
+                time.sleep(PAUSA_EMERGENCIA)
+                errores_seguidos = 0
+
+            while pause_event.is_set():
+                time.sleep(0.5)
+                if stop_event.is_set():
+                    break
+
+            if stop_event.is_set() and not stop_avisado:
+                emit({"type":"status","text":"Detención solicitada: pendientes cancelados, abortando descargas activas (.part conservados)."})
+                stop_avisado = True
+    finally:
+        if control is not None:
+            aimd_release(url_base, control)
+        if validadores_st is not None:
+            validadores_st.flush_parts()
+
+    if resumen["cancelled"] or (stop_event.is_set() and completed < total):
+        emit({"type":"status","text":f"Detenido: {resumen['cancelled']} descargas abortadas, "
+                                     f"{total - completed} elementos sin empezar."})
+        append_log_json(log_json, {"event":"stopped","cancelled":resumen["cancelled"],
+                                   "not_started":total - completed,"timestamp":time.time()})
+
+    st = pool_stats()
+    emit({"type":"status","text":f"Pool HTTP: {st['conn_reused']} conexiones reutilizadas, {st['conn_new']} nuevas ({st['sessions']} hosts)."})
+    if control is not None:
+        snap = control.snapshot()
+        emit({"type":"status","text":f"Concurrencia adaptativa: ventana final {snap['window']} "
+                                     f"({snap['increases']} subidas, {snap['decreases']} bajadas)."})
+    rs = rate_stats().get(host)
+    if rs:
+        emit({"type":"rate","host":host,"rps":rs["rps"],"achieved":rs["achieved"],"waits":rs["waits"]})
+        limite = f"límite {rs['rps']:g} req/s" if rs["rps"] else "sin límite"
+        emit({"type":"status","text":f"Tasa {host}: {rs['achieved']:g} req/s conseguidas ({limite}), "
+                                     f"{rs['waits']} esperas ({rs['waited_s']:g} s en total)."})
+    if predictor is not None and predictor.stats["items"]:
+        ps = predictor.stats
+        emit({"type":"status","text":f"Predicción de extensión: {ps['acierto_primera']}/{ps['items']} acertadas a la primera, "
+                                     f"{ps['get_directo']} GET sin HEAD ({ps['get_directo_fallo']} fallidos), {ps['heads']} HEAD."})
+    dup = None
+    if indice_dup is not None:
+        dup = {k: v - dup_antes.get(k, 0) for k, v in indice_dup.snapshot().items()}
+        if dup["enlazados"] or dup["omitidos"]:
+            emit({"type":"status","text":f"Duplicados: {dup['enlazados']} enlazados y {dup['omitidos']} omitidos "
+                                         f"({dup['bytes_ahorrados'] / (1024 * 1024):.1f} MB ahorrados), "
+                                         f"{dup['por_etag']} reconocidos por ETag sin bajar el cuerpo."})
+    sync = None
+    if opciones.get("sincronizar"):
+        sync = {k: v - sync_antes.get(k, 0) for k, v in validadores_st.snapshot().items()}
+        emit({"type":"status","text":f"Re-sincronización: {sync['revalidados']} revalidados, {sync['sin_cambios']} sin cambios, "
+                                     f"{sync['actualizados']} actualizados, {sync['desaparecidos']} ya no están en el origen "
+                                     f"({sync['sin_validadores']} sin validadores guardados, comprobados por tamaño)."})
+    # telemetría de la sesión (con trabajos en paralelo incluye lo de los demás en el mismo host)
+    red = net_summary(net_diff(net_export(), red_antes))
+    for netloc in sorted(red, key=lambda n: n != host):
+        emit({"type":"status","text":format_summary(netloc, red[netloc])})
+    if diario is not None:
+        diario.close()
+    append_log_txt(log_txt, "==== FIN DE SESIÓN ====")
+    append_log_json(log_json, {"event":"finish","timestamp":time.time(),"pool":st,"log":log_writer_stats(),
+                               "prediccion":dict(predictor.stats) if predictor is not None else None,
+                               "aimd":control.snapshot() if control is not None else None,
+                               "rate":rate_stats(),"dedup":dup,"sync":sync,"red":red})
+    _LOG_WRITER.end_session()
+    lw = log_writer_stats()
+    if lw["dropped"] or lw["backpressured"]:
+        emit({"type":"status","text":f"Log: {lw['backpressured']} líneas con backpressure, {lw['dropped']} descartadas."})
+    resumen["total"] = total
+    return resumen
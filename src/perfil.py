@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - perfilado opcional de una sesión (sin GUI, solo biblioteca estándar)
+- "cprofile": cProfile en el hilo de la sesión y en cada hilo que arranque durante ella
+  (los workers), sumados en un solo .prof (snakeviz, `python -m pstats`) más un resumen .txt
+- "muestreo": un hilo toma la pila de todos los hilos cada PROFILE_SAMPLE_MS (también el de Tk)
+  y escribe pilas plegadas .folded (speedscope, flamegraph.pl); coste casi fijo, sin tocar el código
+- Traza: tramos con nombre (probe, get, download, body, write, log, ui...) en formato Chrome Trace
+  (.trace.json: Perfetto, chrome://tracing); desactivada, span() devuelve un contexto vacío compartido
+- Los ficheros van junto a los logs de la carpeta destino: perfil_<fecha>_<pid>.*
+- Sesiones a la vez (cola de trabajos, fragmentos de un hijo) comparten un único perfilado:
+  empieza con la primera y se escribe al cerrar la última
+"""
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+from collections import Counter
+
+PROFILE_NO = "no"
+PROFILE_CPROFILE = "cprofile"
+PROFILE_MUESTREO = "muestreo"
+PROFILE_MODOS = (PROFILE_NO, PROFILE_CPROFILE, PROFILE_MUESTREO)
+PROFILE_SAMPLE_MS = 5          # intervalo del muestreo
+PROFILE_MAX_DEPTH = 96         # marcos por pila muestreada (los más cercanos a la raíz se pierden)
+PROFILE_TOP = 60               # funciones en el resumen .txt de cProfile
+TRACE_MAX_EVENTS = 2000000     # tramos guardados como mucho por sesión (el resto se cuentan)
+
+_AJUSTES = {"modo": PROFILE_NO, "traza": False, "muestreo_ms": PROFILE_SAMPLE_MS}
+
+def configure_profiling(modo=None, traza=None, muestreo_ms=None):
+    """Modo de perfilado (PROFILE_*) y traza para las próximas sesiones. Devuelve los ajustes."""
+    if modo in PROFILE_MODOS:
+        _AJUSTES["modo"] = modo
+    if traza is not None:
+        _AJUSTES["traza"] = bool(traza)
+    if muestreo_ms is not None:
+        _AJUSTES["muestreo_ms"] = max(1, int(muestreo_ms))
+    return dict(_AJUSTES)
+
+def profiling_config():
+    return dict(_AJUSTES)
+
+# -----------------------------
+# Traza (Chrome Trace Event Format)
+# -----------------------------
+_TRAZA = None   # Traza de la sesión en curso o None: lo único que miran span() y trazado()
+
+class Traza:
+    """Tramos completos ("ph": "X") en memoria; se escriben al cerrar la sesión."""
+
+    def __init__(self, maximo=TRACE_MAX_EVENTS):
+        self.t0 = time.perf_counter_ns()
+        self.maximo = maximo
+        self.eventos = []
+        self.hilos = {}
+        self.descartados = 0
+
+    def registrar(self, nombre, cat, inicio, fin, detalle=None):
+        if len(self.eventos) >= self.maximo:
+            self.descartados += 1
+            return
+        tid = threading.get_native_id()
+        if tid not in self.hilos:
+            self.hilos[tid] = threading.current_thread().name
+        # list.append es atómico con el GIL: no hace falta lock
+        self.eventos.append((nombre, cat, inicio, fin - inicio, tid, detalle))
+
+    def escribir(self, path):
+        pid = os.getpid()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"displayTimeUnit":"ms","otherData":')
+            json.dump({"descartados": self.descartados, "pid": pid}, f)
+            f.write(',"traceEvents":[\n')
+            f.write(json.dumps({"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+                                "args": {"name": f"downloader {pid}"}}))
+            for tid, nombre in list(self.hilos.items()):
+                f.write(",\n" + json.dumps({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid,
+                                            "args": {"name": nombre}}))
+            for nombre, cat, inicio, dur, tid, detalle in self.eventos:
+                ev = {"name": nombre, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                      "ts": (inicio - self.t0) / 1000.0, "dur": dur / 1000.0}
+                if detalle is not None:
+                    ev["args"] = {"detalle": detalle}
+                f.write(",\n" + json.dumps(ev, ensure_ascii=False))
+            f.write("\n]}\n")
+
+class _Tramo:
+    __slots__ = ("traza", "nombre", "cat", "detalle", "t")
+
+    def __init__(self, traza, nombre, cat, detalle):
+        self.traza, self.nombre, self.cat, self.detalle = traza, nombre, cat, detalle
+
+    def __enter__(self):
+        self.t = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.traza.registrar(self.nombre, self.cat, self.t, time.perf_counter_ns(), self.detalle)
+        return False
+
+class _Nulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULO = _Nulo()
+
+def trazando():
+    return _TRAZA is not None
+
+def span(nombre, cat="app", detalle=None):
+    """Contexto que registra un tramo en la traza de la sesión (sin traza activa no hace nada)."""
+    t = _TRAZA
+    if t is None:
+        return _NULO
+    return _Tramo(t, nombre, cat, detalle)
+
+def trazado(nombre, cat="app"):
+    """Decorador: cada llamada es un tramo; si el primer argumento es un str, va como detalle."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            t = _TRAZA
+            if t is None:
+                return fn(*args, **kwargs)
+            with _Tramo(t, nombre, cat, args[0] if args and isinstance(args[0], str) else None):
+                return fn(*args, **kwargs)
+        return envoltura
+    return deco
+
+class EscrituraTrazada:
+    """Envuelve un fichero para que cada write() sea un tramo "write" (solo con traza activa)."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, b):
+        t = _TRAZA
+        if t is None:
+            return self._f.write(b)
+        t0 = time.perf_counter_ns()
+        n = self._f.write(b)
+        t.registrar("write", "disco", t0, time.perf_counter_ns())
+        return n
+
+    def __getattr__(self, nombre):
+        return getattr(self._f, nombre)
+
+# -----------------------------
+# Muestreo de pilas
+# -----------------------------
+def _hilo_raiz(nombre):
+    """Nombre del hilo sin el número de worker: los de un mismo pool se suman en la misma raíz."""
+    base, _, n = nombre.rpartition("_")
+    return base if base and n.isdigit() else nombre
+
+def _marco(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Muestreador(threading.Thread):
+    """Cada intervalo copia la pila de todos los hilos (menos la suya) y cuenta pilas iguales."""
+
+    def __init__(self, intervalo):
+        super().__init__(name="perfil-muestreo", daemon=True)
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self._parar = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            nombres = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == propio:
+                    continue
+                pila = []
+                while frame is not None and len(pila) < PROFILE_MAX_DEPTH:
+                    pila.append(frame.f_code)
+                    frame = frame.f_back
+                self.pilas[(nombres.get(tid, str(tid)), tuple(pila))] += 1
+            self.muestras += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+    def escribir(self, path):
+        plegadas = Counter()
+        for (hilo, pila), n in self.pilas.items():
+            plegadas[";".join([_hilo_raiz(hilo)] + [_marco(c) for c in reversed(pila)])] += n
+        with open(path, "w", encoding="utf-8") as f:
+            for linea, n in plegadas.most_common():
+                f.write(f"{linea} {n}\n")
+
+# -----------------------------
+# Sesión de perfilado
+# -----------------------------
+_HILO = threading.local()    # .perfil: cProfile activo en este hilo (puesto por la sesión o el gancho)
+
+class _Perfilado:
+    """Un perfilado en curso: cProfile por hilo o muestreador, y la traza."""
+
+    def __init__(self, carpeta, ajustes):
+        self.prefijo = os.path.join(carpeta, f"perfil_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+        self.modo = ajustes["modo"]
+        self.traza = Traza() if ajustes["traza"] else None
+        self.perfiles = []
+        self.muestreador = None
+        self._lock = threading.Lock()
+        if self.modo == PROFILE_MUESTREO:
+            self.muestreador = Muestreador(ajustes["muestreo_ms"] / 1000.0)
+            self.muestreador.start()
+        elif self.modo == PROFILE_CPROFILE:
+            threading.setprofile(self._gancho)
+
+    def perfilar_hilo(self):
+        """cProfile en el hilo actual si no tiene ya uno; devuelve el Profile o None."""
+        if getattr(_HILO, "perfil", None) is not None:
+            return None
+        p = cProfile.Profile()
+        try:
+            p.enable()
+        except ValueError:
+            return None     # desde 3.12 solo puede haber un perfilador activo (sys.monitoring)
+        _HILO.perfil = p
+        with self._lock:
+            self.perfiles.append(p)
+        return p
+
+    def _gancho(self, frame, event, arg):
+        # primer evento de un hilo nuevo: su propio cProfile sustituye a este gancho;
+        # los daemon (escritor de logs, servidor de métricas) viven más que la sesión y no se perfilan
+        sys.setprofile(None)
+        if not threading.current_thread().daemon:
+            self.perfilar_hilo()
+
+    def cerrar(self):
+        """Para todo y escribe los ficheros; devuelve sus rutas."""
+        ficheros = []
+        if self.modo == PROFILE_CPROFILE:
+            threading.setprofile(None)
+            with self._lock:
+                perfiles, self.perfiles = self.perfiles, []
+            stats = None
+            for p in perfiles:
+                try:
+                    stats = pstats.Stats(p) if stats is None else stats.add(p)
+                except TypeError:
+                    continue    # hilo sin ninguna llamada registrada
+            if stats is not None:
+                stats.dump_stats(self.prefijo + ".prof")
+                ficheros.append(self.prefijo + ".prof")
+                with open(self.prefijo + ".txt", "w", encoding="utf-8") as f:
+                    stats.stream = f
+                    stats.sort_stats("tottime").print_stats(PROFILE_TOP)
+                    stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+                ficheros.append(self.prefijo + ".txt")
+        if self.muestreador is not None:
+            self.muestreador.parar()
+            self.muestreador.escribir(self.prefijo + ".folded")
+            ficheros.append(self.prefijo + ".folded")
+        if self.traza is not None:
+            self.traza.escribir(self.prefijo + ".trace.json")
+            ficheros.append(self.prefijo + ".trace.json")
+        return ficheros
+
+_SESION = {"activo": None, "abiertas": 0}
+_SESION_LOCK = threading.Lock()
+
+class ProfileSession:
+    """Contexto de una sesión de descarga. ficheros tiene las rutas escritas si fue la última en cerrar."""
+
+    def __init__(self, carpeta, nombre="session"):
+        self.carpeta = carpeta
+        self.nombre = nombre
+        self.ficheros = []
+        self._perfil = None
+        self._tramo = _NULO
+
+    def __enter__(self):
+        global _TRAZA
+        ajustes = profiling_config()
+        with _SESION_LOCK:
+            activo = _SESION["activo"]
+            if activo is None and (ajustes["modo"] != PROFILE_NO or ajustes["traza"]):
+                activo = _SESION["activo"] = _Perfilado(self.carpeta, ajustes)
+                _TRAZA = activo.traza
+            if activo is not None:
+                _SESION["abiertas"] += 1
+        self._activo = activo
+        if activo is not None and activo.modo == PROFILE_CPROFILE:
+            self._perfil = activo.perfilar_hilo()
+        self._tramo = span(self.nombre, "sesion", self.carpeta)
+        self._tramo.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        global _TRAZA
+        self._tramo.__exit__(*exc)
+        if self._perfil is not None:
+            self._perfil.disable()
+            _HILO.perfil = None
+        if self._activo is None:
+            return False
+        with _SESION_LOCK:
+            _SESION["abiertas"] -= 1
+            ultima = _SESION["abiertas"] == 0
+            if ultima:
+                _SESION["activo"] = None
+                _TRAZA = None
+        if ultima:
+            try:
+                self.ficheros = self._activo.cerrar()
+            except OSError:
+                self.ficheros = []
+        return False
+
+def profile_session(carpeta, nombre="session"):
+    """with profile_session(carpeta) as s: ... — perfila lo que pase dentro según configure_profiling."""
+    return ProfileSession(carpeta, nombre)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - validadores HTTP por fichero (ETag / Last-Modified / tamaño)
+- Los del .part viven en memoria mientras se descarga; a .validadores.jsonl (carpeta destino) van
+  los de los ficheros terminados en modo re-sincronización y los de los .part que quedan a medias
+  al acabar la sesión (flush_parts). Una descarga normal no escribe nada por elemento
+- Al reanudar un .part se manda If-Range: si el objeto cambió, el servidor devuelve el cuerpo
+  entero (200) en vez de un trozo que no encajaría con lo ya descargado
+- Modo re-sincronización: los ficheros existentes se revalidan con If-None-Match /
+  If-Modified-Since (304 = sin cuerpo); sin validadores guardados basta un HEAD con el tamaño
+"""
+import os
+import threading
+
+from duplicados import IndiceAnexado, etag_fuerte
+
+SYNC_FILE = ".validadores.jsonl"
+PART_EXT = ".part"
+
+def validadores(headers, size=None):
+    """{"e": ETag fuerte, "l": Last-Modified, "s": tamaño} de unas cabeceras de respuesta."""
+    headers = headers or {}
+    if size is None:
+        try:
+            size = int(headers.get("Content-Length") or 0) or None
+        except (TypeError, ValueError):
+            size = None
+    return {"e": etag_fuerte(headers), "l": headers.get("Last-Modified"), "s": size}
+
+def if_range(v):
+    """Valor de If-Range: el ETag fuerte o, si no hay, la fecha (RFC 9110 no admite ETags débiles)."""
+    if not v:
+        return None
+    return v.get("e") or v.get("l")
+
+def condicionales(v):
+    """Cabeceras If-None-Match / If-Modified-Since para revalidar con los validadores v."""
+    h = {}
+    if v and v.get("e"):
+        h["If-None-Match"] = v["e"]
+    if v and v.get("l"):
+        h["If-Modified-Since"] = v["l"]
+    return h
+
+class ValidatorStore(IndiceAnexado):
+    """Ruta relativa -> validadores de la última respuesta aceptada para ese fichero.
+    Un registro {"p": ruta, "x": 1} borra la ruta (.part ya terminado)."""
+
+    def __init__(self, carpeta):
+        super().__init__(carpeta, SYNC_FILE)
+        self._datos = {}        # lo que está en el fichero
+        self._partes = {}       # .part en curso de este proceso (solo memoria)
+        self.stats = {"revalidados": 0, "sin_cambios": 0, "actualizados": 0, "sin_validadores": 0, "desaparecidos": 0}
+        with self._lock:
+            self._sync()
+
+    def _cargar(self, rec):
+        if rec.get("x"):
+            self._datos.pop(rec["p"], None)
+        else:
+            self._datos[rec["p"]] = {"e": rec.get("e"), "l": rec.get("l"), "s": rec.get("s")}
+
+    def _guardar(self, rel, v):
+        if self._datos.get(rel) != v:
+            self._datos[rel] = v
+            self._append(dict(v, p=rel))
+
+    def _olvidar(self, rel):
+        if self._datos.pop(rel, None) is not None:
+            self._append({"p": rel, "x": 1})
+
+    def get(self, destino):
+        rel = self._rel(destino)
+        with self._lock:
+            v = self._partes.get(rel) or self._datos.get(rel)
+            if v is None:
+                self._sync()
+                v = self._datos.get(rel)
+            return dict(v) if v else None
+
+    def put(self, destino, headers, size=None, guardar=False):
+        """Validadores de una respuesta para destino. Los de un .part quedan en memoria; los de un
+        fichero terminado se escriben con guardar (re-sincronización) o si ya constaban."""
+        v = validadores(headers, size)
+        if not v["e"] and not v["l"] and not v["s"]:
+            return
+        rel = self._rel(destino)
+        with self._lock:
+            if rel.endswith(PART_EXT):
+                self._partes[rel] = v
+            elif guardar or rel in self._datos:
+                self._guardar(rel, v)
+
+    def promote(self, desde, hacia, guardar=False):
+        """El .part terminó como destino: sus validadores pasan al fichero (mismas reglas que put)."""
+        with self._lock:
+            parte = self._rel(desde)
+            v = self._partes.pop(parte, None) or self._datos.get(parte)
+            self._olvidar(parte)
+            rel = self._rel(hacia)
+            if v is not None and (guardar or rel in self._datos):
+                self._guardar(rel, dict(v))
+
+    def flush_parts(self):
+        """Escribe los validadores de los .part que siguen en disco (la próxima sesión reanuda con
+        If-Range) y olvida los demás. Lo llama run_downloads al terminar."""
+        with self._lock:
+            partes, self._partes = self._partes, {}
+            for rel, v in partes.items():
+                if os.path.exists(os.path.join(self.carpeta, rel)):
+                    self._guardar(rel, v)
+
+    def count(self, clave):
+        with self._lock:
+            self.stats[clave] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def open_store(carpeta):
+    """Almacén de validadores de la carpeta (uno por proceso y carpeta)."""
+    key = os.path.abspath(carpeta)
+    with _STORES_LOCK:
+        st = _STORES.get(key)
+        if st is None:
+            st = _STORES[key] = ValidatorStore(carpeta)
+        return st
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - sonidos UI (hover, click, error, done) generados localmente.
+Solo lo importa la GUI; el modo headless no lo carga.
+- Un único hilo de audio (AudioDispatcher) con cola acotada, rate limit y coalescing por sonido
+- Buffers precargados; en Linux un solo proceso reproductor (pacat/aplay) reutilizado vía stdin
+"""
+import sys
+import math
+import time
+import queue
+import shutil
+import subprocess
+import threading
+import tempfile
+import wave
+import struct
+from pathlib import Path
+
+SAMPLE_RATE = 44100
+AUDIO_QUEUE_MAX = 4
+# intervalo mínimo entre dos reproducciones del mismo sonido (s)
+SOUND_MIN_INTERVAL = {"hover": 0.15, "click": 0.05, "err": 0.25, "done": 0.5}
+
+# -----------------------------
+# Sound generation (small WAVs)
+# -----------------------------
+def _gen_simple_tone(path, freq=800.0, duration=0.18, volume=14000, sweep_to=None):
+    fr = SAMPLE_RATE
+    nframes = int(duration * fr)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(fr)
+        for i in range(nframes):
+            t = i / fr
+            f = freq if sweep_to is None else freq + (sweep_to - freq) * (i / nframes)
+            s = int(volume * math.sin(2 * math.pi * f * t))
+            wf.writeframesraw(struct.pack("<h", s))
+        wf.writeframes(b"")
+
+def _ensure_ui_sounds():
+    tmpdir = Path(tempfile.gettempdir())
+    paths = {}
+    p_done = tmpdir / "dl_done.wav"
+    p_click = tmpdir / "dl_click.wav"
+    p_hover = tmpdir / "dl_hover.wav"
+    p_err = tmpdir / "dl_err.wav"
+    if not p_done.exists():
+        _gen_simple_tone(str(p_done), freq=700.0, duration=0.35, volume=14000, sweep_to=1150.0)
+    if not p_click.exists():
+        _gen_simple_tone(str(p_click), freq=900.0, duration=0.08, volume=9000)
+    if not p_hover.exists():
+        _gen_simple_tone(str(p_hover), freq=1200.0, duration=0.06, volume=6000)
+    if not p_err.exists():
+        _gen_simple_tone(str(p_err), freq=320.0, duration=0.14, volume=12000)
+    paths['done'] = str(p_done)
+    paths['click'] = str(p_click)
+    paths['hover'] = str(p_hover)
+    paths['err'] = str(p_err)
+    return paths
+
+_UI_SOUNDS = None
+_UI_SOUNDS_LOCK = threading.Lock()
+
+def _ui_sounds():
+    """Genera los WAV la primera vez que se necesitan (no al importar)."""
+    global _UI_SOUNDS
+    with _UI_SOUNDS_LOCK:
+        if _UI_SOUNDS is None:
+            try:
+                _UI_SOUNDS = _ensure_ui_sounds()
+            except Exception:
+                _UI_SOUNDS = {}
+        return _UI_SOUNDS
+
+# -----------------------------
+# Audio dispatcher (un hilo, buffers precargados)
+# -----------------------------
+class AudioDispatcher:
+    """Reproduce sonidos UI desde un único hilo de larga vida.
+    play() nunca bloquea: descarta si el mismo sonido ya está en cola (coalescing),
+    si se repite antes de su intervalo mínimo (rate limit) o si la cola está llena."""
+
+    def __init__(self, maxsize=AUDIO_QUEUE_MAX, min_interval=None):
+        self._q = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._last = {}
+        self._thread = None
+        self._buffers = None
+        self._player = None
+        self.min_interval = dict(SOUND_MIN_INTERVAL, **(min_interval or {}))
+        self.muted = False
+        self.disabled = False
+        self.stats = {"played": 0, "coalesced": 0, "throttled": 0, "dropped": 0}
+
+    def set_muted(self, muted):
+        self.muted = bool(muted)
+
+    def play(self, name):
+        if self.muted or self.disabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if name in self._pending:
+                self.stats["coalesced"] += 1
+                return False
+            if now - self._last.get(name, float("-inf")) < self.min_interval.get(name, 0.0):
+                self.stats["throttled"] += 1
+                return False
+            try:
+                self._q.put_nowait(name)
+            except queue.Full:
+                self.stats["dropped"] += 1
+                return False
+            self._last[name] = now
+            self._pending.add(name)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ui-audio", daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self):
+        self._buffers = self._load_buffers()
+        while True:
+            name = self._q.get()
+            with self._lock:
+                self._pending.discard(name)
+            if self.muted or self.disabled:
+                continue
+            buf = self._buffers.get(name)
+            if not buf:
+                continue
+            try:
+                if self._play_buffer(buf):
+                    self.stats["played"] += 1
+            except Exception:
+                pass
+
+    def _load_buffers(self):
+        buffers = {}
+        for name, path in _ui_sounds().items():
+            try:
+                with open(path, "rb") as f:
+                    wav_bytes = f.read()
+                with wave.open(path, "rb") as wf:
+                    pcm = wf.readframes(wf.getnframes())
+                buffers[name] = {"path": path, "wav": wav_bytes, "pcm": pcm}
+            except Exception:
+                pass
+        return buffers
+
+    def _play_buffer(self, buf):
+        if sys.platform.startswith("win"):
+            import winsound
+            # SND_MEMORY es síncrono: bloquea solo este hilo
+            winsound.PlaySound(buf["wav"], winsound.SND_MEMORY)
+            return True
+        elif sys.platform == "darwin":
+            # afplay solo acepta ficheros: un proceso a la vez, sin shell
+            subprocess.run(["afplay", buf["path"]], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+        else:
+            for _ in range(2):
+                player = self._linux_player()
+                if player is None:
+                    return False
+                try:
+                    player.stdin.write(buf["pcm"])
+                    player.stdin.flush()
+                    return True
+                except (BrokenPipeError, OSError, ValueError):
+                    self._close_player()
+        return False
+
+    def _linux_player(self):
+        """Proceso reproductor PCM crudo reutilizado entre sonidos (pacat o aplay)."""
+        if self._player is not None and self._player.poll() is None:
+            return self._player
+        rate = str(SAMPLE_RATE)
+        for cmd in (["pacat", "--playback", "--raw", "--format=s16le", f"--rate={rate}", "--channels=1"],
+                    ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-r", rate, "-c", "1"]):
+            if not shutil.which(cmd[0]):
+                continue
+            try:
+                self._player = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                return self._player
+            except OSError:
+                continue
+        self.disabled = True
+        return None
+
+    def _close_player(self):
+        p, self._player = self._player, None
+        if p is None:
+            return
+        try:
+            p.stdin.close()
+        except Exception:
+            pass
+        try:
+            p.kill()
+        except Exception:
+            pass
+
+_DISPATCHER = AudioDispatcher()
+
+def set_muted(muted):
+    _DISPATCHER.set_muted(muted)
+
+def audio_stats():
+    return dict(_DISPATCHER.stats, muted=_DISPATCHER.muted, disabled=_DISPATCHER.disabled)
+
+def play_ui(name):
+    _DISPATCHER.play(name)
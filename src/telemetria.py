@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - telemetría de red por petición (sin GUI)
+- Cada HEAD/GET: método, estado, tiempo de conexión (solo conexiones nuevas, TLS incluido), TTFB
+- Cada cuerpo: bytes y tiempo de transferencia (sin contar pausas); reintentos y errores de red
+- Agregados por host: acumulados de la sesión del proceso y ventana móvil de TELEM_WINDOW s
+  (histogramas con cubos fijos: se suman entre procesos y se exportan tal cual a Prometheus)
+- Los hijos de fragmentos.py mandan su exportación al coordinador (net_publish): net_stats() ve todo
+- Endpoint local para headless: /metrics (texto Prometheus) y /metrics.json
+"""
+import copy
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+TELEM_WINDOW = 60.0      # s de la ventana móvil (req/s, MB/s y percentiles "en vivo")
+TELEM_SLICE = 5.0        # la ventana avanza en rodajas de este tamaño
+# límites superiores de los cubos, en segundos (el último es +Inf)
+TELEM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TELEM_HISTS = ("connect", "ttfb", "transfer")
+METRICS_HOST = "127.0.0.1"
+METRICS_PREFIX = "downloader"
+
+def _cubo(segundos):
+    for k, lim in enumerate(TELEM_BUCKETS):
+        if segundos <= lim:
+            return k
+    return len(TELEM_BUCKETS)
+
+def _hist():
+    return {"b": [0] * (len(TELEM_BUCKETS) + 1), "sum": 0.0, "n": 0}
+
+def _rodaja():
+    d = {"peticiones": 0, "errores": 0, "bytes": 0}
+    d.update({h: [0] * (len(TELEM_BUCKETS) + 1) for h in TELEM_HISTS})
+    return d
+
+def _acumulado():
+    d = {"peticiones": {}, "estados": {}, "errores": 0, "reintentos": 0, "bytes": 0}
+    d.update({h: _hist() for h in TELEM_HISTS})
+    return d
+
+def _combinar(a, b, signo=1):
+    """a + signo*b campo a campo (dicts, listas de cubos y números); lo que falta cuenta como 0."""
+    if isinstance(a, dict) or isinstance(b, dict):
+        a, b = a or {}, b or {}
+        return {k: _combinar(a.get(k), b.get(k), signo) for k in set(a) | set(b)}
+    if isinstance(a, list) or isinstance(b, list):
+        a = a or [0] * len(b)
+        b = b or [0] * len(a)
+        return [x + signo * y for x, y in zip(a, b)]
+    return (a or 0) + signo * (b or 0)
+
+class _Host:
+    """Acumulados y ventana móvil (deque de rodajas) de un host. Lo protege el lock de NetTelemetry."""
+
+    def __init__(self):
+        self.total = _acumulado()
+        self._rodajas = deque()
+
+    def rodaja(self, ahora):
+        rid = int(ahora // TELEM_SLICE)
+        if not self._rodajas or self._rodajas[-1][0] != rid:
+            self._rodajas.append((rid, _rodaja()))
+        self._podar(rid)
+        return self._rodajas[-1][1]
+
+    def _podar(self, rid):
+        while self._rodajas and self._rodajas[0][0] <= rid - TELEM_WINDOW / TELEM_SLICE:
+            self._rodajas.popleft()
+
+    def ventana(self, ahora):
+        self._podar(int(ahora // TELEM_SLICE))
+        out = _rodaja()
+        for _, r in self._rodajas:
+            out = _combinar(out, r)
+        return out
+
+class NetTelemetry:
+    """Métricas de red del proceso por host (netloc). Thread-safe; las llamadas de registro
+    solo suman en memoria, así que se pueden hacer desde cada petición sin coste apreciable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._externos = {}     # clave -> exportación de otro proceso (último valor)
+        self.enabled = True
+
+    def _host(self, url):
+        netloc = urlparse(url).netloc.lower() or str(url)
+        h = self._hosts.get(netloc)
+        if h is None:
+            h = self._hosts[netloc] = _Host()
+        return h
+
+    def _muestra(self, h, r, nombre, segundos):
+        if segundos is None:
+            return
+        k = _cubo(segundos)
+        h.total[nombre]["b"][k] += 1
+        h.total[nombre]["sum"] += segundos
+        h.total[nombre]["n"] += 1
+        r[nombre][k] += 1
+
+    def observe(self, url, metodo, status=None, connect=None, ttfb=None, error=False):
+        """Una petición: status y TTFB si hubo respuesta; error=True si falló la red (timeout, conexión)."""
+        if not self.enabled:
+            return
+        ahora = time.time()
+        with self._lock:
+            h = self._host(url)
+            r = h.rodaja(ahora)
+            t = h.total
+            t["peticiones"][metodo] = t["peticiones"].get(metodo, 0) + 1
+            r["peticiones"] += 1
+            if error:
+                t["errores"] += 1
+                r["errores"] += 1
+            if status is not None:
+                t["estados"][str(status)] = t["estados"].get(str(status), 0) + 1
+            self._muestra(h, r, "connect", connect)
+            self._muestra(h, r, "ttfb", ttfb)
+
+    def transfer(self, url, nbytes, segundos):
+        """Un cuerpo (o el trozo leído antes de cortarse): bytes y segundos de lectura."""
+        if not self.enabled or not nbytes:
+            return
+        ahora = time.time()
+        with self._lock:
+            h = self._host(url)
+            r = h.rodaja(ahora)
+            h.total["bytes"] += nbytes
+            r["bytes"] += nbytes
+            self._muestra(h, r, "transfer", segundos)
+
+    def retry(self, url):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._host(url).total["reintentos"] += 1
+
+    def export(self):
+        """Estado de este proceso: {"hosts": {netloc: acumulados + "ventana"}, "ventana_s": ...}."""
+        ahora = time.time()
+        with self._lock:
+            hosts = {netloc: dict(copy.deepcopy(h.total), ventana=h.ventana(ahora))
+                     for netloc, h in self._hosts.items()}
+        return {"hosts": hosts, "ventana_s": TELEM_WINDOW}
+
+    def publish(self, clave, snap):
+        with self._lock:
+            self._externos[clave] = snap
+
+    def stats(self):
+        """Exportación propia sumada a la última de cada proceso publicado."""
+        with self._lock:
+            externos = list(self._externos.values())
+        return net_merge(self.export(), *externos)
+
+_TELEMETRIA = NetTelemetry()
+
+def configure_telemetry(enabled=None):
+    """Activa o desactiva el registro (desactivado, observe/transfer/retry no hacen nada)."""
+    if enabled is not None:
+        _TELEMETRIA.enabled = bool(enabled)
+    return _TELEMETRIA
+
+def net_observe(url, metodo, status=None, connect=None, ttfb=None, error=False):
+    _TELEMETRIA.observe(url, metodo, status, connect, ttfb, error)
+
+def net_transfer(url, nbytes, segundos):
+    _TELEMETRIA.transfer(url, nbytes, segundos)
+
+def net_retry(url):
+    _TELEMETRIA.retry(url)
+
+def net_export():
+    return _TELEMETRIA.export()
+
+def net_publish(clave, snap):
+    _TELEMETRIA.publish(clave, snap)
+
+def net_stats():
+    return _TELEMETRIA.stats()
+
+def net_merge(*snaps):
+    """Suma varias exportaciones (p.ej. de los procesos de un reparto)."""
+    hosts = {}
+    for s in snaps:
+        for netloc, h in (s or {}).get("hosts", {}).items():
+            hosts[netloc] = _combinar(hosts.get(netloc), h)
+    return {"hosts": hosts, "ventana_s": TELEM_WINDOW}
+
+def net_diff(despues, antes):
+    """Lo ocurrido entre dos exportaciones del mismo proceso (solo acumulados, sin ventana)."""
+    hosts = {}
+    previos = (antes or {}).get("hosts", {})
+    for netloc, h in (despues or {}).get("hosts", {}).items():
+        d = _combinar({k: v for k, v in h.items() if k != "ventana"},
+                      {k: v for k, v in previos.get(netloc, {}).items() if k != "ventana"}, -1)
+        if sum(d["peticiones"].values()) or d["bytes"]:
+            hosts[netloc] = d
+    return {"hosts": hosts, "ventana_s": TELEM_WINDOW}
+
+def _percentil(cubos, q):
+    """Percentil q (0..1) interpolado dentro de su cubo; None sin muestras."""
+    n = sum(cubos)
+    if not n:
+        return None
+    objetivo = q * n
+    visto = 0
+    for k, c in enumerate(cubos):
+        if c and visto + c >= objetivo:
+            lo = TELEM_BUCKETS[k - 1] if k else 0.0
+            if k >= len(TELEM_BUCKETS):
+                return lo
+            return lo + (TELEM_BUCKETS[k] - lo) * (objetivo - visto) / c
+        visto += c
+    return TELEM_BUCKETS[-1]
+
+def _ms(cubos):
+    return {p: (round(v * 1000, 1) if v is not None else None)
+            for p, v in (("p50", _percentil(cubos, 0.5)), ("p90", _percentil(cubos, 0.9)), ("p99", _percentil(cubos, 0.99)))}
+
+def net_summary(snap, ventana=False):
+    """{netloc: resumen legible} de una exportación: totales, percentiles en ms y MB/s.
+    Con ventana, los percentiles y las tasas son los de la ventana móvil (vista en vivo)."""
+    out = {}
+    for netloc, h in (snap or {}).get("hosts", {}).items():
+        peticiones = sum(h.get("peticiones", {}).values())
+        transfer = h.get("transfer", _hist())
+        res = {"peticiones": peticiones, "metodos": dict(h.get("peticiones", {})),
+               "estados": dict(h.get("estados", {})), "errores": h.get("errores", 0),
+               "reintentos": h.get("reintentos", 0), "mb": round(h.get("bytes", 0) / (1024 * 1024), 2),
+               # por flujo: bytes / segundos leyendo (la suma de flujos en paralelo va aparte, en la ventana)
+               "mb_s_flujo": round(h.get("bytes", 0) / (1024 * 1024) / transfer["sum"], 2) if transfer.get("sum") else None}
+        for nombre in TELEM_HISTS:
+            res[f"{nombre}_ms"] = _ms(h.get(nombre, _hist())["b"])
+            res[f"{nombre}_ms"]["n"] = h.get(nombre, _hist())["n"]
+        v = h.get("ventana")
+        if ventana and v:
+            seg = float(snap.get("ventana_s") or TELEM_WINDOW)
+            res["ventana"] = {"req_s": round(v["peticiones"] / seg, 2), "errores": v["errores"],
+                              "mb_s": round(v["bytes"] / (1024 * 1024) / seg, 2),
+                              **{f"{nombre}_ms": _ms(v[nombre]) for nombre in TELEM_HISTS}}
+        out[netloc] = res
+    return out
+
+def format_summary(netloc, res):
+    """Una línea para la GUI / el log de texto a partir de net_summary()[netloc]."""
+    def p(nombre, q="p50"):
+        v = res[f"{nombre}_ms"][q]
+        return f"{v:g}" if v is not None else "-"
+    flujo = f", {res['mb_s_flujo']:g} MB/s por flujo" if res.get("mb_s_flujo") else ""
+    return (f"Red {netloc}: {res['peticiones']} peticiones ({res['errores']} errores de red, "
+            f"{res['reintentos']} reintentos), TTFB p50/p90 {p('ttfb')}/{p('ttfb', 'p90')} ms, "
+            f"conexión p50 {p('connect')} ms, transferencia p50 {p('transfer')} ms, {res['mb']:g} MB{flujo}.")
+
+# -----------------------------
+# Exposición: texto Prometheus y endpoint HTTP local
+# -----------------------------
+def _etiqueta(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text(snap=None):
+    """Exportación en formato de texto de Prometheus (contadores e histogramas acumulados)."""
+    snap = net_stats() if snap is None else snap
+    p = METRICS_PREFIX
+    lineas = []
+
+    def cabecera(nombre, tipo, ayuda):
+        lineas.append(f"# HELP {p}_{nombre} {ayuda}")
+        lineas.append(f"# TYPE {p}_{nombre} {tipo}")
+
+    hosts = sorted(snap.get("hosts", {}).items())
+    cabecera("requests_total", "counter", "Peticiones HTTP por host y método.")
+    for netloc, h in hosts:
+        for metodo, n in sorted(h.get("peticiones", {}).items()):
+            lineas.append(f'{p}_requests_total{{host="{_etiqueta(netloc)}",method="{metodo}"}} {n}')
+    cabecera("responses_total", "counter", "Respuestas por host y código de estado.")
+    for netloc, h in hosts:
+        for code, n in sorted(h.get("estados", {}).items()):
+            lineas.append(f'{p}_responses_total{{host="{_etiqueta(netloc)}",code="{code}"}} {n}')
+    for nombre, ayuda in (("errors_total", "Timeouts y errores de conexión."),
+                          ("retries_total", "Reintentos de descarga."),
+                          ("bytes_total", "Bytes de cuerpo recibidos.")):
+        cabecera(nombre, "counter", ayuda)
+        clave = {"errors_total": "errores", "retries_total": "reintentos", "bytes_total": "bytes"}[nombre]
+        for netloc, h in hosts:
+            lineas.append(f'{p}_{nombre}{{host="{_etiqueta(netloc)}"}} {h.get(clave, 0)}')
+    for nombre, ayuda in (("connect", "Establecimiento de conexiones nuevas (TCP + TLS)."),
+                          ("ttfb", "Tiempo hasta las cabeceras de la respuesta."),
+                          ("transfer", "Lectura del cuerpo, sin pausas.")):
+        cabecera(f"{nombre}_seconds", "histogram", ayuda)
+        for netloc, h in hosts:
+            hist = h.get(nombre, _hist())
+            acum = 0
+            for k, c in enumerate(hist["b"]):
+                acum += c
+                le = f"{TELEM_BUCKETS[k]:g}" if k < len(TELEM_BUCKETS) else "+Inf"
+                lineas.append(f'{p}_{nombre}_seconds_bucket{{host="{_etiqueta(netloc)}",le="{le}"}} {acum}')
+            lineas.append(f'{p}_{nombre}_seconds_sum{{host="{_etiqueta(netloc)}"}} {hist["sum"]:.6f}')
+            lineas.append(f'{p}_{nombre}_seconds_count{{host="{_etiqueta(netloc)}"}} {hist["n"]}')
+    return "\n".join(lineas) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        ruta = self.path.split("?", 1)[0]
+        snap = net_stats()
+        if ruta in ("/metrics", "/"):
+            body = prometheus_text(snap).encode("utf-8")
+            tipo = "text/plain; version=0.0.4; charset=utf-8"
+        elif ruta == "/metrics.json":
+            body = json.dumps({"ts": round(time.time(), 3), "hosts": net_summary(snap, ventana=True), "raw": snap},
+                              ensure_ascii=False).encode("utf-8")
+            tipo = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(puerto, host=METRICS_HOST):
+    """Sirve /metrics y /metrics.json en host:puerto desde un hilo daemon. Devuelve el servidor
+    (server_address da el puerto real si se pidió el 0)."""
+    srv = ThreadingHTTPServer((host, int(puerto)), _MetricsHandler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="metrics", daemon=True).start()
+    return srv
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - cola de trabajos (varias series url_base a la vez, sin GUI)
+- Un trabajo = dict con claves JOB_KEYS (url_base, relleno, inicio, fin, carpeta, prioridad, ...)
+- JobStore: cola persistente en JOBS_FILE; lo que estaba activo al cerrar vuelve a pendiente
+- FairBudget: un presupuesto global de elementos en vuelo repartido entre trabajos por
+  prioridad y por host (N series del mismo host no se llevan N veces más que otra)
+- Scheduler: lanza hasta max_trabajos a la vez, por prioridad y orden de llegada
+- run_job: la ejecución de un trabajo (mapa/detección + run_downloads), usada por headless y GUI;
+  con "indices" ("1-5,9") solo esos IDs dentro de inicio..fin (reintentos de analisis.py)
+"""
+import os
+import json
+import time
+import threading
+from functools import partial
+from urllib.parse import urlparse
+
+from nucleo import (
+    DEFAULT_RELLENO, DEFAULT_HILOS, DEFAULT_HILOS_DET, DEFAULT_REINTENTOS,
+    DEFAULT_RATE_RPS, DEFAULT_RATE_BURST, SEG_PARTES, SEG_UMBRAL, LIMITE_ERRORES, MAX_DETECT, DETECT_CACHE_TTL,
+    POOL_MAXSIZE, POOL_BLOCK, DEFAULT_MOTOR, DEFAULT_ASYNC_CONCURRENCIA, DEFAULT_AIMD_MAX,
+    LOG_FLUSH_INTERVAL, LOG_MAX_BYTES, DEFAULT_LOG_DURABILITY, DEFAULT_EXTS, parse_exts,
+    configure_pool, configure_log_writer, configure_rate_limits, parse_host_limits,
+    detect_range_mixto, run_downloads,
+)
+from analisis import parse_ids
+from diario import rebuild_journal
+from duplicados import DEFAULT_DEDUP
+from fragmentos import DEFAULT_PROCESOS, run_sharded
+from mapa import MAP_STRIDE, map_range, save_map, load_map, map_hints
+
+JOBS_FILE = "downloader_jobs.json"
+DEFAULT_PRESUPUESTO = 32       # elementos en vuelo entre todos los trabajos
+DEFAULT_MAX_TRABAJOS = 4       # trabajos ejecutándose a la vez
+DEFAULT_PRIORIDAD = 1          # peso relativo: prioridad 2 recibe el doble de cupo que 1
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_ACTIVO = "activo"
+ESTADO_HECHO = "hecho"
+ESTADO_ERROR = "error"
+ESTADO_DETENIDO = "detenido"
+
+# claves aceptadas en un job file (mismos nombres que downloader_config.json)
+JOB_KEYS = ("url_base", "carpeta", "relleno", "inicio", "fin", "hilos", "hilos_det", "reintentos",
+            "rate_rps", "rate_burst", "limites_host", "lim_err", "motor", "async_concurrencia", "pool_maxsize", "pool_block",
+            "log_durability", "log_flush_interval", "log_max_mb",
+            "usar_diario", "reintentar_notfound", "reconstruir_diario", "detect_cache_ttl",
+            "mapa", "usar_mapa", "map_stride", "exts", "prediccion",
+            "adaptativo", "max_hilos", "segmentos", "seg_umbral_mb", "prioridad", "procesos", "dedup",
+            "sincronizar", "indices")
+
+def load_jobs(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("jobs", [data])
+    if not isinstance(data, list):
+        raise ValueError("el job file debe ser un objeto JSON o una lista de objetos")
+    return data
+
+# -----------------------------
+# Ejecución de un trabajo
+# -----------------------------
+def _job_events(out, job_id):
+    """Traduce los eventos estilo App.queue de run_downloads a eventos {"event": ..., "job": ...}."""
+    def emit(item):
+        t = item.get("type")
+        if t == "progress":
+            out({"event": "progress", "job": job_id, "done": item.get("value", 0), "total": item.get("max", 0)})
+        elif t == "status":
+            ev = {"event": "result" if "result" in item else "status", "job": job_id, "text": item.get("text", "")}
+            if "result" in item:
+                ev["status"] = item["result"]
+            out(ev)
+        else:
+            out(dict(item, event=t, job=job_id))
+    return emit
+
+def run_job(job, job_id=0, out=None, stop_event=None, pause_event=None, cupo=None):
+    """Ejecuta un trabajo (dict con claves JOB_KEYS). out(dict) recibe eventos {"event": ..., "job": ...}
+    (los mismos que headless escribe como JSON lines). Con cupo (de FairBudget) el pool, los límites
+    y los logs ya los configuró el Scheduler: aquí no se tocan para no pisar a otros trabajos.
+    Con procesos > 1 (y sin cupo, que no cruza procesos) el rango se reparte con run_sharded.
+    Devuelve el resumen de run_downloads."""
+    out = out or (lambda ev: None)
+    url = str(job.get("url_base") or "").strip()
+    if not url:
+        raise ValueError("falta url_base")
+    carpeta = job.get("carpeta") or "descargas"
+    relleno = int(job.get("relleno", DEFAULT_RELLENO))
+    inicio = max(1, int(job.get("inicio", 1)))
+    hilos = int(job.get("hilos", DEFAULT_HILOS))
+    hilos_det = int(job.get("hilos_det", DEFAULT_HILOS_DET))
+    reintentos = int(job.get("reintentos", DEFAULT_REINTENTOS))
+    exts = job.get("exts", DEFAULT_EXTS)
+    exts = parse_exts(",".join(exts) if isinstance(exts, (list, tuple)) else exts)
+    adaptativo = bool(job.get("adaptativo", True))
+    max_hilos = int(job.get("max_hilos", DEFAULT_AIMD_MAX))
+    if cupo is None:
+        configure_pool(hilos=max(hilos, max_hilos) if adaptativo else hilos, hilos_det=hilos_det,
+                       maxsize=job.get("pool_maxsize", POOL_MAXSIZE), block=job.get("pool_block", POOL_BLOCK))
+        limites = job.get("limites_host") or {}
+        configure_rate_limits(rps=float(job.get("rate_rps", DEFAULT_RATE_RPS)), burst=int(job.get("rate_burst", DEFAULT_RATE_BURST)),
+                              por_host=parse_host_limits(limites) if isinstance(limites, str) else limites)
+        configure_log_writer(flush_interval=float(job.get("log_flush_interval", LOG_FLUSH_INTERVAL)),
+                             durability=job.get("log_durability", DEFAULT_LOG_DURABILITY),
+                             max_bytes=int(job.get("log_max_mb", LOG_MAX_BYTES // (1024 * 1024))) * 1024 * 1024)
+
+    fin = job.get("fin")
+    if fin not in (None, "", 0) and int(fin) < inicio:
+        out({"event": "skip_job", "job": job_id, "reason": f"rango vacío {inicio}..{fin}"})
+        return {"total": 0}
+    mapa = None
+    if job.get("mapa"):
+        out({"event": "map_start", "job": job_id, "url_base": url})
+        mapa = map_range(url, relleno, inicio=inicio, fin=int(fin) if fin else None, hilos=hilos,
+                         stride=int(job.get("map_stride", MAP_STRIDE)), exts=exts, stop_event=stop_event)
+        save_map(carpeta, mapa)
+        out({"event": "map", "job": job_id, "count": mapa["count"], "runs": len(mapa["runs"]),
+             "probes": mapa["probes"], "fin": mapa["fin"], "elapsed": mapa["elapsed"]})
+    elif job.get("usar_mapa"):
+        mapa = load_map(carpeta, url, relleno)
+        if mapa is None:
+            out({"event": "status", "job": job_id, "text": "no hay mapa guardado: se usa el rango completo"})
+    if mapa is not None and fin in (None, "", 0):
+        fin = mapa["fin"]
+    if fin in (None, "", 0):
+        out({"event": "detect_start", "job": job_id, "url_base": url})
+        st = {}
+        fin = detect_range_mixto(url, relleno=relleno, max_busqueda=int(job.get("max_detect", MAX_DETECT)),
+                                 quiet=True, hilos_det=hilos_det,
+                                 cache_ttl=float(job.get("detect_cache_ttl", DETECT_CACHE_TTL)), stats=st, exts=exts)
+        out(dict({"event": "detect", "job": job_id, "value": fin}, **st))
+    fin = int(fin)
+    if fin < inicio:
+        out({"event": "skip_job", "job": job_id, "reason": f"rango vacío {inicio}..{fin}"})
+        return {"total": 0}
+
+    if job.get("reconstruir_diario"):
+        n = rebuild_journal(carpeta, url, relleno)
+        out({"event": "journal_rebuilt", "job": job_id, "video": n["video"], "img": n["img"]})
+
+    hints = map_hints(mapa, inicio, fin) if mapa is not None else None
+    indices = list(hints) if hints is not None else None
+    if job.get("indices"):
+        # IDs sueltos ("1-5,9" o lista), p. ej. el reintento que exporta analisis.py
+        pedidos = parse_ids(job["indices"])
+        indices = [i for i in (indices if indices is not None else pedidos) if inicio <= i <= fin and i in pedidos]
+    out({"event": "start", "job": job_id, "url_base": url, "inicio": inicio, "fin": fin,
+         "items": len(indices) if indices is not None else fin - inicio + 1,
+         "carpeta": carpeta, "hilos": hilos, "motor": job.get("motor", DEFAULT_MOTOR)})
+    procesos = int(job.get("procesos", DEFAULT_PROCESOS))
+    ejecutar = partial(run_sharded, procesos=procesos) if procesos > 1 and cupo is None else run_downloads
+    resumen = ejecutar(url, carpeta, inicio, fin, relleno, hilos, reintentos, _job_events(out, job_id),
+                       lim_err=int(job.get("lim_err", LIMITE_ERRORES)),
+                       motor=job.get("motor", DEFAULT_MOTOR),
+                       async_concurrencia=int(job.get("async_concurrencia", DEFAULT_ASYNC_CONCURRENCIA)),
+                       stop_event=stop_event, pause_event=pause_event,
+                       usar_diario=bool(job.get("usar_diario", True)),
+                       reintentar_notfound=bool(job.get("reintentar_notfound", False)),
+                       indices=indices, exts=exts, prediccion=bool(job.get("prediccion", True)),
+                       ext_hints=hints, adaptativo=adaptativo, max_hilos=max_hilos,
+                       segmentos=int(job.get("segmentos", SEG_PARTES)),
+                       seg_umbral=int(job.get("seg_umbral_mb", SEG_UMBRAL // (1024 * 1024))) * 1024 * 1024,
+                       dedup=job.get("dedup", DEFAULT_DEDUP), sincronizar=bool(job.get("sincronizar", False)),
+                       cupo=cupo)
+    out(dict({"event": "finish", "job": job_id}, **resumen))
+    return resumen
+
+# -----------------------------
+# Cola persistente
+# -----------------------------
+class JobStore:
+    """Lista de trabajos en un JSON (escritura atómica). Cada trabajo lleva id, estado, prioridad,
+    marcas de tiempo, progreso y resumen además de sus claves JOB_KEYS. Thread-safe."""
+
+    def __init__(self, path=JOBS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self.jobs = []
+        self._next_id = 1
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = {}
+        with self._lock:
+            self.jobs = data.get("jobs", [])
+            for j in self.jobs:
+                if j.get("estado") == ESTADO_ACTIVO:
+                    j["estado"] = ESTADO_PENDIENTE   # cortado al cerrar: el diario lo reanuda barato
+            self._next_id = max([j.get("id", 0) for j in self.jobs] + [0]) + 1
+
+    def save(self):
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"jobs": self.jobs}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+    def add(self, job):
+        """Encola un trabajo (dict con claves JOB_KEYS). Devuelve su id."""
+        if not str(job.get("url_base") or "").strip():
+            raise ValueError("falta url_base")
+        with self._lock:
+            j = {k: v for k, v in job.items() if k in JOB_KEYS}
+            j.update({"id": self._next_id, "estado": ESTADO_PENDIENTE, "creado": time.time(),
+                      "prioridad": max(1, int(job.get("prioridad", DEFAULT_PRIORIDAD)))})
+            self._next_id += 1
+            self.jobs.append(j)
+            self.save()
+            return j["id"]
+
+    def get(self, job_id):
+        with self._lock:
+            for j in self.jobs:
+                if j["id"] == job_id:
+                    return j
+        return None
+
+    def update(self, job_id, **campos):
+        with self._lock:
+            j = self.get(job_id)
+            if j is not None:
+                j.update(campos)
+                self.save()
+            return j
+
+    def requeue(self, job_id):
+        """Vuelve a poner en cola un trabajo detenido, con error o hecho (el diario evita repetir)."""
+        return self.update(job_id, estado=ESTADO_PENDIENTE, creado=time.time())
+
+    def remove(self, job_id):
+        with self._lock:
+            self.jobs = [j for j in self.jobs if j["id"] != job_id]
+            self.save()
+
+    def pending(self):
+        """Pendientes en orden de ejecución: prioridad alta primero, luego por llegada."""
+        with self._lock:
+            return sorted((j for j in self.jobs if j.get("estado") == ESTADO_PENDIENTE),
+                          key=lambda j: (-j.get("prioridad", DEFAULT_PRIORIDAD), j.get("creado", 0), j["id"]))
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(j) for j in self.jobs]
+
+# -----------------------------
+# Presupuesto global con reparto justo
+# -----------------------------
+class FairBudget:
+    """Elementos en vuelo entre todos los trabajos. Cuota de un trabajo =
+    presupuesto * peso / suma de pesos, con peso = prioridad / trabajos activos de su host.
+    Un trabajo puede pasar de su cuota si sobra presupuesto y nadie por debajo de la suya espera."""
+
+    def __init__(self, presupuesto=DEFAULT_PRESUPUESTO):
+        self._lock = threading.Lock()
+        self.presupuesto = max(1, int(presupuesto))
+        self.jobs = {}       # id -> {"host", "prioridad", "inflight", "esperando"}
+        self.inflight = 0
+
+    def register(self, job_id, url, prioridad=DEFAULT_PRIORIDAD):
+        with self._lock:
+            self.jobs[job_id] = {"host": urlparse(url).netloc.lower(), "prioridad": max(1, int(prioridad)),
+                                 "inflight": 0, "esperando": False}
+        return _Cupo(self, job_id)
+
+    def unregister(self, job_id):
+        with self._lock:
+            j = self.jobs.pop(job_id, None)
+            if j is not None:
+                self.inflight -= j["inflight"]
+
+    def _cuota(self, job_id):
+        por_host = {}
+        for j in self.jobs.values():
+            por_host[j["host"]] = por_host.get(j["host"], 0) + 1
+        pesos = {k: j["prioridad"] / por_host[j["host"]] for k, j in self.jobs.items()}
+        return max(1.0, self.presupuesto * pesos[job_id] / sum(pesos.values()))
+
+    def try_acquire(self, job_id):
+        with self._lock:
+            j = self.jobs.get(job_id)
+            if j is None:
+                return False
+            if self.inflight >= self.presupuesto:
+                j["esperando"] = True
+                return False
+            if j["inflight"] >= self._cuota(job_id):
+                for k, otro in self.jobs.items():
+                    if k != job_id and otro["esperando"] and otro["inflight"] < self._cuota(k):
+                        return False
+            j["inflight"] += 1
+            j["esperando"] = False
+            self.inflight += 1
+            return True
+
+    def release(self, job_id):
+        with self._lock:
+            j = self.jobs.get(job_id)
+            if j is not None and j["inflight"] > 0:
+                j["inflight"] -= 1
+                self.inflight -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"presupuesto": self.presupuesto, "inflight": self.inflight,
+                    "jobs": {k: {"host": j["host"], "inflight": j["inflight"],
+                                 "cuota": round(self._cuota(k), 1)} for k, j in self.jobs.items()}}
+
+class _Cupo:
+    """Vista de FairBudget para un trabajo: la interfaz try_acquire/release que usan los motores."""
+
+    def __init__(self, budget, job_id):
+        self.budget = budget
+        self.job_id = job_id
+
+    def try_acquire(self):
+        return self.budget.try_acquire(self.job_id)
+
+    def release(self):
+        self.budget.release(self.job_id)
+
+# -----------------------------
+# Scheduler
+# -----------------------------
+class Scheduler:
+    """Ejecuta los pendientes de un JobStore con hasta max_trabajos hilos de trabajo y un FairBudget
+    común. on_event(dict) recibe los eventos de run_job y {"event": "job_state", ...} en cada cambio.
+    Con hasta_vaciar (headless) el hilo termina cuando no queda nada; si no (GUI) sigue esperando
+    trabajos nuevos hasta stop()."""
+
+    def __init__(self, store, presupuesto=DEFAULT_PRESUPUESTO, max_trabajos=DEFAULT_MAX_TRABAJOS,
+                 on_event=None, hasta_vaciar=False):
+        self.store = store
+        self.budget = FairBudget(presupuesto)
+        self.max_trabajos = max(1, int(max_trabajos))
+        self.on_event = on_event or (lambda ev: None)
+        self.hasta_vaciar = hasta_vaciar
+        self.pause_event = threading.Event()
+        self._stop = threading.Event()
+        self._activos = {}     # id -> (hilo, stop_event)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Dimensiona el pool para el presupuesto común y arranca el reparto. Los límites de tasa y
+        el escritor de logs los configura quien llama (headless run_queue, GUI _toggle_queue)."""
+        configure_pool(hilos=self.budget.presupuesto)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _estado(self, job_id, estado, **campos):
+        self.store.update(job_id, estado=estado, **campos)
+        self.on_event(dict({"event": "job_state", "job": job_id, "estado": estado}, **campos))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                libres = self.max_trabajos - len(self._activos)
+                for job in self.store.pending()[:max(0, libres)]:
+                    self._lanzar(job)
+                vacio = not self._activos and not self.store.pending()
+            if vacio and self.hasta_vaciar:
+                return
+            self._stop.wait(0.5)
+
+    def _lanzar(self, job):
+        job_id = job["id"]
+        stop_event = threading.Event()
+        cupo = self.budget.register(job_id, job["url_base"], job.get("prioridad", DEFAULT_PRIORIDAD))
+        self._estado(job_id, ESTADO_ACTIVO, iniciado=time.time())
+
+        def out(ev):
+            if ev.get("event") == "progress":
+                self._progreso(job_id, ev)
+            self.on_event(ev)
+
+        def work():
+            try:
+                resumen = run_job(job, job_id=job_id, out=out, stop_event=stop_event,
+                                  pause_event=self.pause_event, cupo=cupo)
+                if self._stop.is_set():
+                    estado = ESTADO_PENDIENTE   # se paró la cola entera: sigue en la próxima
+                elif stop_event.is_set():
+                    estado = ESTADO_DETENIDO
+                else:
+                    estado = ESTADO_HECHO
+                self._estado(job_id, estado, terminado=time.time(), resumen=resumen)
+            except Exception as e:
+                self._estado(job_id, ESTADO_ERROR, terminado=time.time(), error=str(e))
+            finally:
+                self.budget.unregister(job_id)
+                with self._lock:
+                    self._activos.pop(job_id, None)
+
+        t = threading.Thread(target=work, daemon=True)
+        self._activos[job_id] = (t, stop_event)
+        t.start()
+
+    def _progreso(self, job_id, ev):
+        # en memoria: se guarda con el siguiente cambio de estado, no en cada elemento
+        j = self.store.get(job_id)
+        if j is not None:
+            j["progreso"] = [ev.get("done", 0), ev.get("total", 0)]
+
+    def stop_job(self, job_id):
+        """Detiene un trabajo activo (queda como detenido; volver a encolarlo lo reanuda)."""
+        with self._lock:
+            activo = self._activos.get(job_id)
+        if activo is not None:
+            activo[1].set()
+
+    def stop(self, wait=False):
+        self._stop.set()
+        with self._lock:
+            activos = list(self._activos.values())
+        for _, ev in activos:
+            ev.set()
+        if wait:
+            for t, _ in activos:
+                t.join()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            activos = [t for t, _ in self._activos.values()]
+        for t in activos:
+            t.join()
+
+    def running(self):
+        with self._lock:
+            return sorted(self._activos)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Downloader PRO - vista de log acotada para la GUI (txt_log y log_preview)
+- Las líneas viven en un anillo (deque) compartido; el Text solo guarda una ventana de max_lines
+- Filtro por estado (ok/skip/notfound/blocked/error) y por texto: se re-pinta solo la ventana
+- "Más antiguas" (o rueda arriba del todo) pagina hacia atrás: primero el anillo, luego
+  download.log.jsonl y sus rotaciones leídos desde el final por bloques
+"""
+import os
+import json
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from nucleo import flush_logs
+
+LOG_RING = 20000          # líneas recientes en memoria (compartidas por todas las vistas)
+LOG_VIEW_MAX = 1000       # líneas como máximo dentro de cada Text
+LOG_PAGE = 500            # líneas por página al ir hacia atrás
+LOG_BLOCK = 64 * 1024     # lectura hacia atrás del .jsonl
+FILTROS = ("todos", "ok", "skip", "notfound", "blocked", "cancelled", "error")
+
+def format_record(rec):
+    """Registro de download.log.jsonl -> (texto, estado) con el mismo texto que worker_job."""
+    st = rec.get("status")
+    if st == "ok":
+        dup = f" (duplicado de {rec['dup_of']})" if rec.get("dup_of") else ""
+        dup += " (actualizado)" if rec.get("sync") == "updated" else ""
+        return f"{'VIDEO' if rec.get('type') == 'video' else 'IMG'} OK: {rec.get('path', '')}{dup}", "ok"
+    if st == "skip":
+        estado = "sin cambios" if rec.get("sync") == "unchanged" else "exists"
+        return f"SKIP ({rec.get('type', '')} {estado}): {rec.get('path', '')}", "skip"
+    if st == "notfound":
+        return f"NOTFOUND: {rec.get('base', '')}", "notfound"
+    if st == "blocked":
+        return f"BLOCKED {rec.get('detail', '')}: {rec.get('url', '')}", "blocked"
+    if "event" in rec:
+        datos = ", ".join(f"{k}={v}" for k, v in rec.items()
+                          if k not in ("event", "timestamp") and not isinstance(v, (dict, list)))
+        return f"{rec['event']}: {datos}" if datos else str(rec["event"]), None
+    return json.dumps(rec, ensure_ascii=False), None
+
+def _lines_reverse(path, end=None):
+    """(offset de inicio, línea) desde `end` (o el final) hacia el principio, por bloques."""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END) if end is None else end
+        resto = b""
+        while pos > 0:
+            leer = min(LOG_BLOCK, pos)
+            pos -= leer
+            f.seek(pos)
+            bloque = f.read(leer) + resto
+            partes = bloque.split(b"\n")
+            resto = partes[0]
+            inicio = pos + len(resto) + 1
+            offsets = []
+            for p in partes[1:]:
+                offsets.append(inicio)
+                inicio += len(p) + 1
+            for off, p in zip(reversed(offsets), reversed(partes[1:])):
+                if p.strip():
+                    yield off, p
+        if resto.strip():
+            yield 0, resto
+
+def iter_log_reverse(log_json, cursor=None):
+    """Registros de log_json, log_json.1, ... del más nuevo al más viejo.
+    Genera (cursor, registro); el cursor (n_fichero, offset) permite seguir después."""
+    n, end = cursor or (0, None)
+    while True:
+        path = log_json if n == 0 else f"{log_json}.{n}"
+        if not os.path.exists(path):
+            return
+        for off, raw in _lines_reverse(path, end):
+            try:
+                rec = json.loads(raw.decode("utf-8"))
+            except Exception:
+                continue
+            yield (n, off), rec
+        n, end = n + 1, None
+
+class LogView:
+    """Text acotado sobre un anillo de (ts, texto, estado). Con toolbar añade filtro, búsqueda
+    y paginado hacia atrás; sin ella es solo la cola visible (txt_log de la pestaña Descarga)."""
+
+    def __init__(self, parent, ring, log_json_fn=None, toolbar=False, max_lines=LOG_VIEW_MAX, **text_kw):
+        self.ring = ring
+        self.log_json_fn = log_json_fn
+        self.max_lines = max(10, int(max_lines))
+        self.frame = ttk.Frame(parent)
+        self.filtro_var = tk.StringVar(value="todos")
+        self.buscar_var = tk.StringVar(value="")
+        self.estado_var = tk.StringVar(value="")
+        if toolbar:
+            tb = ttk.Frame(self.frame)
+            tb.pack(fill="x", pady=(0, 4))
+            ttk.Label(tb, text="Estado:").pack(side="left")
+            cb = ttk.Combobox(tb, textvariable=self.filtro_var, values=FILTROS, width=10, state="readonly")
+            cb.pack(side="left", padx=4)
+            cb.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+            ent = ttk.Entry(tb, textvariable=self.buscar_var, width=24)
+            ent.pack(side="left", padx=4)
+            ent.bind("<Return>", lambda e: self.refresh())
+            ttk.Button(tb, text="Buscar", command=self.refresh).pack(side="left", padx=2)
+            ttk.Button(tb, text="Más antiguas", command=self.older).pack(side="left", padx=2)
+            ttk.Button(tb, text="Al final", command=self.refresh).pack(side="left", padx=2)
+            ttk.Label(tb, textvariable=self.estado_var).pack(side="left", padx=8)
+        body = ttk.Frame(self.frame)
+        body.pack(fill="both", expand=True)
+        self.text = tk.Text(body, wrap="none", **text_kw)
+        sb = ttk.Scrollbar(body, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=sb.set)
+        sb.pack(side="right", fill="y")
+        self.text.pack(side="left", fill="both", expand=True)
+        if toolbar:
+            for ev in ("<MouseWheel>", "<Button-4>"):
+                self.text.bind(ev, self._on_wheel, add="+")
+        self._shown = 0
+        self._oldest_ts = None      # ts de la línea más vieja pintada que viene del anillo
+        self._cursor = None         # posición en disco para la siguiente página
+        self._disco_agotado = False
+        self.live = True
+
+    def pack(self, **kw):
+        self.frame.pack(**kw)
+
+    # -- filtro --
+    def _matches(self, texto, estado):
+        f = self.filtro_var.get()
+        if f != "todos" and estado != f:
+            return False
+        q = self.buscar_var.get().strip().lower()
+        return not q or q in texto.lower()
+
+    @staticmethod
+    def _fmt(ts, texto):
+        return f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}] {texto}\n" if ts else f"{texto}\n"
+
+    # -- pintado --
+    def on_new(self, entries):
+        """Líneas nuevas (ya añadidas al anillo). En modo historial no se tocan el Text."""
+        if not self.live:
+            return
+        nuevas = [e for e in entries if self._matches(e[1], e[2])]
+        if not nuevas:
+            return
+        if self._oldest_ts is None:
+            self._oldest_ts = nuevas[0][0]
+        self.text.insert("end", "".join(self._fmt(ts, t) for ts, t, _ in nuevas))
+        self._shown += len(nuevas)
+        if self._shown > self.max_lines:
+            sobran = self._shown - self.max_lines
+            self.text.delete("1.0", f"{sobran + 1}.0")
+            self._shown = self.max_lines
+            self._oldest_ts = None   # la más vieja pintada ya no se conoce: older() parte del anillo
+        self.text.see("end")
+
+    def refresh(self):
+        """Vuelve al modo en vivo y pinta las últimas max_lines que pasan el filtro (solo la ventana)."""
+        sel = []
+        for e in reversed(self.ring):
+            if self._matches(e[1], e[2]):
+                sel.append(e)
+                if len(sel) >= self.max_lines:
+                    break
+        sel.reverse()
+        self.text.delete("1.0", "end")
+        self.text.insert("end", "".join(self._fmt(ts, t) for ts, t, _ in sel))
+        self._shown = len(sel)
+        self._oldest_ts = sel[0][0] if sel else None
+        self._cursor = None
+        self._disco_agotado = False
+        self.live = True
+        self.estado_var.set("")
+        self.text.see("end")
+
+    def clear(self):
+        self.text.delete("1.0", "end")
+        self._shown = 0
+        self._oldest_ts = None
+        self._cursor = None
+        self._disco_agotado = False
+        self.live = True
+
+    # -- historial --
+    def _older_from_ring(self, limite):
+        sel = []
+        if self._oldest_ts is None and self._shown:
+            # la ventana se recortó: la más vieja pintada es la max_lines-ésima por el final
+            pintadas = 0
+            for ts, t, st in reversed(self.ring):
+                if self._matches(t, st):
+                    pintadas += 1
+                    if pintadas == self._shown:
+                        self._oldest_ts = ts
+                        break
+        for e in reversed(self.ring):
+            if self._oldest_ts is not None and e[0] >= self._oldest_ts:
+                continue
+            if self._matches(e[1], e[2]):
+                sel.append(e)
+                if len(sel) >= limite:
+                    break
+        return sel
+
+    def _older_from_disk(self, limite):
+        if self._disco_agotado or not self.log_json_fn:
+            return []
+        log_json = self.log_json_fn()
+        flush_logs()
+        # lo que sigue en el anillo ya se ha pintado o se pintará desde ahí
+        ring_desde = self.ring[0][0] if len(self.ring) else None
+        sel = []
+        cursor = self._cursor
+        for cursor, rec in iter_log_reverse(log_json, self._cursor):
+            ts = rec.get("timestamp")
+            if ring_desde is not None and ts is not None and ts >= ring_desde:
+                continue
+            texto, estado = format_record(rec)
+            if self._matches(texto, estado):
+                sel.append((ts, texto, estado))
+                if len(sel) >= limite:
+                    break
+        else:
+            self._disco_agotado = True
+        self._cursor = cursor
+        return sel
+
+    def older(self):
+        """Antepone la siguiente página de líneas más antiguas; pasa a modo historial."""
+        sel = self._older_from_ring(LOG_PAGE)
+        if sel:
+            self._oldest_ts = sel[-1][0]
+        if len(sel) < LOG_PAGE:
+            sel += self._older_from_disk(LOG_PAGE - len(sel))
+        if not sel:
+            self.estado_var.set("No hay líneas más antiguas.")
+            return
+        sel.reverse()
+        self.text.insert("1.0", "".join(self._fmt(ts, t) for ts, t, _ in sel))
+        self._shown += len(sel)
+        if self._shown > self.max_lines:
+            self.text.delete(f"{self.max_lines + 1}.0", "end")
+            self._shown = self.max_lines
+        self.live = False
+        self.estado_var.set("Historial: 'Al final' para volver a las líneas en vivo.")
+        self.text.see(f"{len(sel)}.0")
+
+    def _on_wheel(self, event):
+        if getattr(event, "delta", 0) < 0:
+            return
+        if self.text.yview()[0] <= 0.0:
+            self.older()